@@ -1,27 +1,35 @@
+import importlib
+import os
+import sys
+import time
 import streamlit as st
-from io import StringIO
-import lasio
-import pandas as pd
-import matplotlib.pyplot as plt
+import las_cache
+import figure_cache
+import instrumentation
+import well_ingest
 
-# Function to load and process LAS file
-def load_data(uploaded_file):
-    """Load and process the LAS file."""
-    if uploaded_file is not None:
-        try:
-            # Read the uploaded file as bytes, then decode to StringIO for LAS reading
-            bytes_data = uploaded_file.read()
-            str_io = StringIO(bytes_data.decode('Windows-1252'))
-            las_file = lasio.read(str_io)
-            well_data = las_file.df()
-            well_data['DEPTH'] = well_data.index
-        except UnicodeDecodeError as e:
-            st.error(f"Error loading log.las: {e}")
-            las_file, well_data = None, None
-    else:
-        las_file, well_data = None, None
+# Page modules (and the libraries they need) are imported only when their page
+# is selected: page name -> (module, sidebar heading, sidebar instructions)
+PAGES = {
+    'Well Logging': ('well_logging', "Well Logging Instructions",
+                     "Upload LAS file for detailed well logging analysis."),
+    'Core Analysis': ('core_analysis', "Core Analysis Instructions",
+                      "Upload a CSV file containing core data."),
+    'Welly Multi Well Projects': ('welly_multi_well_projects', "Multi-Well Projects Instructions",
+                                  "Upload multiple LAS files for comparison."),
+    'Survey Data': ('survey_data', "Survey Data Instructions",
+                    "Upload LAS file containing survey data for analysis."),
+    'Decline Curve Analysis': ('decline_curve_analysis', "Decline Curve Analysis Instructions",
+                               "Upload Excel file with production data for decline analysis."),
+    'Estimated Ultimate Recovery': ('estimated_ultimate_recovery', "Estimated Ultimate Recovery Instructions",
+                                    "Upload Excel file with production data for recovery estimation."),
+}
 
-    return las_file, well_data
+# Function to profile a cold import of a page module in a fresh interpreter
+@st.cache_data(show_spinner="Profiling imports...")
+def profile_page_imports(module_name):
+    import import_report
+    return import_report.profile_imports(module_name)
 
 # Page configurations
 st.set_page_config(layout="wide", page_title='Petro Data Explorer')
@@ -31,9 +39,7 @@ st.title('Petro Data Explorer')
 
 # Sidebar options to navigate between pages
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Select a page:",
-                        ['Well Logging', 'Core Analysis', 'Welly Multi Well Projects',
-                         'Survey Data', 'Decline Curve Analysis', 'Estimated Ultimate Recovery'])
+page = st.sidebar.radio("Select a page:", list(PAGES))
 
 # File description for different sections
 file_descriptions = {
@@ -49,39 +55,80 @@ file_descriptions = {
 st.sidebar.subheader("Page Description")
 st.sidebar.write(file_descriptions[page])
 
+# Opt-in per-stage instrumentation of this session's page runs
+stage_panel = st.sidebar.expander("Debug: Stage Timings")
+record_stages = stage_panel.checkbox("Record stage timings", value=bool(os.environ.get('PETRO_INSTRUMENT')))
+trace_memory = stage_panel.checkbox("Trace peak memory (slows allocations)", value=False)
+if record_stages:
+    instrumentation.start_run(page, trace_memory)
+
 # Import and display corresponding page based on user selection
-if page == 'Well Logging':
-    import well_logging
-    st.sidebar.subheader("Well Logging Instructions")
-    st.sidebar.write("Upload LAS file for detailed well logging analysis.")
-    well_logging.show_page()
+module_name, heading, instructions = PAGES[page]
+try:
+    already_imported = module_name in sys.modules
+    with instrumentation.stage("Import page"):
+        import_start = time.perf_counter()
+        page_module = importlib.import_module(module_name)
+        import_seconds = time.perf_counter() - import_start
+    st.sidebar.subheader(heading)
+    st.sidebar.write(instructions)
+    page_module.show_page()
+finally:
+    recorder = instrumentation.stop_run()
 
-elif page == 'Core Analysis':
-    import core_analysis
-    st.sidebar.subheader("Core Analysis Instructions")
-    st.sidebar.write("Upload a CSV file containing core data.")
-    core_analysis.show_page()
+if recorder is not None:
+    stage_rows = recorder.rows()
+    stage_history = st.session_state.setdefault('stage_history', [])
+    stage_history.extend(stage_rows)
+    # PETRO_INSTRUMENT_LOG collects every recorded run of the server for later comparison
+    if os.environ.get('PETRO_INSTRUMENT_LOG'):
+        instrumentation.append_jsonl(os.environ['PETRO_INSTRUMENT_LOG'], stage_rows)
+    with stage_panel:
+        st.dataframe([dict(row, stage='  ' * row['depth'] + row['stage']) for row in stage_rows],
+                     column_order=['stage', 'wall_s', 'cpu_s', 'peak_mb', 'rows', 'error'])
+        st.download_button("Download this session's stages (JSON lines)",
+                           instrumentation.to_jsonl(stage_history),
+                           file_name="stage_timings.jsonl", mime="application/jsonl")
 
-elif page == 'Welly Multi Well Projects':
-    import welly_multi_well_projects
-    st.sidebar.subheader("Multi-Well Projects Instructions")
-    st.sidebar.write("Upload multiple LAS files for comparison.")
-    welly_multi_well_projects.show_page()
+# Shared LAS parse cache statistics
+with st.sidebar.expander("LAS Parse Cache"):
+    cache_stats = las_cache.get_cache().stats()
+    st.write(f"Entries: {cache_stats['entries']} "
+             f"({cache_stats['bytes'] / 2**20:.1f} / {cache_stats['max_bytes'] / 2**20:.0f} MB)")
+    st.write(f"Hits: {cache_stats['hits']}, misses: {cache_stats['misses']}, "
+             f"evictions: {cache_stats['evictions']}")
 
-elif page == 'Survey Data':
-    import survey_data
-    st.sidebar.subheader("Survey Data Instructions")
-    st.sidebar.write("Upload LAS file containing survey data for analysis.")
-    survey_data.show_page()
+# Ingested welly well cache statistics
+with st.sidebar.expander("Well Cache"):
+    cache_stats = well_ingest.get_cache().stats()
+    st.write(f"Wells: {cache_stats['entries']} "
+             f"({cache_stats['bytes'] / 2**20:.1f} / {cache_stats['max_bytes'] / 2**20:.0f} MB)")
+    st.write(f"Hits: {cache_stats['hits']}, misses: {cache_stats['misses']}, "
+             f"evictions: {cache_stats['evictions']}")
 
-elif page == 'Decline Curve Analysis':
-    import decline_curve_analysis
-    st.sidebar.subheader("Decline Curve Analysis Instructions")
-    st.sidebar.write("Upload Excel file with production data for decline analysis.")
-    decline_curve_analysis.show_page()
+# Rendered figure cache statistics
+with st.sidebar.expander("Figure Cache"):
+    cache_stats = figure_cache.get_cache().stats()
+    st.write(f"Figures: {cache_stats['entries']} "
+             f"({cache_stats['bytes'] / 2**20:.1f} / {cache_stats['max_bytes'] / 2**20:.0f} MB)")
+    st.write(f"Hits: {cache_stats['hits']}, misses: {cache_stats['misses']}, "
+             f"evictions: {cache_stats['evictions']}")
 
-elif page == 'Estimated Ultimate Recovery':
-    import estimated_ultimate_recovery
-    st.sidebar.subheader("Estimated Ultimate Recovery Instructions")
-    st.sidebar.write("Upload Excel file with production data for recovery estimation.")
-    estimated_ultimate_recovery.show_page()
+# Import cost of the selected page
+with st.sidebar.expander("Debug: Import Times"):
+    if already_imported:
+        st.write(f"{module_name} was already imported by this server process.")
+    else:
+        st.write(f"Importing {module_name} took {import_seconds:.2f} s in this process.")
+    if st.checkbox("Profile a cold import (python -X importtime)"):
+        try:
+            report = profile_page_imports(module_name)
+        except Exception as e:
+            st.error(str(e))
+        else:
+            import import_report
+            st.write(f"Cold import: {report['Cumulative (s)'].max():.2f} s")
+            st.write("By package:")
+            st.dataframe(import_report.package_totals(report))
+            st.write("Slowest modules:")
+            st.dataframe(report.head(50))
@@ -0,0 +1,98 @@
+import numpy as np
+
+# Arps decline models shared by the Decline Curve Analysis and Estimated
+# Ultimate Recovery pages, the batch fitter and the worker processes.
+
+
+def exponential(t, qi, di):
+    return qi * np.exp(-di * t)
+
+
+def harmonic(t, qi, di):
+    return qi / (1 + di * t)
+
+
+def hyperbolic(t, qi, di, b):
+    return qi / np.abs((1 + b * di * t)) ** (1 / b)
+
+
+# The rate-cumulative relations below accept scalars or broadcastable arrays
+# (e.g. a column of sampled parameters against a row of rates), choosing the
+# b == 1 branch element-wise.
+
+def _non_harmonic(b):
+    # b with the harmonic entries swapped out so the general branch stays finite
+    return np.where(b == 1, 0.5, b)
+
+
+def hyperbolic_rate_from_cum(Gp, qi, Di, b):
+    bh = _non_harmonic(b)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        t1 = qi ** (1 - bh)
+        t2 = Gp * Di * (1 - bh) / (qi ** bh)
+        Qt = np.where(b == 1, qi * np.exp(-(Gp * Di) / qi), (t1 - t2) ** (1 / (1 - bh)))
+    return Qt[()]
+
+
+def hyperbolic_cum_from_rate(q, qi, Di, b):
+    # Inverse of hyperbolic_rate_from_cum
+    bh = _non_harmonic(b)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        general = (qi ** bh) * (qi ** (1 - bh) - q ** (1 - bh)) / (Di * (1 - bh))
+        Gp = np.where(b == 1, (qi / Di) * np.log(qi / q), general)
+    return Gp[()]
+
+
+def hyperbolic_time_from_rate(q, qi, Di, b):
+    return ((qi / q) ** b - 1) / (b * Di)
+
+
+# Rate-time models by the names used in the UI
+RATE_MODELS = {
+    'Exponential': exponential,
+    'Harmonic': harmonic,
+    'Hyperbolic': hyperbolic,
+}
+
+
+# Analytic Jacobians (d model / d params), shaped (len(t), n_params) as curve_fit expects
+
+def exponential_jac(t, qi, di):
+    decay = np.exp(-di * t)
+    return np.column_stack([decay, -t * qi * decay])
+
+
+def harmonic_jac(t, qi, di):
+    u = 1 + di * t
+    return np.column_stack([1 / u, -qi * t / u ** 2])
+
+
+def hyperbolic_jac(t, qi, di, b):
+    u = 1 + b * di * t
+    q = hyperbolic(t, qi, di, b)
+    dq_db = q * (np.log(np.abs(u)) / b ** 2 - di * t / (b * u))
+    return np.column_stack([q / qi, -q * t / u, dq_db])
+
+
+def hyperbolic_rate_from_cum_jac(Gp, qi, Di, b):
+    if b == 1:
+        q = hyperbolic_rate_from_cum(Gp, qi, Di, b)
+        h = 1e-6
+        dq_db = (hyperbolic_rate_from_cum(Gp, qi, Di, 1 + h) - hyperbolic_rate_from_cum(Gp, qi, Di, 1 - h)) / (2 * h)
+        return np.column_stack([q * (1 / qi + Gp * Di / qi ** 2), -q * Gp / qi, dq_db])
+    a = qi ** (1 - b) - Gp * Di * (1 - b) / qi ** b
+    q = a ** (1 / (1 - b))
+    da_dqi = (1 - b) * qi ** -b + Gp * Di * (1 - b) * b * qi ** (-b - 1)
+    da_dDi = -Gp * (1 - b) * qi ** -b
+    da_db = -np.log(qi) * qi ** (1 - b) + Gp * Di * qi ** -b * (1 + (1 - b) * np.log(qi))
+    scale = q / (a * (1 - b))
+    dq_db = q * (np.log(a) / (1 - b) ** 2 + da_db / (a * (1 - b)))
+    return np.column_stack([scale * da_dqi, scale * da_dDi, dq_db])
+
+
+MODEL_JACOBIANS = {
+    exponential: exponential_jac,
+    harmonic: harmonic_jac,
+    hyperbolic: hyperbolic_jac,
+    hyperbolic_rate_from_cum: hyperbolic_rate_from_cum_jac,
+}
@@ -0,0 +1,70 @@
+import uuid
+
+import streamlit as st
+
+import instrumentation
+import jobs
+import well_ingest
+
+# Streamlit side of the background jobs: one job slot per session and page
+# section, and a progress display that polls a running job in a fragment, so
+# only that part of the page reruns until the job is done and the rest of the
+# page stays usable meanwhile.
+
+POLL_SECONDS = 0.5
+
+
+def session_slot(name):
+    return st.session_state.setdefault('_job_session', uuid.uuid4().hex), name
+
+
+def submit(name, key, func, make_args, label=None, size=None):
+    """jobs.submit() in this session's slot for name."""
+    return jobs.submit(session_slot(name), key, func, make_args, label, size)
+
+
+def cancel(name):
+    jobs.cancel(session_slot(name))
+
+
+def show_job(job, text, render=None):
+    """True when the job is done; otherwise show its progress and render(job) for the
+    partial results, refreshed every POLL_SECONDS, and rerun the page once it is done."""
+    if job.done():
+        return True
+
+    @st.fragment(run_every=POLL_SECONDS)
+    def poll():
+        if job.done():
+            st.rerun()
+        done, total = job.progress()
+        st.progress(done / total, text=f"{text}: {done} of {total}")
+        if render:
+            render(job)
+
+    poll()
+    return False
+
+
+@instrumentation.instrumented("Load wells", rows=len)
+def load_wells(uploaded_files):
+    """Welly wells of the uploaded LAS files, or None while they are still being ingested;
+    files that fail are reported with st.error and left out."""
+    results, pending, _ = well_ingest.cached_wells(uploaded_files)
+    if pending:
+        # Parsed in the background; the page shows the files done so far until all are
+        job = well_ingest.submit_pending(session_slot("load_wells"), pending)
+        if not show_job(job, "Loaded files", lambda job: st.caption(", ".join(
+                results[i][0] for (i, _, _), outcome in zip(pending, job.outcomes()) if outcome is not None))):
+            return None
+        results = well_ingest.store_wells(results, pending, job.outcomes())
+    else:
+        cancel("load_wells")
+
+    wells = []
+    for name, well, error in results:
+        if error is not None:
+            st.error(f"Error processing file {name}: {error}")
+        else:
+            wells.append(well)
+    return wells
@@ -0,0 +1,212 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+import pandas as pd
+
+import dca_batch
+import las_reader
+import log_analysis
+import log_qc
+import parallel
+import production_store
+import trajectory
+
+# Headless batch runs over a directory of input files, without the UI:
+#
+#   python batch_cli.py DATA_DIR OUTPUT_DIR --analyses logs,dca,eur,survey --format parquet
+#
+# LAS files (logs): outlier handling and the petrophysics chain per well, one
+# well per worker process; each well's curves are written as soon as it is
+# done, the cutoff summaries of all wells are collected in logs_summary and
+# the curve QC statistics per file and over all files in logs_qc.
+# Workbooks (dca, eur): batch decline fits of every wellbore, with the
+# wellbores spread over the worker pool; one table per workbook.
+# Survey CSVs with MD, INC and AZI columns (survey): desurveyed stations of
+# every well; one table per file.
+#
+# Files that fail are reported and skipped, so one bad input does not stop an
+# overnight run.  The pool size can be set with --workers (PETRO_WORKERS).
+
+ANALYSES = ['logs', 'dca', 'eur', 'survey']
+FORMATS = ['parquet', 'csv']
+INPUT_PATTERNS = {
+    'logs': ['*.las', '*.LAS'],
+    'dca': ['*.xlsx'],
+    'eur': ['*.xlsx'],
+    'survey': ['*.csv'],
+}
+
+
+def find_inputs(directory, patterns, recursive=False):
+    paths = set()
+    for pattern in patterns:
+        if recursive:
+            pattern = os.path.join('**', pattern)
+        paths.update(glob.glob(os.path.join(directory, pattern), recursive=recursive))
+    return sorted(paths)
+
+
+def output_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def write_table(df, path, fmt):
+    """Write df as Parquet or CSV, replacing path only once the file is complete."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if fmt == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def report(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def progress(label):
+    def on_progress(done, total):
+        report(f"{label}: {done}/{total}")
+    return on_progress
+
+
+def analyse_las_file(path, output_dir, fmt, outlier_method='None', parameters=None):
+    """Worker: analyse one LAS file, write its curves and return its cutoff summary
+    and the QC summaries of the raw curves."""
+    with open(path, 'rb') as f:
+        las = las_reader.read_las(f.read())
+    well_name = las.header_value('WELL') or output_name(path)
+    qc = log_qc.summarize_curves({name: las.curve(name) for name in las.keys[1:]})
+    curves, summary = log_analysis.analyse_well(las.df(), well_name, outlier_method, parameters)
+    curves = curves.reset_index()
+    curves.insert(0, 'WELL', well_name)
+    write_table(curves, os.path.join(output_dir, 'logs', f"{output_name(path)}.{fmt}"), fmt)
+    summary.insert(0, 'File', os.path.basename(path))
+    summary.insert(1, 'Rows', len(curves))
+    return summary.reset_index(), qc
+
+
+def qc_table(qc_by_file):
+    """QC summaries per file and curve, followed by every curve over all files (merged, not re-read)."""
+    qc_by_file = dict(qc_by_file, **{'All files': log_qc.merge_summaries(qc_by_file.values())})
+    table = pd.concat([log_qc.summary_table(qc).reset_index().assign(File=name) for name, qc in qc_by_file.items()],
+                      ignore_index=True)
+    return table[['File'] + log_qc.SUMMARY_COLUMNS]
+
+
+def run_logs(paths, output_dir, fmt, outlier_method='None', parameters=None):
+    tasks = [(path, output_dir, fmt, outlier_method, parameters) for path in paths]
+    summaries = []
+    qc_by_file = {}
+    for path, (result, error) in zip(paths, parallel.map_ordered(analyse_las_file, tasks, progress("logs"))):
+        if error is not None:
+            report(f"logs: {path} failed: {error}")
+            summary = pd.DataFrame([{'File': os.path.basename(path), 'Error': str(error)}])
+        else:
+            summary, qc_by_file[os.path.basename(path)] = result
+        summaries.append(summary)
+    summary = pd.concat(summaries, ignore_index=True)
+    if 'Error' in summary.columns:
+        summary = summary[[c for c in summary.columns if c != 'Error'] + ['Error']]
+    written = [write_table(summary, os.path.join(output_dir, f"logs_summary.{fmt}"), fmt)]
+    if qc_by_file:
+        written.append(write_table(qc_table(qc_by_file), os.path.join(output_dir, f"logs_qc.{fmt}"), fmt))
+    return written
+
+
+def run_workbooks(analysis, paths, output_dir, fmt, window_size, q_limit):
+    written = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                store_path = production_store.bytes_store_path(f.read())
+            if analysis == 'dca':
+                df = production_store.load_production(store_path, production_store.DCA_COLUMNS)
+                fits = dca_batch.batch_fit_rate_models(df, window_size, progress(f"dca {output_name(path)}"))
+            else:
+                df = production_store.load_production(store_path, production_store.EUR_COLUMNS,
+                                                      end=dca_batch.EUR_END_DATE)
+                fits = dca_batch.eur_at_limit(dca_batch.batch_fit_eur(df, progress(f"eur {output_name(path)}")),
+                                              q_limit)
+        except Exception as e:
+            report(f"{analysis}: {path} failed: {e}")
+            continue
+        fits.insert(0, 'File', os.path.basename(path))
+        written.append(write_table(fits, os.path.join(output_dir, analysis, f"{output_name(path)}.{fmt}"), fmt))
+    return written
+
+
+def run_surveys(paths, output_dir, fmt):
+    written = []
+    for path in paths:
+        try:
+            survey = pd.read_csv(path)
+            if not {'MD', 'INC', 'AZI'} <= set(survey.columns):
+                report(f"survey: {path} skipped, no MD/INC/AZI columns")
+                continue
+            well_column = next((c for c in survey.columns if c.upper() == 'WELL'), None)
+            surveys = trajectory.surveys_from_frame(survey, well_column)
+            paths_by_well = dict(zip(surveys, trajectory.desurvey(list(surveys.values()))))
+            if None in paths_by_well:
+                paths_by_well[output_name(path)] = paths_by_well.pop(None)
+            stations = trajectory.trajectory_table(paths_by_well)
+        except Exception as e:
+            report(f"survey: {path} failed: {e}")
+            continue
+        written.append(write_table(stations, os.path.join(output_dir, 'survey', f"{output_name(path)}.{fmt}"), fmt))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Petro Data Explorer analyses on a directory of files")
+    parser.add_argument('input_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('--analyses', default=','.join(ANALYSES),
+                        help=f"comma-separated subset of {', '.join(ANALYSES)}")
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--recursive', action='store_true', help="also search subdirectories")
+    parser.add_argument('--outliers', choices=log_analysis.OUTLIER_METHODS, default='None',
+                        help="outlier handling applied to the logs before petrophysics")
+    parser.add_argument('--parameters', help="JSON file overriding petrophysics.DEFAULT_PARAMETERS")
+    parser.add_argument('--window', type=int, default=150, help="DCA smoothing window in days")
+    parser.add_argument('--rate-limit', type=float, default=dca_batch.EUR_RATE_LIMIT,
+                        help="economic limit rate for the EUR predictions")
+    parser.add_argument('--workers', type=int, help="worker processes (default: PETRO_WORKERS or all CPUs)")
+    args = parser.parse_args(argv)
+
+    analyses = [a.strip() for a in args.analyses.split(',') if a.strip()]
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        parser.error(f"unknown analyses: {', '.join(sorted(unknown))}")
+    if args.workers:
+        # Read by parallel.max_workers when the pool is first created
+        os.environ['PETRO_WORKERS'] = str(args.workers)
+    parameters = None
+    if args.parameters:
+        with open(args.parameters) as f:
+            parameters = json.load(f)
+
+    written = []
+    for analysis in analyses:
+        paths = find_inputs(args.input_dir, INPUT_PATTERNS[analysis], args.recursive)
+        if not paths:
+            report(f"{analysis}: no input files found")
+            continue
+        if analysis == 'logs':
+            written.extend(run_logs(paths, args.output_dir, args.format, args.outliers, parameters))
+        elif analysis == 'survey':
+            written.extend(run_surveys(paths, args.output_dir, args.format))
+        else:
+            written.extend(run_workbooks(analysis, paths, args.output_dir, args.format, args.window,
+                                         args.rate_limit))
+    for path in written:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import glob
+import io
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import decimation  # noqa: E402
+import las_reader  # noqa: E402
+
+
+# Render time per depth track (above the empty-track baseline) with every
+# sample vs the decimated envelope
+def render_track(depth, values, decimate, top=None, base=None):
+    fig, ax = plt.subplots(figsize=(3, 10))
+    start = time.perf_counter()
+    if decimate:
+        depth, values = decimation.decimate_track(ax, depth, values, top, base)
+    ax.plot(values, depth, lw=0.5)
+    if top is not None:
+        ax.set_ylim(base, top)
+    # st.pyplot saves the figure as PNG, so time the same thing
+    fig.savefig(io.BytesIO(), format='png', dpi=200)
+    elapsed = time.perf_counter() - start
+    plt.close(fig)
+    return elapsed, len(values)
+
+
+def main(repeat=3):
+    # Fixed cost of an empty track (axes, ticks, PNG encoding), shared by both paths
+    empty = min(render_track(np.empty(0), np.empty(0), False)[0] for _ in range(repeat))
+    print(f"Empty track: {empty * 1e3:.1f} ms")
+    print(f"{'file':<55} {'curve':<6} {'window':<12} {'full (ms)':>10} {'lod (ms)':>9} {'points':>13}")
+    for path in sorted(glob.glob(os.path.join(ROOT, '*.las'))):
+        with open(path, 'rb') as f:
+            las = las_reader.read_las(f.read())
+        depth = las.index
+        for mnemonic in las.keys[1:3]:
+            values = las.curve(mnemonic)
+            lo, hi = np.nanmin(depth), np.nanmax(depth)
+            mid = (lo + hi) / 2
+            for label, (top, base) in (('full', (None, None)), ('zoom 200m', (mid, mid + 200))):
+                full = min(render_track(depth, values, False, top, base) for _ in range(repeat))
+                lod = min(render_track(depth, values, True, top, base) for _ in range(repeat))
+                print(f"{os.path.basename(path):<55} {mnemonic:<6} {label:<12} "
+                      f"{(full[0] - empty) * 1e3:>10.1f} {(lod[0] - empty) * 1e3:>9.1f} {full[1]:>6}->{lod[1]:<6}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
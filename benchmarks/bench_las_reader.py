@@ -0,0 +1,39 @@
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import las_reader  # noqa: E402
+
+
+# Compare the vectorized LAS reader against the previous decode + lasio path
+def best_of(func, bytes_data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(bytes_data)
+        result.df()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(repeat=5):
+    print(f"{'file':<55} {'rows':>7} {'lasio (s)':>10} {'fast (s)':>10} {'speedup':>8}  match")
+    for path in sorted(glob.glob(os.path.join(ROOT, '*.las'))):
+        with open(path, 'rb') as f:
+            bytes_data = f.read()
+        t_lasio, reference = best_of(las_reader.read_las_lasio, bytes_data, repeat)
+        t_fast, fast = best_of(las_reader.read_las_fast, bytes_data, repeat)
+        match = (fast.keys == reference.keys
+                 and np.allclose(fast.data, reference.data, equal_nan=True))
+        print(f"{os.path.basename(path):<55} {fast.data.shape[0]:>7} {t_lasio:>10.4f} "
+              f"{t_fast:>10.4f} {t_lasio / t_fast:>7.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
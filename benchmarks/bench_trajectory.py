@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import trajectory  # noqa: E402
+from synthetic import synthetic_pad  # noqa: E402
+from welly.tools import compute_position_log  # noqa: E402
+
+
+# Desurvey a synthetic pad of build-and-turn wells with welly (one well at a
+# time) and with the batched minimum-curvature engine
+def main(n_wells=300):
+    surveys = synthetic_pad(n_wells)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        reference = [compute_position_log(np.column_stack(s), course_length=30)[1] for s in surveys]
+        t_welly = time.perf_counter() - start
+
+    start = time.perf_counter()
+    paths = trajectory.desurvey(surveys)
+    t_batch = time.perf_counter() - start
+
+    trajectory.desurvey_cached(surveys)
+    start = time.perf_counter()
+    trajectory.desurvey_cached(surveys)
+    t_cached = time.perf_counter() - start
+
+    error = max(np.abs(pos - np.column_stack([p.x, p.y, p.tvd])).max() for pos, p in zip(reference, paths))
+    print(f"{n_wells} wells x {surveys[0][0].size} stations")
+    print(f"welly per well : {t_welly:8.4f} s")
+    print(f"batched        : {t_batch:8.4f} s  ({t_welly / t_batch:.0f}x)")
+    print(f"cached rerun   : {t_cached:8.4f} s")
+    print(f"max position difference: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,271 @@
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import crossplot  # noqa: E402
+import curve_store  # noqa: E402
+import dca_batch  # noqa: E402
+import depth_grid  # noqa: E402
+import figure_cache  # noqa: E402
+import las_reader  # noqa: E402
+import log_analysis  # noqa: E402
+import log_correlation  # noqa: E402
+import log_qc  # noqa: E402
+import log_views  # noqa: E402
+import parallel  # noqa: E402
+import petrophysics  # noqa: E402
+import production_store  # noqa: E402
+import synthetic  # noqa: E402
+import trajectory  # noqa: E402
+import upscaling  # noqa: E402
+import well_logging  # noqa: E402
+
+# Headless benchmark suite over the bundled LAS files and synthetic
+# production tables and surveys at growing well counts.  Every run appends one
+# JSON line per case to the history file, tagged with the git commit, so
+# timings can be compared between commits:
+#
+#   python benchmarks/run_suite.py                  # run and compare with the previous run
+#   python benchmarks/run_suite.py --sizes 1,10 --repeat 3
+#   python benchmarks/run_suite.py --compare-only   # last two runs in the history
+
+DEFAULT_SIZES = [1, 10, 100]
+DEFAULT_REPEAT = 5
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'history.jsonl')
+OUTLIER_METHODS = log_analysis.OUTLIER_METHODS[1:]
+DCA_WINDOW = 150
+
+
+def git_state():
+    """(commit, dirty) of the working tree, or (None, None) outside a git checkout."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def environment():
+    commit, dirty = git_state()
+    return {
+        'run': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'workers': parallel.max_workers(),
+    }
+
+
+def timings(func, repeat):
+    # One untimed call first so imports and caches of the library warm up
+    func()
+    result = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        result.append(time.perf_counter() - start)
+    return result
+
+
+# Cases: (name, size, unit, function) with the inputs already prepared, so
+# only the operation itself is timed
+def las_cases(tmp):
+    # Store keys must be new every call, otherwise write_store reopens the existing store
+    counter = iter(range(10**9))
+    for path in sorted(glob.glob(os.path.join(ROOT, '*.las'))):
+        with open(path, 'rb') as f:
+            bytes_data = f.read()
+        las = las_reader.read_las(bytes_data)
+        rows = las.data.shape[0]
+        name = os.path.basename(path)
+        yield f"LAS read [{name}]", rows, 'rows', lambda b=bytes_data: las_reader.read_las(b)
+        yield (f"LAS store write [{name}]", rows, 'rows',
+               lambda las=las: curve_store.write_store(las, f"bench-{next(counter)}", root=tmp))
+
+        curves = {c: las.curve(c) for c in las.keys[1:]}
+        density = curves.get('RHOB')
+        yield (f"Upscale to 1 m [{name}]", rows, 'rows',
+               lambda las=las, c=curves, d=density: upscaling.upscale(
+                   las.depth, c, upscaling.step_edges(las.depth, 1.0), upscaling.default_methods(list(c)), d))
+
+        well_data = las.df()
+        yield (f"QC summary [{name}]", rows, 'rows',
+               lambda las=las: log_qc.summarize_curves({c: las.curve(c) for c in las.keys[1:]}))
+        for method in OUTLIER_METHODS:
+            yield (f"Outliers {method} [{name}]", rows, 'rows',
+                   lambda df=well_data, m=method: log_analysis.handle_outliers(df, m))
+
+        curves = {c: well_data[c].to_numpy() for c in petrophysics.INPUT_CURVES if c in well_data}
+        depth = well_data.index.to_numpy()
+        yield f"Petrophysics [{name}]", rows, 'rows', lambda c=curves: petrophysics.evaluate(c)
+
+        if {'NPHI', 'RHOB', 'GR'} <= set(well_data.columns):
+            yield (f"Plot cross-plot points [{name}]", rows, 'rows',
+                   lambda df=well_data: plot(well_logging.plot_scatter, df, 'NPHI', 'RHOB'))
+            yield (f"Plot cross-plot density [{name}]", rows, 'rows',
+                   lambda df=well_data: plot_density(df, 'NPHI', 'RHOB'))
+
+        results = petrophysics.evaluate(curves)
+        top, base = float(np.nanmin(depth)), float(np.nanmax(depth))
+        yield (f"Plot petrophysics [{name}]", rows, 'rows',
+               lambda d=depth, r=results, t=top, b=base: plot(log_views.plot_petrophysics, d, r, t, b))
+
+
+def correlation_cases():
+    # GR of all bundled wells on one grid, as on the multi-well page
+    paths = sorted(glob.glob(os.path.join(ROOT, '*.las')))
+    series = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            series.append(depth_grid.las_series(os.path.basename(path), las_reader.read_las(f.read()), ['GR']))
+    matrix = depth_grid.build_curve_matrix(series, ['GR'], step=1.0)
+    values = log_correlation.normalize(matrix.values[:, :, 0])
+    yield ("Log correlation (bulk shifts and warping)", len(paths), 'wells',
+           lambda v=values: log_correlation.align_wells(v, 0, 1.0))
+
+
+def plot(plot_func, *args):
+    # What a figure cache miss costs: build, render to PNG and close
+    fig = plot_func.__wrapped__(*args)
+    figure_cache.render(fig)
+    figure_cache.close(fig)
+
+
+def plot_density(well_data, x_col, y_col):
+    # Binning included, as on a first display
+    x, y = well_data[x_col].to_numpy(), well_data[y_col].to_numpy()
+    x_range, y_range = crossplot.data_range(x), crossplot.data_range(y)
+    levels = crossplot.pyramid(x, y, x_range, y_range, well_data['GR'].to_numpy())
+    plot(log_views.plot_density_crossplot, {'well': crossplot.window(levels, x_range, y_range)},
+         x_col, y_col, 'Mean GR')
+
+
+def production_cases(sizes, tmp):
+    for n_wells in sizes:
+        df = synthetic.production_table(n_wells)
+        path = os.path.join(tmp, f"production-{n_wells}.parquet")
+        df.sort_values(production_store.WELLBORE_COLUMN, kind='stable').to_parquet(
+            path, index=False, row_group_size=production_store.ROW_GROUP_SIZE)
+        wellbore = synthetic.well_names(n_wells)[-1]
+        yield ("Load production (one wellbore)", n_wells, 'wells',
+               lambda p=path, w=wellbore: production_store.load_production(
+                   p, production_store.DCA_COLUMNS, wellbore=w))
+        yield "DCA batch fit", n_wells, 'wells', lambda df=df: dca_batch.batch_fit_rate_models(df, DCA_WINDOW)
+        yield "EUR batch fit", n_wells, 'wells', lambda df=df: dca_batch.batch_fit_eur(df)
+
+
+def survey_cases(sizes):
+    for n_wells in sizes:
+        csv = synthetic.survey_table(n_wells).to_csv(index=False)
+        yield "Desurvey (CSV to trajectories)", n_wells, 'wells', lambda csv=csv: desurvey_csv(csv)
+
+
+def desurvey_csv(csv):
+    survey = pd.read_csv(io.StringIO(csv))
+    return trajectory.desurvey(list(trajectory.surveys_from_frame(survey, 'WELL').values()))
+
+
+def run(sizes, repeat, select=None):
+    env = environment()
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [las_cases(tmp), correlation_cases(), production_cases(sizes, tmp), survey_cases(sizes)]
+        for group in cases:
+            for name, size, unit, func in group:
+                if select and select.lower() not in name.lower():
+                    continue
+                times = timings(func, repeat)
+                record = dict(env, case=name, size=size, unit=unit, repeat=repeat,
+                              min_s=min(times), median_s=statistics.median(times))
+                records.append(record)
+                print(f"{name:<80} {size:>7} {unit:<5} {record['min_s']:>9.4f} s  (median {record['median_s']:.4f})",
+                      flush=True)
+    return records
+
+
+def read_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, records):
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def runs(history):
+    """History records grouped by run, oldest first."""
+    grouped = {}
+    for record in history:
+        grouped.setdefault((record['run'], record['commit']), []).append(record)
+    return list(grouped.items())
+
+
+def compare(before, after):
+    """Print the min times of two runs side by side for the cases they share."""
+    (run_a, commit_a), records_a = before
+    (run_b, commit_b), records_b = after
+    print(f"\nbefore: {run_a} {str(commit_a)[:10]}   after: {run_b} {str(commit_b)[:10]}")
+    baseline = {(r['case'], r['size']): r['min_s'] for r in records_a}
+    for record in records_b:
+        old = baseline.get((record['case'], record['size']))
+        if old is None:
+            continue
+        print(f"{record['case']:<80} {record['size']:>7} {old:>9.4f} -> {record['min_s']:>9.4f} s "
+              f"({old / record['min_s']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and record the timings")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated well counts for production and survey cases")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--select', help="only run cases whose name contains this text")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON-lines file the results are appended to")
+    parser.add_argument('--no-save', action='store_true', help="do not append the results to the history")
+    parser.add_argument('--compare-only', action='store_true', help="compare the last two runs in the history")
+    args = parser.parse_args()
+
+    history = runs(read_history(args.history))
+    if args.compare_only:
+        if len(history) < 2:
+            sys.exit("Need at least two runs in the history to compare")
+        compare(history[-2], history[-1])
+        return
+
+    records = run([int(s) for s in args.sizes.split(',')], args.repeat, args.select)
+    if not args.no_save:
+        append_history(args.history, records)
+    if history and records:
+        compare(history[-1], runs(records)[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic inputs shaped like the Volve data the pages are used with: daily
+# production tables (one row per wellbore and day, NPD column names) and
+# deviation surveys.  Everything is generated from a seed so benchmark runs
+# on different commits see identical data.
+
+PRODUCTION_START = '2007-09-01'
+PRODUCTION_DAYS = 3000
+
+
+def well_names(n_wells):
+    return [f"15/9-F-{i + 1}" for i in range(n_wells)]
+
+
+def production_table(n_wells, days=PRODUCTION_DAYS, seed=0):
+    """Daily oil and gas volumes with hyperbolic decline, noise and shut-in days."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for name in well_names(n_wells):
+        start = pd.Timestamp(PRODUCTION_START) + pd.Timedelta(days=int(rng.integers(0, 720)))
+        t = np.arange(days, dtype=np.float64)
+        qi, di, b = rng.uniform(500, 5000), rng.uniform(1e-3, 5e-3), rng.uniform(0.2, 0.9)
+        oil = qi / (1 + b * di * t) ** (1 / b) * rng.lognormal(0, 0.1, days)
+        oil[rng.random(days) < 0.05] = 0
+        gas = oil * rng.uniform(100, 200) * rng.lognormal(0, 0.05, days)
+        frames.append(pd.DataFrame({
+            'DATEPRD': pd.date_range(start, periods=days, freq='D'),
+            'NPD_WELL_BORE_NAME': name,
+            'BORE_OIL_VOL': oil,
+            'BORE_GAS_VOL': gas,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_pad(n_wells, step=30.0, td=3000.0, seed=0):
+    """(md, inc, azi) surveys of build-and-turn wells."""
+    rng = np.random.default_rng(seed)
+    md = np.arange(0, td + step, step)
+    surveys = []
+    for _ in range(n_wells):
+        kickoff, build, azimuth = rng.uniform(300, 1200), rng.uniform(20, 60), rng.uniform(0, 360)
+        inc = np.clip((md - kickoff) / build, 0, rng.uniform(20, 70))
+        azi = (azimuth + np.where(md > kickoff, (md - kickoff) / rng.uniform(30, 200), 0)) % 360
+        surveys.append((md, inc, azi))
+    return surveys
+
+
+def survey_table(n_wells, step=30.0, td=3000.0, seed=0):
+    """Survey CSV table with WELL, MD, INC and AZI columns, as read by the survey page."""
+    frames = [pd.DataFrame({'WELL': name, 'MD': md, 'INC': inc, 'AZI': azi})
+              for name, (md, inc, azi) in zip(well_names(n_wells), synthetic_pad(n_wells, step, td, seed))]
+    return pd.concat(frames, ignore_index=True)
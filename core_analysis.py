@@ -1,25 +1,40 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from io import StringIO
-import lasio
+import las_cache
+import depth_grid
+import depth_match
+import figure_cache
+import instrumentation
+from log_views import upscaling_options
 
 # Function to load and process LAS file
+@instrumentation.instrumented("Load data", rows=lambda result: None if result[1] is None else len(result[1]))
 def load_data(uploaded_file, file_type='las'):
     if uploaded_file:
-        bytes_data = uploaded_file.read()
         if file_type == 'las':
-            str_io = StringIO(bytes_data.decode('Windows-1252'))
-            las_file = lasio.read(str_io)
+            las_file = las_cache.load_las(uploaded_file)
             well_data = las_file.df()
             well_data['DEPTH'] = well_data.index
             return las_file, well_data
         elif file_type == 'csv':
+            bytes_data = uploaded_file.read()
             df = pd.read_csv(StringIO(bytes_data.decode('utf-8')))
             return None, df
     return None, None
 
+# Function to get the plotted depth range from the core samples (with some padding)
+def depth_limits(core_data, padding=10):
+    depth = core_data["DEPTH"].dropna() if "DEPTH" in core_data.columns else pd.Series(dtype=float)
+    if depth.empty:
+        return 3825, 4010
+    return depth.min() - padding, depth.max() + padding
+
+@figure_cache.cached_figure
 def plot_subplots(core_data, well_data):
+    top, base = depth_limits(core_data)
     fig = plt.figure(figsize=(10, 10))
     ax1 = plt.subplot2grid(shape=(3, 3), loc=(0, 0), rowspan=3)
     ax2 = plt.subplot2grid(shape=(3, 3), loc=(0, 1), rowspan=3)
@@ -31,7 +46,7 @@ def plot_subplots(core_data, well_data):
     if 'CPOR' in core_data.columns:
         ax1.scatter(core_data["CPOR"], core_data["DEPTH"], marker='o', c='red')
         ax1.set_xlim(0, 50)
-        ax1.set_ylim(4010, 3825)
+        ax1.set_ylim(base, top)
         ax1.set_title('Core Porosity')
         ax1.set_xlabel('Porosity (%)')
         ax1.set_ylabel('Depth (ft)')
@@ -46,7 +61,7 @@ def plot_subplots(core_data, well_data):
         ax2.scatter(core_data["CKHG"], core_data["DEPTH"], marker='o', c='blue')
         ax2.set_xlim(0.01, 100000)
         ax2.set_xscale('log')
-        ax2.set_ylim(4010, 3825)
+        ax2.set_ylim(base, top)
         ax2.set_title('Core Permeability')
         ax2.set_xlabel('Permeability (mD)')
         ax2.grid()
@@ -76,17 +91,72 @@ def plot_subplots(core_data, well_data):
         ax6.set_xlabel('NEU (Well Data)')
     
     plt.tight_layout()
+    return fig
+
+# Function to estimate the core-to-log depth shift and return the depth-matched core data
+def show_depth_matching(core_data, las_file):
+    log_curve = depth_grid.resolve_mnemonic(las_file.keys[1:], 'PHIF')
+    if log_curve is None or 'CPOR' not in core_data.columns or 'DEPTH' not in core_data.columns:
+        st.info("Depth matching needs CPOR and DEPTH in the core data and a porosity log (PHIF/PHIE/PHIT).")
+        return core_data
+    st.write("### Core-to-Log Depth Matching")
+    col1, col2 = st.columns(2)
+    max_shift = col1.number_input("Maximum shift", min_value=0.5, value=10.0, step=0.5)
+    n_segments = col2.number_input("Segments (1 = bulk shift only)", min_value=1, max_value=20, value=1)
+    log_depth, log_values = las_file.depth, las_file.curve(log_curve)
+    core_depth, core_values = core_data['DEPTH'].to_numpy(dtype=np.float64), core_data['CPOR'].to_numpy(dtype=np.float64)
+    with instrumentation.stage("Depth shift estimate", rows=len(core_depth)):
+        if n_segments > 1:
+            bulk, centers, shifts = depth_match.estimate_piecewise_shifts(
+                core_depth, core_values, log_depth, log_values, int(n_segments), max_shift)
+        else:
+            bulk = depth_match.estimate_shift(core_depth, core_values, log_depth, log_values, max_shift)
+            centers, shifts = [0.0], [bulk.shift]
+    if not np.isfinite(bulk.shift):
+        st.warning("Core and log do not overlap enough to estimate a depth shift.")
+        return core_data
+    st.write(f"Bulk shift: {bulk.shift:+.2f} (correlation {bulk.correlation:.3f} between CPOR and {log_curve})")
+    if n_segments > 1:
+        st.dataframe(pd.DataFrame({'Segment center': centers, 'Shift': shifts}))
+
+    fig, ax = plt.subplots(figsize=(8, 3))
+    ax.plot(bulk.lags, bulk.scores, color='black')
+    ax.axvline(bulk.shift, color='red', linestyle='--')
+    ax.set_xlabel('Shift (core depth + shift = log depth)')
+    ax.set_ylabel('Correlation')
+    ax.grid()
     st.pyplot(fig)
 
+    if not st.checkbox("Apply depth shift to core data", value=True):
+        return core_data
+    matched = core_data.copy()
+    matched['DEPTH'] = depth_match.apply_shifts(core_depth, centers, shifts)
+    st.write("Core samples joined to the nearest log samples (none for plugs more than one log step away):")
+    with instrumentation.stage("Join core to log", rows=len(matched)):
+        joined = depth_match.join_nearest(matched, 'DEPTH', log_depth,
+                                          {name: las_file.curve(name) for name in las_file.keys[1:]},
+                                          tolerance=depth_match.sample_step(log_depth))
+    st.dataframe(joined)
+    return matched
+
 def show_page():
     st.title("Well Logging Analysis")
     uploaded_las = st.file_uploader("Upload your LAS file", type=["las"])
     uploaded_csv = st.file_uploader("Upload your Core Data CSV file", type=["csv"])
     las_file, well_data = load_data(uploaded_las, file_type='las')
+    if las_file is not None:
+        # The upscaled curve store reads like the parsed file for depth matching and the plots
+        store = las_cache.load_store(uploaded_las)
+        upscaled = upscaling_options(store)
+        if upscaled is not store:
+            las_file, well_data = upscaled, upscaled.read()
+            well_data['DEPTH'] = well_data.index
     _, core_data = load_data(uploaded_csv, file_type='csv')
     if core_data is not None:
         st.write("### Core Data Overview")
         st.write(core_data.head())
+        if las_file is not None:
+            core_data = show_depth_matching(core_data, las_file)
         st.write("### Subplots for Core Porosity, Core Permeability, Histograms, and PHIF vs Depth")
         plot_subplots(core_data, well_data)
 
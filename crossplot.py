@@ -0,0 +1,161 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Density-aggregated cross-plots.
+#
+# x/y samples are binned into a 2-D histogram in one vectorized pass
+# (np.bincount over flat bin indices) that keeps, per bin, the number of
+# samples and the count and sum of a colour curve such as GR.  These add, so
+# histograms of many wells (or chunks of one well) on the same edges merge by
+# addition and per-bin means are only taken for drawing.  A figure draws a
+# fixed number of bins however many samples went in, so render time no longer
+# grows with the data.
+#
+# A pyramid holds the histogram at a fine resolution and at successively
+# halved ones; a zoomed window is drawn from the coarsest level that still has
+# enough bins across it, without binning the samples again.
+
+DEFAULT_BINS = 200
+PYRAMID_BINS = 512
+MIN_PYRAMID_BINS = 32
+# Resolution of the per-well outlines drawn over multi-well cross-plots
+OUTLINE_BINS = 50
+
+Histogram2D = namedtuple('Histogram2D', ['x_edges', 'y_edges', 'counts', 'value_counts', 'value_sums'])
+
+
+def data_range(*arrays):
+    """(min, max) over the finite samples of all arrays, widened when they are all equal."""
+    finite = [a[np.isfinite(a)] for a in (np.asarray(a, dtype=np.float64).ravel() for a in arrays)]
+    finite = np.concatenate(finite) if finite else np.empty(0)
+    if not finite.size:
+        return 0.0, 1.0
+    lo, hi = float(finite.min()), float(finite.max())
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return lo, hi
+
+
+def edges(value_range, bins=DEFAULT_BINS):
+    return np.linspace(value_range[0], value_range[1], bins + 1)
+
+
+def _bin_index(values, bin_edges):
+    # Edges are uniform, so the bin is one multiply away; the top edge belongs to the last bin
+    n = bin_edges.size - 1
+    index = np.floor((values - bin_edges[0]) * (n / (bin_edges[-1] - bin_edges[0])))
+    index[values == bin_edges[-1]] = n - 1
+    inside = (index >= 0) & (index < n)
+    return np.where(inside, index, 0).astype(np.intp), inside
+
+
+def _binned(x, y, x_edges, y_edges, values):
+    # (groups x samples) inputs -> per-group (counts, value_counts, value_sums), all groups in one bincount
+    ix, inside_x = _bin_index(x, x_edges)
+    iy, inside_y = _bin_index(y, y_edges)
+    shape = (x.shape[0], x_edges.size - 1, y_edges.size - 1)
+    group = np.broadcast_to(np.arange(shape[0])[:, None], x.shape)
+    keep = inside_x & inside_y
+    flat = (group[keep] * shape[1] + ix[keep]) * shape[2] + iy[keep]
+    size = shape[0] * shape[1] * shape[2]
+    counts = np.bincount(flat, minlength=size).reshape(shape)
+    if values is None:
+        return counts, np.zeros(shape), np.zeros(shape)
+    values = values[keep]
+    present = np.isfinite(values)
+    value_counts = np.bincount(flat[present], minlength=size).reshape(shape).astype(np.float64)
+    value_sums = np.bincount(flat[present], weights=values[present], minlength=size).reshape(shape)
+    return counts, value_counts, value_sums
+
+
+def histogram(x, y, x_edges, y_edges, values=None):
+    """Histogram2D of the (x, y) samples on uniform edges, with per-bin count and sum of values.
+
+    Samples outside the edges or with a missing x or y are left out; missing
+    values only drop out of the value statistics.
+    """
+    return histograms_by_group(np.ravel(x)[None], np.ravel(y)[None], x_edges, y_edges,
+                               None if values is None else np.ravel(values)[None])[0]
+
+
+def histograms_by_group(x, y, x_edges, y_edges, values=None):
+    """One Histogram2D per row of (groups x samples) arrays, e.g. the wells of a curve matrix."""
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    if values is not None:
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    binned = _binned(x, y, x_edges, y_edges, values)
+    return [Histogram2D(x_edges, y_edges, *(a[g] for a in binned)) for g in range(x.shape[0])]
+
+
+def merge(histograms):
+    """Sum of histograms on the same edges, e.g. of several wells."""
+    histograms = list(histograms)
+    first = histograms[0]
+    return Histogram2D(first.x_edges, first.y_edges,
+                       sum(h.counts for h in histograms),
+                       sum(h.value_counts for h in histograms),
+                       sum(h.value_sums for h in histograms))
+
+
+def mean(hist):
+    """Per-bin mean of the values, NaN for bins without any."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(hist.value_counts > 0, hist.value_sums / hist.value_counts, np.nan)
+
+
+def enclosing_level(counts, fraction=0.9):
+    """Lowest bin count such that the bins at or above it hold `fraction` of the samples."""
+    ordered = np.sort(counts, axis=None)[::-1]
+    cumulative = np.cumsum(ordered)
+    if not cumulative.size or cumulative[-1] == 0:
+        return np.nan
+    return ordered[np.searchsorted(cumulative, fraction * cumulative[-1])]
+
+
+def coarsen(hist):
+    """Histogram with 2x2 neighbouring bins added together (an odd last bin is dropped)."""
+    nx, ny = (hist.counts.shape[0] // 2) * 2, (hist.counts.shape[1] // 2) * 2
+
+    def pairs(a):
+        return a[:nx, :ny].reshape(nx // 2, 2, ny // 2, 2).sum(axis=(1, 3))
+
+    return Histogram2D(hist.x_edges[:nx + 1:2], hist.y_edges[:ny + 1:2],
+                       pairs(hist.counts), pairs(hist.value_counts), pairs(hist.value_sums))
+
+
+def _levels(hist, min_bins):
+    levels = [hist]
+    while min(levels[-1].counts.shape) // 2 >= min_bins:
+        levels.append(coarsen(levels[-1]))
+    return levels
+
+
+def pyramid(x, y, x_range, y_range, values=None, bins=PYRAMID_BINS, min_bins=MIN_PYRAMID_BINS):
+    """Histograms at bins, bins / 2, ... down to min_bins per axis, finest first."""
+    return _levels(histogram(x, y, edges(x_range, bins), edges(y_range, bins), values), min_bins)
+
+
+def pyramids_by_group(x, y, x_range, y_range, values=None, bins=PYRAMID_BINS, min_bins=MIN_PYRAMID_BINS):
+    """pyramid() for every row of (groups x samples) arrays, all on the same edges."""
+    finest = histograms_by_group(x, y, edges(x_range, bins), edges(y_range, bins), values)
+    return [_levels(hist, min_bins) for hist in finest]
+
+
+def window(levels, x_range, y_range, bins=DEFAULT_BINS):
+    """The part of a pyramid inside the window, from the coarsest level with at least
+    `bins` bins across the x window (or the finest level when none has)."""
+    chosen = levels[0]
+    for hist in levels:
+        step = hist.x_edges[1] - hist.x_edges[0]
+        if (x_range[1] - x_range[0]) / step >= bins:
+            chosen = hist
+    x_edges, y_edges = chosen.x_edges, chosen.y_edges
+    # Bins overlapping the window
+    x0 = max(np.searchsorted(x_edges, x_range[0], side='right') - 1, 0)
+    x1 = min(np.searchsorted(x_edges, x_range[1], side='left'), x_edges.size - 1)
+    y0 = max(np.searchsorted(y_edges, y_range[0], side='right') - 1, 0)
+    y1 = min(np.searchsorted(y_edges, y_range[1], side='left'), y_edges.size - 1)
+    x1, y1 = max(x1, x0 + 1), max(y1, y0 + 1)
+    return Histogram2D(x_edges[x0:x1 + 1], y_edges[y0:y1 + 1], *(a[x0:x1, y0:y1] for a in chosen[2:]))
@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import disk_budget
+
+# Columnar on-disk store for converted LAS files.
+#
+# Each file gets its own directory named after its content hash, holding a
+# small header.json (well/parameter header items, curve list, depth range) and
+# one contiguous .npy array per curve.  Arrays are memory-mapped on load, so a
+# page only pays for the curves and depth window it actually reads.  The store
+# directory is kept within the disk_budget (least recently opened stores go
+# first).
+
+HEADER_FILE = 'header.json'
+FORMAT_VERSION = 1
+
+
+def default_root():
+    return os.environ.get('PETRO_CURVE_STORE_DIR',
+                          os.path.join(tempfile.gettempdir(), 'petro_curve_store'))
+
+
+def _curve_file(i):
+    return f"curve_{i:03d}.npy"
+
+
+def _items_to_json(items):
+    return [[item.mnemonic, item.unit, item.value, item.descr] for item in items]
+
+
+def write_store(las, key, root=None, dtype=np.float64):
+    """Write a parsed LasData as a columnar store and return the opened CurveStore."""
+    return write_columns([las.data[:, i] for i in range(len(las.curves))], _items_to_json(las.curves),
+                         _items_to_json(las.well.values()), _items_to_json(las.params.values()), key, root, dtype)
+
+
+def write_columns(columns, curves, well, params, key, root=None, dtype=np.float64):
+    """Write one array per curve (depth first) with header items as [mnemonic, unit, value, descr]
+    lists, e.g. curves derived from another store, and return the opened CurveStore."""
+    root = root or default_root()
+    path = os.path.join(root, key)
+    if os.path.exists(os.path.join(path, HEADER_FILE)) and disk_budget.touch(path):
+        return CurveStore(path)
+
+    os.makedirs(root, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=f".{key}-", dir=root)
+    try:
+        for i, column in enumerate(columns):
+            np.save(os.path.join(tmp_path, _curve_file(i)), np.ascontiguousarray(column, dtype=dtype))
+        depth = np.asarray(columns[0]) if columns else np.empty(0)
+        header = {
+            'format': FORMAT_VERSION,
+            'dtype': np.dtype(dtype).name,
+            'n_samples': int(depth.size),
+            'depth_min': float(np.nanmin(depth)) if depth.size else None,
+            'depth_max': float(np.nanmax(depth)) if depth.size else None,
+            'well': well,
+            'params': params,
+            'curves': curves,
+        }
+        with open(os.path.join(tmp_path, HEADER_FILE), 'w') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another session finished writing the same store first.
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.exists(os.path.join(path, HEADER_FILE)):
+            raise
+    disk_budget.trim(root, keep=path)
+    return CurveStore(path)
+
+
+def open_store(key, root=None):
+    """Open an existing store, or return None if the file has not been converted yet."""
+    path = os.path.join(root or default_root(), key)
+    if not os.path.exists(os.path.join(path, HEADER_FILE)) or not disk_budget.touch(path):
+        return None
+    return CurveStore(path)
+
+
+class CurveStore:
+    """Memory-mapped view of one converted LAS file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            self.header = json.load(f)
+        self.curves = self.header['curves']
+        self.keys = [curve[0] for curve in self.curves]
+        self._arrays = {}
+
+    @property
+    def n_samples(self):
+        return self.header['n_samples']
+
+    @property
+    def index_name(self):
+        return self.keys[0]
+
+    @property
+    def depth(self):
+        return self.curve(self.index_name)
+
+    def header_value(self, mnemonic, default=None):
+        for section in ('well', 'params'):
+            for item in self.header[section]:
+                if item[0] == mnemonic:
+                    return item[2]
+        return default
+
+    def curve(self, mnemonic):
+        """Return the memory-mapped array for one curve."""
+        array = self._arrays.get(mnemonic)
+        if array is None:
+            i = self.keys.index(mnemonic)
+            array = np.load(os.path.join(self.path, _curve_file(i)), mmap_mode='r')
+            self._arrays[mnemonic] = array
+        return array
+
+    def window(self, top=None, base=None):
+        """Return the row slice covering a depth interval (the LAS index is monotonic)."""
+        depth = self.depth
+        top = -np.inf if top is None else top
+        base = np.inf if base is None else base
+        if depth.size > 1 and depth[0] > depth[-1]:
+            reversed_depth = depth[::-1]
+            start = depth.size - np.searchsorted(reversed_depth, base, side='right')
+            stop = depth.size - np.searchsorted(reversed_depth, top, side='left')
+        else:
+            start = np.searchsorted(depth, top, side='left')
+            stop = np.searchsorted(depth, base, side='right')
+        return slice(int(start), int(stop))
+
+    def read(self, curves=None, top=None, base=None):
+        """Materialize the selected curves over a depth window as a DataFrame indexed by depth."""
+        curves = self.keys[1:] if curves is None else [c for c in curves if c != self.index_name]
+        missing = [c for c in curves if c not in self.keys]
+        if missing:
+            raise KeyError(f"Curves not in store: {missing}")
+        return self._frame(curves, self.window(top, base))
+
+    def head(self, n=5):
+        return self._frame(self.keys[1:], slice(0, n))
+
+    def arrays(self, curves=None, top=None, base=None):
+        """(depth, {curve: array}) copies of the selected curves over a depth window, free to modify."""
+        curves = self.keys[1:] if curves is None else [c for c in curves if c != self.index_name]
+        rows = self.window(top, base)
+        return (np.array(self.depth[rows], dtype=np.float64),
+                {c: np.array(self.curve(c)[rows], dtype=np.float64) for c in curves})
+
+    def _frame(self, curves, rows):
+        import pandas as pd
+        index = pd.Index(np.array(self.depth[rows], dtype=np.float64), name=self.index_name)
+        return pd.DataFrame({c: np.array(self.curve(c)[rows]) for c in curves}, index=index)
@@ -0,0 +1,281 @@
+import threading
+import warnings
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+import arps
+import memory_cache
+import parallel
+import smoothing
+
+# Production-table preparation and decline-curve fitting for one or all
+# wellbores.  Fits run on inputs scaled to [0, 1] (time or cumulative, and
+# rate) and the parameters are scaled back afterwards.
+
+WELLBORE_COLUMN = 'NPD_WELL_BORE_NAME'
+DEFAULT_WELLBORE = "15/9-F-14"
+EUR_END_DATE = '2010-12-31'
+EUR_SMOOTHING_WINDOW = 10
+# Economic limit rate of the EUR page predictions
+EUR_RATE_LIMIT = 16500
+
+FIT_COLUMNS = ['Wellbore', 'Model', 'qi', 'Di', 'b', 'R2', 'RMSE', 'Points', 'Error']
+
+# qi, di and b in data units, the model rates at the fitted times, the scaled
+# parameters (used as a warm start) and the number of model evaluations
+RateFit = namedtuple('RateFit', ['qi', 'di', 'b', 'predicted', 'scaled_params', 'nfev'])
+
+FIT_CACHE_BYTES = 64 * 1024 * 1024
+# Last solution per (data, wellbore, model), least recently used first out
+WARM_STARTS = 4096
+_fit_cache = memory_cache.MemoryCache(FIT_CACHE_BYTES)
+_warm_starts = OrderedDict()
+_warm_starts_lock = threading.Lock()
+
+
+def wellbores(df):
+    return sorted(df[WELLBORE_COLUMN].dropna().unique())
+
+
+def default_wellbore_index(names):
+    return names.index(DEFAULT_WELLBORE) if DEFAULT_WELLBORE in names else 0
+
+
+def _producing_oil(df):
+    df = df[df['BORE_OIL_VOL'] != 0].copy()
+    df['days'] = (df['DATEPRD'] - df['DATEPRD'].min()).dt.days
+    return df
+
+
+def _oil_prefix_sums(df, prefix_key):
+    values = df['BORE_OIL_VOL'].to_numpy(dtype=np.float64)
+    if prefix_key is None:
+        return smoothing.PrefixSums(values)
+    return smoothing.get_prefix_sums(prefix_key, values)
+
+
+def prepare_oil_series(df, window_size, prefix_key=None):
+    """Oil production of one wellbore, smoothed as on the DCA page.
+
+    With a prefix_key (e.g. (data hash, wellbore)) the cumulative sums are
+    cached, so moving the window slider does not recompute them.
+    """
+    df = _producing_oil(df)
+    df['smoothed_oil_prod'] = _oil_prefix_sums(df, prefix_key).centered_mean(window_size)
+    df = df.dropna(subset=['smoothed_oil_prod'])
+    return df[np.isfinite(df['smoothed_oil_prod'])]
+
+
+def oil_smoothing_sweep(df, windows, prefix_key=None):
+    """(producing rows with days, smoothed rates for every window as a (windows x rows) array)."""
+    df = _producing_oil(df)
+    return df, _oil_prefix_sums(df, prefix_key).centered_mean(np.asarray(windows))
+
+
+def prepare_gas_series(df, window_size=EUR_SMOOTHING_WINDOW):
+    """Gas production of one wellbore, filtered and smoothed as on the EUR page."""
+    df = df[(df['BORE_GAS_VOL'] > 0) & (df['DATEPRD'] <= EUR_END_DATE)]
+    mean_gas_prod = df['BORE_GAS_VOL'].mean()
+    std_gas_prod = df['BORE_GAS_VOL'].std()
+    df = df[(df['BORE_GAS_VOL'] > mean_gas_prod - 3 * std_gas_prod) &
+            (df['BORE_GAS_VOL'] < mean_gas_prod + 3 * std_gas_prod)].copy()
+    df['smooth_prod'] = smoothing.centered_rolling_mean(df['BORE_GAS_VOL'].to_numpy(dtype=np.float64), window_size)
+    df = df.dropna(subset=['smooth_prod'])
+    df["smooth_cumulative_prod"] = df["smooth_prod"].cumsum()
+    df['DATEPRD'] = pd.to_datetime(df['DATEPRD'])
+    df["days"] = (df["DATEPRD"] - df["DATEPRD"].min()).dt.days
+    return df
+
+
+def goodness_of_fit(observed, predicted):
+    residuals = observed - predicted
+    ss_res = np.sum(residuals ** 2)
+    ss_tot = np.sum((observed - np.mean(observed)) ** 2)
+    r2 = 1 - ss_res / ss_tot if ss_tot > 0 else np.nan
+    return r2, np.sqrt(np.mean(residuals ** 2))
+
+
+def _curve_fit(model, x, y, p0=None):
+    # curve_fit with the analytic Jacobian; returns (params, covariance, nfev)
+    from scipy.optimize import curve_fit
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        params, covariance, info, _, _ = curve_fit(model, x, y, p0=p0, jac=arps.MODEL_JACOBIANS[model],
+                                                   full_output=True)
+    return params, covariance, info['nfev']
+
+
+def fit_rate_model(model_name, T, Q, p0=None):
+    """Fit one rate-time model, optionally warm-started from earlier scaled parameters."""
+    T = np.asarray(T, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    model = arps.RATE_MODELS[model_name]
+    t_max, q_max = np.max(T), np.max(Q)
+    params, _, nfev = _curve_fit(model, T / t_max, Q / q_max, p0)
+    qi, di = params[0] * q_max, params[1] / t_max
+    b = params[2] if len(params) > 2 else None
+    predicted = model(T, qi, di) if b is None else model(T, qi, di, b)
+    return RateFit(qi, di, b, predicted, tuple(params), nfev)
+
+
+def fit_rate_model_cached(data_key, wellbore, window_size, model_name, T, Q):
+    """Memoized fit keyed on (data hash, wellbore, smoothing window, model).
+
+    Misses are warm-started from the last solution for the same wellbore and
+    model, which is usually close when only the smoothing window changed.
+    Returns (RateFit, cache hit).
+    """
+    key = (data_key, wellbore, window_size, model_name)
+    fit = _fit_cache.get(key)
+    if fit is not None:
+        return fit, True
+    warm_key = (data_key, wellbore, model_name)
+    with _warm_starts_lock:
+        p0 = _warm_starts.get(warm_key)
+    try:
+        fit = fit_rate_model(model_name, T, Q, p0)
+    except RuntimeError:
+        if p0 is None:
+            raise
+        fit = fit_rate_model(model_name, T, Q)
+    with _warm_starts_lock:
+        _warm_starts[warm_key] = fit.scaled_params
+        _warm_starts.move_to_end(warm_key)
+        while len(_warm_starts) > WARM_STARTS:
+            _warm_starts.popitem(last=False)
+    _fit_cache.put(key, fit, fit.predicted.nbytes + 1024)
+    return fit, False
+
+
+def fit_rate_models(wellbore, T, Q, models=tuple(arps.RATE_MODELS)):
+    """Worker: fit every rate model to one wellbore, isolating failures per model."""
+    rows = []
+    for model_name in models:
+        row = dict.fromkeys(FIT_COLUMNS)
+        row.update(Wellbore=wellbore, Model=model_name, Points=len(T))
+        try:
+            if len(T) < 3:
+                raise ValueError("Not enough smoothed points to fit")
+            fit = fit_rate_model(model_name, T, Q)
+            r2, rmse = goodness_of_fit(np.asarray(Q, dtype=np.float64), fit.predicted)
+            row.update(qi=fit.qi, Di=fit.di, b=fit.b, R2=r2, RMSE=rmse)
+        except Exception as e:
+            row['Error'] = str(e)
+        rows.append(row)
+    return rows
+
+
+def task_label(task):
+    """(wellbore, points) of a fit task, for the rows of tasks that failed."""
+    return task[0], len(task[1])
+
+
+def rate_fit_tasks(df, window_size):
+    """[(wellbore, T, Q), ...] for fit_rate_models, one per wellbore."""
+    tasks = []
+    for wellbore, df_well in df.groupby(WELLBORE_COLUMN, sort=True):
+        series = prepare_oil_series(df_well, window_size)
+        tasks.append((wellbore, series['days'].to_numpy(), series['smoothed_oil_prod'].to_numpy()))
+    return tasks
+
+
+def rate_fit_table(labels, outcomes):
+    """Table of fit_rate_models outcomes, with task_label() per task; outcomes still
+    None (tasks still running) are left out."""
+    rows = []
+    for (wellbore, points), outcome in zip(labels, outcomes):
+        if outcome is None:
+            continue
+        result, error = outcome
+        if error is not None:
+            result = [dict(dict.fromkeys(FIT_COLUMNS), Wellbore=wellbore, Model=model,
+                           Points=points, Error=str(error)) for model in arps.RATE_MODELS]
+        rows.extend(result)
+    return pd.DataFrame(rows, columns=FIT_COLUMNS)
+
+
+def batch_fit_rate_models(df, window_size, on_progress=None):
+    """Fit exponential, harmonic and hyperbolic models to every wellbore in parallel."""
+    tasks = rate_fit_tasks(df, window_size)
+    return rate_fit_table([task_label(task) for task in tasks],
+                          parallel.map_ordered(fit_rate_models, tasks, on_progress))
+
+
+def fit_rate_from_cum(G, Q, p0=None):
+    """Fit the hyperbolic rate-cumulative model on rates and cumulatives scaled to [0, 1].
+
+    p0 is an optional (qi, Di, b) starting point in data units.  Returns
+    (qi, Di, b, covariance) with the covariance also in data units.
+    """
+    G = np.asarray(G, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    g_max, q_max = np.max(G), np.max(Q)
+    # Gp * Di / qi is dimensionless, so the scaled Di maps back through q_max / g_max
+    scale = np.array([q_max, q_max / g_max, 1.0])
+    if p0 is not None:
+        p0 = np.asarray(p0, dtype=np.float64) / scale
+    params, covariance, _ = _curve_fit(arps.hyperbolic_rate_from_cum, G / g_max, Q / q_max, p0)
+    qi, Di, b = params * scale
+    return qi, Di, b, covariance * np.outer(scale, scale)
+
+
+def fit_eur_well(wellbore, G, Q):
+    """Worker: hyperbolic rate-cumulative fit for one wellbore."""
+    row = dict.fromkeys(FIT_COLUMNS)
+    row.update(Wellbore=wellbore, Model='Hyperbolic (rate vs cumulative)', Points=len(G))
+    try:
+        if len(G) < 3:
+            raise ValueError("Not enough smoothed points to fit")
+        qi, Di, b, _ = fit_rate_from_cum(G, Q)
+        with np.errstate(all='ignore'):
+            predicted = arps.hyperbolic_rate_from_cum(G, qi, Di, b)
+        r2, rmse = goodness_of_fit(np.asarray(Q, dtype=np.float64), predicted)
+        row.update(qi=qi, Di=Di, b=b, R2=r2, RMSE=rmse)
+    except Exception as e:
+        row['Error'] = str(e)
+    return row
+
+
+def eur_fit_tasks(df):
+    """[(wellbore, G, Q), ...] for fit_eur_well, one per wellbore."""
+    tasks = []
+    for wellbore, df_well in df.groupby(WELLBORE_COLUMN, sort=True):
+        series = prepare_gas_series(df_well)
+        tasks.append((wellbore, series['smooth_cumulative_prod'].to_numpy(), series['smooth_prod'].to_numpy()))
+    return tasks
+
+
+def eur_fit_table(labels, outcomes):
+    """Table of fit_eur_well outcomes, as rate_fit_table()."""
+    rows = []
+    for (wellbore, points), outcome in zip(labels, outcomes):
+        if outcome is None:
+            continue
+        row, error = outcome
+        if error is not None:
+            row = dict(dict.fromkeys(FIT_COLUMNS), Wellbore=wellbore, Points=points, Error=str(error))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=FIT_COLUMNS)
+
+
+def batch_fit_eur(df, on_progress=None):
+    """Hyperbolic rate-cumulative fit for every wellbore with gas production, in parallel."""
+    tasks = eur_fit_tasks(df)
+    return eur_fit_table([task_label(task) for task in tasks],
+                         parallel.map_ordered(fit_eur_well, tasks, on_progress))
+
+
+def eur_at_limit(fits, q_limit=EUR_RATE_LIMIT):
+    """batch_fit_eur table with the time to reach q_limit and the cumulative production at it.
+
+    Both are NaN for wellbores that failed or start below the limit.
+    """
+    fits = fits.copy()
+    qi, Di, b = (pd.to_numeric(fits[c], errors='coerce').to_numpy(dtype=np.float64) for c in ('qi', 'Di', 'b'))
+    above = qi > q_limit
+    with np.errstate(all='ignore'):
+        fits['Time to limit'] = np.where(above, arps.hyperbolic_time_from_rate(q_limit, qi, Di, b), np.nan)
+        fits['EUR'] = np.where(above, arps.hyperbolic_cum_from_rate(q_limit, qi, Di, b), np.nan)
+    return fits
@@ -0,0 +1,134 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Level-of-detail decimation for depth-track plots.
+#
+# A track a few hundred pixels tall cannot show 48k samples, so each curve is
+# reduced to a min/max envelope with at most a couple of points per pixel row.
+# Keeping both the minimum and the maximum of every bin (in depth order) keeps
+# spikes visible.  LodPyramid precomputes the envelope at power-of-two bin
+# sizes so zooming into a depth interval only slices an existing level.
+
+# Points kept per pixel row of the track
+OVERSAMPLING = 2
+PYRAMID_CACHE_SIZE = 64
+
+
+class LodPyramid:
+    """Min/max envelope of one curve at bin sizes 1, 2, 4, ... samples."""
+
+    def __init__(self, depth, values):
+        depth = np.asarray(depth, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        self.depth = depth
+        self.decreasing = depth.size > 1 and depth[0] > depth[-1]
+        # Each level holds (index of bin minimum, index of bin maximum) into the raw arrays
+        idx = np.arange(values.size)
+        levels = [(idx, idx)]
+        while levels[-1][0].size > 1:
+            levels.append(_coarsen(values, *levels[-1]))
+        self.values = values
+        self.levels = levels
+
+    def window(self, top, base):
+        """Sample index range [start, stop) covering the depth interval."""
+        depth = self.depth
+        if self.decreasing:
+            reversed_depth = depth[::-1]
+            return (depth.size - np.searchsorted(reversed_depth, base, side='right'),
+                    depth.size - np.searchsorted(reversed_depth, top, side='left'))
+        return np.searchsorted(depth, top, side='left'), np.searchsorted(depth, base, side='right')
+
+    def query(self, top=None, base=None, n_pixels=500):
+        """Return (depth, values) for the interval with about OVERSAMPLING points per pixel."""
+        top = -np.inf if top is None else top
+        base = np.inf if base is None else base
+        start, stop = self.window(top, base)
+        n_samples = max(int(stop - start), 0)
+        budget = max(int(n_pixels) * OVERSAMPLING // 2, 1)
+        level = 0
+        while level + 1 < len(self.levels) and n_samples >> level > budget:
+            level += 1
+        if level == 0:
+            return self.depth[start:stop], self.values[start:stop]
+
+        lo_idx, hi_idx = self.levels[level]
+        first, last = start >> level, (stop - 1) >> level
+        lo_idx, hi_idx = lo_idx[first:last + 1], hi_idx[first:last + 1]
+        # Emit min and max of each bin in sample order, clipped to the window
+        pairs = np.sort(np.stack([lo_idx, hi_idx], axis=1), axis=1).ravel()
+        pairs = pairs[(pairs >= start) & (pairs < stop)]
+        return self.depth[pairs], self.values[pairs]
+
+
+def _coarsen(values, lo_idx, hi_idx):
+    # Merge neighbouring bins pairwise, keeping the index of the smaller minimum
+    # and the larger maximum.  NaN bins lose against any valid sample.
+    if lo_idx.size % 2:
+        lo_idx = np.append(lo_idx, lo_idx[-1])
+        hi_idx = np.append(hi_idx, hi_idx[-1])
+    lo_a, lo_b = lo_idx[0::2], lo_idx[1::2]
+    hi_a, hi_b = hi_idx[0::2], hi_idx[1::2]
+    va, vb = values[lo_a], values[lo_b]
+    lo = np.where((vb < va) | np.isnan(va), lo_b, lo_a)
+    va, vb = values[hi_a], values[hi_b]
+    hi = np.where((vb > va) | np.isnan(va), hi_b, hi_a)
+    return lo, hi
+
+
+def minmax_decimate(depth, values, n_pixels):
+    """One-shot min/max envelope, for data that is not worth a cached pyramid."""
+    return LodPyramid(depth, values).query(n_pixels=n_pixels)
+
+
+_pyramids = OrderedDict()
+_pyramids_lock = threading.Lock()
+
+
+def _array_key(depth, values):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(depth, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def get_pyramid(depth, values):
+    """Return a cached LodPyramid for the curve, building it on first use."""
+    key = _array_key(depth, values)
+    with _pyramids_lock:
+        pyramid = _pyramids.get(key)
+        if pyramid is not None:
+            _pyramids.move_to_end(key)
+            return pyramid
+    pyramid = LodPyramid(depth, values)
+    with _pyramids_lock:
+        _pyramids[key] = pyramid
+        while len(_pyramids) > PYRAMID_CACHE_SIZE:
+            _pyramids.popitem(last=False)
+    return pyramid
+
+
+def axes_pixels(ax):
+    """Height of an axes in display pixels at the figure dpi."""
+    return max(int(ax.get_window_extent().height), 1)
+
+
+def decimate_track(ax, depth, values, top=None, base=None):
+    """Decimated (depth, values) for a vertical depth track drawn on ax."""
+    return get_pyramid(depth, values).query(top, base, axes_pixels(ax))
+
+
+def plot_curve(ax, curve, **kwargs):
+    """Decimated drop-in for welly's Curve.plot(ax=ax, **kwargs)."""
+    ax.set_ylim([curve.stop, curve.start])
+    depth, values = decimate_track(ax, curve.basis, curve.df.to_numpy().ravel())
+    ax.plot(values, depth, **kwargs)
+    ax.set_title(curve.df.columns[0])
+    ax.set_xlabel(curve.units)
+    for label in ax.get_xticklabels():
+        label.set_rotation(90)
+    ax.grid('on', color='k', alpha=0.33, lw=0.33, linestyle='-')
+    return ax
@@ -1,14 +1,33 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-
-@st.cache
-def load_data(file_path):
-    df = pd.read_excel(file_path)
-    return df
-
+import background
+import dca_batch
+import figure_cache
+import instrumentation
+import production_store
+
+MODEL_COLORS = {"Exponential": "blue", "Harmonic": "orange", "Hyperbolic": "red"}
+WINDOW_MIN, WINDOW_MAX, WINDOW_STEP = 50, 300, 10
+
+@instrumentation.instrumented("Load production", rows=len)
+def load_data(file, wellbore=None):
+    return production_store.load_production(file, production_store.DCA_COLUMNS, wellbore=wellbore)
+
+# Function to fit every wellbore as a background job; returns the fits, or None while they are running
+@instrumentation.instrumented("Batch fit", rows=len)
+def batch_fit(store_path, window_size):
+    job = background.submit("dca_batch", ("dca_batch", store_path, window_size), dca_batch.fit_rate_models,
+                            lambda: dca_batch.rate_fit_tasks(load_data(store_path), window_size),
+                            dca_batch.task_label)
+    if not background.show_job(job, "Fitted wellbores",
+                               lambda job: st.dataframe(dca_batch.rate_fit_table(job.labels, job.outcomes()))):
+        return None
+    return dca_batch.rate_fit_table(job.labels, job.outcomes())
+
+@figure_cache.cached_figure
 def plot_data(T, Q, q_model, model_label, color):
     plt.figure(figsize=(8, 6))
     plt.plot(T, Q, label="Smoothed Data", color="green")
@@ -18,16 +37,54 @@ def plot_data(T, Q, q_model, model_label, color):
     plt.title(f"{model_label} Model")
     plt.xlabel("Days")
     plt.ylabel("Smoothed Oil Production")
-    st.pyplot(plt)
-
-def exponential(t, qi, di):
-    return qi * np.exp(-di * t)
-
-def harmonic(t, qi, di):
-    return qi / (1 + di * t)
-
-def hyperbolic(t, qi, di, b):
-    return qi / np.abs((1 + b * di * t)) ** (1 / b)
+    return plt.gcf()
+
+@figure_cache.cached_figure
+def plot_smoothed_production(df_original, window_size):
+    plt.figure(figsize=(6, 6))
+    plt.plot(df_original['DATEPRD'], df_original['BORE_OIL_VOL'], label="Active Production", color='blue', alpha=0.6)
+    plt.plot(df_original['DATEPRD'], df_original['smoothed_oil_prod'], label=f"Smoothed Production ({window_size}-day avg)", color='red', linestyle='--')
+    plt.xlabel("Date")
+    plt.ylabel("BORE_OIL_VOL")
+    plt.xticks(rotation=45)
+    plt.legend()
+    return plt.gcf()
+
+def show_window_sensitivity(df_wellbore, data_key, wellbore, model_option):
+    windows = np.arange(WINDOW_MIN, WINDOW_MAX + 1, WINDOW_STEP)
+    df_producing, smoothed = dca_batch.oil_smoothing_sweep(df_wellbore, windows, prefix_key=(data_key, wellbore))
+    days = df_producing['days'].to_numpy()
+
+    st.subheader("Smoothed Production for Every Window Size")
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.plot(df_producing['DATEPRD'], smoothed.T, lw=0.8, alpha=0.6)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Smoothed Oil Production")
+    st.pyplot(fig)
+
+    st.subheader(f"{model_option} Parameters vs Window Size")
+    rows = []
+    for window, series in zip(windows, smoothed):
+        valid = np.isfinite(series)
+        try:
+            fit, _ = dca_batch.fit_rate_model_cached(data_key, wellbore, int(window), model_option,
+                                                     days[valid], series[valid])
+        except (RuntimeError, ValueError):
+            continue
+        rows.append({"window": window, "qi": fit.qi, "di": fit.di, "b": fit.b})
+    sensitivity = pd.DataFrame(rows)
+    if sensitivity.empty:
+        st.warning("No window size produced a successful fit.")
+        return
+    fig, axes = plt.subplots(ncols=2, figsize=(10, 4))
+    axes[0].plot(sensitivity["window"], sensitivity["qi"], marker='o')
+    axes[0].set_xlabel("Window size")
+    axes[0].set_ylabel("qi")
+    axes[1].plot(sensitivity["window"], sensitivity["di"], marker='o', color='red')
+    axes[1].set_xlabel("Window size")
+    axes[1].set_ylabel("di")
+    plt.tight_layout()
+    st.pyplot(fig)
 
 def show_page():
     st.title("Decline Curve Analysis (DCA)")
@@ -35,25 +92,32 @@ def show_page():
     file = st.file_uploader("Upload an Excel File", type="xlsx")
 
     if file:
-        df_original = load_data(file)
-        df_original = df_original[df_original['NPD_WELL_BORE_NAME'] == "15/9-F-14"]
-        df_original = df_original[df_original['BORE_OIL_VOL'] != 0]
-        df_original['days'] = (df_original['DATEPRD'] - df_original['DATEPRD'].min()).dt.days
+        with instrumentation.stage("Convert workbook"):
+            store_path = production_store.store_path(file)
+        wellbores = production_store.wellbores(store_path)
+        mode = st.radio("Analysis mode", ["Single wellbore", "All wellbores (batch)"], horizontal=True)
+        window_size = st.slider("Select Rolling Mean Window Size", min_value=WINDOW_MIN, max_value=WINDOW_MAX,
+                                step=WINDOW_STEP, value=150)
+
+        if mode == "All wellbores (batch)":
+            st.subheader("Decline Curve Fits for All Wellbores")
+            fits = batch_fit(store_path, window_size)
+            if fits is not None:
+                st.dataframe(fits)
+            wellbore = st.selectbox("Drill into wellbore", wellbores,
+                                    index=dca_batch.default_wellbore_index(wellbores))
+        else:
+            background.cancel("dca_batch")
+            wellbore = st.selectbox("Select wellbore", wellbores,
+                                    index=dca_batch.default_wellbore_index(wellbores))
 
-        window_size = st.slider("Select Rolling Mean Window Size", min_value=50, max_value=300, step=10, value=150)
-        df_original['smoothed_oil_prod'] = df_original['BORE_OIL_VOL'].rolling(window=window_size, center=True).mean()
-        df_original = df_original.dropna(subset=['smoothed_oil_prod'])
-        df_original = df_original[np.isfinite(df_original['smoothed_oil_prod'])]
+        data_key = os.path.basename(store_path)
+        df_wellbore = load_data(store_path, wellbore)
+        with instrumentation.stage("Smooth production", rows=len(df_wellbore)):
+            df_original = dca_batch.prepare_oil_series(df_wellbore, window_size, prefix_key=(data_key, wellbore))
 
         st.subheader("Smoothed Oil Production")
-        plt.figure(figsize=(6, 6))
-        plt.plot(df_original['DATEPRD'], df_original['BORE_OIL_VOL'], label="Active Production", color='blue', alpha=0.6)
-        plt.plot(df_original['DATEPRD'], df_original['smoothed_oil_prod'], label=f"Smoothed Production ({window_size}-day avg)", color='red', linestyle='--')
-        plt.xlabel("Date")
-        plt.ylabel("BORE_OIL_VOL")
-        plt.xticks(rotation=45)
-        plt.legend()
-        st.pyplot(plt)
+        plot_smoothed_production(df_original[['DATEPRD', 'BORE_OIL_VOL', 'smoothed_oil_prod']], window_size)
 
         model_option = st.selectbox("Select Decline Curve Model", ["Exponential", "Harmonic", "Hyperbolic"])
 
@@ -65,35 +129,18 @@ def show_page():
         if np.any(np.isnan(T_norm)) or np.any(np.isnan(Q_norm)) or np.any(np.isinf(T_norm)) or np.any(np.isinf(Q_norm)):
             st.error("Data contains NaN or Inf values, which are not allowed for curve fitting.")
         else:
-            if model_option == "Exponential":
-                st.subheader("Exponential Model")
-                params, _ = curve_fit(exponential, T_norm, Q_norm)
-                qi, di = params
-                qi = qi * max(Q)
-                di = di / max(T)
-                q_exp = exponential(T, qi, di)
-                plot_data(T, Q, q_exp, "Exponential", "blue")
-                st.write(f"Exponential Model Parameters: qi = {qi:.2f}, di = {di:.4f}")
-
-            elif model_option == "Harmonic":
-                st.subheader("Harmonic Model")
-                params, _ = curve_fit(harmonic, T_norm, Q_norm)
-                qi, di = params
-                qi = qi * max(Q)
-                di = di / max(T)
-                q_harmonic = harmonic(T, qi, di)
-                plot_data(T, Q, q_harmonic, "Harmonic", "orange")
-                st.write(f"Harmonic Model Parameters: qi = {qi:.2f}, di = {di:.4f}")
-
-            elif model_option == "Hyperbolic":
-                st.subheader("Hyperbolic Model")
-                params, _ = curve_fit(hyperbolic, T_norm, Q_norm)
-                qi, di, b = params
-                qi = qi * max(Q)
-                di = di / max(T)
-                q_hp = hyperbolic(T, qi, di, b)
-                plot_data(T, Q, q_hp, "Hyperbolic", "red")
-                st.write(f"Hyperbolic Model Parameters: qi = {qi:.2f}, di = {di:.4f}, b = {b:.4f}")
+            st.subheader(f"{model_option} Model")
+            with instrumentation.stage("curve_fit", rows=len(T)):
+                fit, cached = dca_batch.fit_rate_model_cached(data_key, wellbore, window_size, model_option, T, Q)
+            plot_data(T, Q, fit.predicted, model_option, MODEL_COLORS[model_option])
+            if fit.b is None:
+                st.write(f"{model_option} Model Parameters: qi = {fit.qi:.2f}, di = {fit.di:.4f}")
+            else:
+                st.write(f"{model_option} Model Parameters: qi = {fit.qi:.2f}, di = {fit.di:.4f}, b = {fit.b:.4f}")
+            st.caption("Reused a cached fit" if cached else f"Fitted in {fit.nfev} model evaluations")
+
+            if st.checkbox("Show window sensitivity"):
+                show_window_sensitivity(df_wellbore, data_key, wellbore, model_option)
 
 if __name__ == "__main__":
     show_page()
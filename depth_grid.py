@@ -0,0 +1,167 @@
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Project-level curve matrix on one shared depth grid.
+#
+# Every selected curve of every well is resampled onto a common depth grid in
+# one vectorized pass, giving a dense wells x depth x curves array that the
+# statistics, correlation and plotting code can reduce along any axis without
+# looping over wells.  Mnemonics are matched through an alias table so that
+# e.g. DEN and RHOB land in the same slot.
+
+CURVE_ALIASES = {
+    'GR': ['GR', 'GRC', 'SGR', 'CGR', 'GAM'],
+    'RHOB': ['RHOB', 'DEN', 'RHOZ', 'ZDEN', 'DENS'],
+    'NPHI': ['NPHI', 'NEU', 'TNPH', 'CNC', 'NPOR'],
+    'DT': ['DT', 'DTC', 'AC', 'DTCO'],
+    'RDEP': ['RDEP', 'ILD', 'LLD', 'RD', 'RT', 'RLA5'],
+    'DRHO': ['DRHO', 'DCOR', 'ZCOR'],
+    'CALI': ['CALI', 'CAL', 'HCAL'],
+    'PHIF': ['PHIF', 'PHIE', 'PHIT'],
+}
+
+CurveMatrix = namedtuple('CurveMatrix', ['wells', 'depth', 'mnemonics', 'values'])
+
+
+def resolve_mnemonic(available, name, aliases=CURVE_ALIASES):
+    """Return the first mnemonic in `available` matching `name` or one of its aliases."""
+    candidates = aliases.get(name.upper())
+    if candidates is None:
+        candidates = next((group for group in aliases.values() if name.upper() in group), [])
+    upper = {m.upper(): m for m in available}
+    for candidate in [name] + candidates:
+        if candidate.upper() in upper:
+            return upper[candidate.upper()]
+    return None
+
+
+def well_series(well, mnemonics, aliases=CURVE_ALIASES):
+    """(name, {canonical mnemonic: (depth, values)}) for a welly Well."""
+    series = {}
+    for name in mnemonics:
+        mnemonic = resolve_mnemonic(well.data.keys(), name, aliases)
+        if mnemonic is not None:
+            curve = well.data[mnemonic]
+            series[name] = (np.asarray(curve.basis, dtype=np.float64),
+                            curve.df.to_numpy(dtype=np.float64).ravel())
+    return well.name, series
+
+
+def las_series(name, las, mnemonics, aliases=CURVE_ALIASES):
+    """(name, {canonical mnemonic: (depth, values)}) for a LasData or CurveStore."""
+    series = {}
+    for canonical in mnemonics:
+        mnemonic = resolve_mnemonic(las.keys[1:], canonical, aliases)
+        if mnemonic is not None:
+            series[canonical] = (np.asarray(las.depth, dtype=np.float64),
+                                 np.asarray(las.curve(mnemonic), dtype=np.float64))
+    return name, series
+
+
+def common_grid(all_series, step=None, top=None, base=None):
+    """Shared grid spanning every series, at the finest step unless given."""
+    depths = [depth for _, series in all_series for depth, _ in series.values() if depth.size]
+    if not depths:
+        return np.empty(0)
+    if step is None:
+        step = min(np.nanmedian(np.abs(np.diff(d))) for d in depths if d.size > 1)
+    top = min(np.nanmin(d) for d in depths) if top is None else top
+    base = max(np.nanmax(d) for d in depths) if base is None else base
+    n = int(np.floor((base - top) / step + 1e-9)) + 1
+    return top + step * np.arange(n)
+
+
+def _regular(depth):
+    # (start, step) for a regularly sampled series, or None.
+    if depth.size < 2:
+        return None
+    diffs = np.diff(depth)
+    step = diffs[0]
+    if step == 0 or not np.allclose(diffs, step, rtol=1e-4, atol=1e-6):
+        return None
+    return depth[0], step
+
+
+def build_curve_matrix(all_series, mnemonics, grid=None, step=None, top=None, base=None):
+    """Resample every (well, curve) series onto one grid.
+
+    all_series is a list of (well name, {mnemonic: (depth, values)}) as built
+    by well_series / las_series.  Returns a CurveMatrix whose values array has
+    shape (wells, depth, curves), NaN where a well lacks a curve or has no data.
+    """
+    if grid is None:
+        grid = common_grid(all_series, step, top, base)
+    n_wells, n_curves = len(all_series), len(mnemonics)
+    values = np.full((n_wells, grid.size, n_curves), np.nan)
+
+    # Regularly sampled series (the normal LAS case) are resampled together:
+    # pad them into one (series x samples) array and gather with fractional
+    # indices computed for all series at once.
+    regular, irregular = [], []
+    for w, (_, series) in enumerate(all_series):
+        for c, mnemonic in enumerate(mnemonics):
+            if mnemonic not in series:
+                continue
+            depth, data = series[mnemonic]
+            sampling = _regular(depth)
+            (regular if sampling else irregular).append((w, c, depth, data, sampling))
+
+    if regular:
+        length = max(data.size for _, _, _, data, _ in regular)
+        padded = np.full((len(regular), length), np.nan)
+        starts = np.empty(len(regular))
+        steps = np.empty(len(regular))
+        sizes = np.empty(len(regular), dtype=np.int64)
+        for k, (_, _, _, data, (start, step_k)) in enumerate(regular):
+            padded[k, :data.size] = data
+            starts[k], steps[k], sizes[k] = start, step_k, data.size
+        position = (grid[None, :] - starts[:, None]) / steps[:, None]
+        inside = (position >= -1e-9) & (position <= (sizes - 1)[:, None] + 1e-9)
+        position = np.clip(position, 0, (sizes - 1)[:, None])
+        lower = np.floor(position).astype(np.int64)
+        frac = position - lower
+        upper = np.minimum(lower + 1, (sizes - 1)[:, None])
+        resampled = (np.take_along_axis(padded, lower, axis=1) * (1 - frac)
+                     + np.take_along_axis(padded, upper, axis=1) * frac)
+        # Keep exact samples even when the neighbour is NaN
+        exact = frac == 0
+        resampled[exact] = np.take_along_axis(padded, lower, axis=1)[exact]
+        resampled[~inside] = np.nan
+        wells_idx = np.array([w for w, _, _, _, _ in regular])
+        curves_idx = np.array([c for _, c, _, _, _ in regular])
+        values[wells_idx, :, curves_idx] = resampled
+
+    for w, c, depth, data, _ in irregular:
+        order = np.argsort(depth)
+        depth, data = depth[order], data[order]
+        resampled = np.interp(grid, depth, data, left=np.nan, right=np.nan)
+        values[w, :, c] = resampled
+
+    return CurveMatrix([name for name, _ in all_series], grid, list(mnemonics), values)
+
+
+def curve_statistics(matrix):
+    """Per well and curve summary statistics computed on the dense array."""
+    values = matrix.values
+    # All-NaN (well, curve) slots just produce NaN statistics
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        stats = {
+            'count': np.sum(~np.isnan(values), axis=1),
+            'mean': np.nanmean(values, axis=1),
+            'std': np.nanstd(values, axis=1),
+            'P10': np.nanpercentile(values, 10, axis=1),
+            'P50': np.nanpercentile(values, 50, axis=1),
+            'P90': np.nanpercentile(values, 90, axis=1),
+        }
+    index = pd.MultiIndex.from_product([matrix.wells, matrix.mnemonics], names=['Well', 'Curve'])
+    return pd.DataFrame({name: stat.ravel() for name, stat in stats.items()}, index=index)
+
+
+def well_correlation(matrix, mnemonic):
+    """Pairwise (NaN-aware) correlation between wells for one curve on the shared grid."""
+    c = matrix.mnemonics.index(mnemonic)
+    return pd.DataFrame(matrix.values[:, :, c].T, columns=matrix.wells).corr()
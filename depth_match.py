@@ -0,0 +1,157 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Core-to-log depth matching.
+#
+# Core and log are resampled onto one regular grid and the bulk depth shift is
+# the lag with the highest Pearson correlation, computed for every lag at once
+# with FFT cross-correlations.  Missing samples are masked out and the
+# correlation at each lag only uses the overlapping samples, so sparse core
+# plugs and log gaps do not bias the result.  Piecewise shifts repeat the
+# estimate on consecutive core intervals around the bulk shift.
+#
+# Sign convention: core depth + shift = log depth.
+
+DepthShift = namedtuple('DepthShift', ['shift', 'correlation', 'lags', 'scores'])
+
+# Fewest overlapping samples for a lag to be scored
+MIN_OVERLAP = 5
+
+
+def sample_step(depth):
+    """Median spacing of a depth array (1.0 without any)."""
+    depth = np.asarray(depth, dtype=np.float64)
+    diffs = np.abs(np.diff(depth[np.isfinite(depth)]))
+    diffs = diffs[diffs > 0]
+    return float(np.median(diffs)) if diffs.size else 1.0
+
+
+def resample(depth, values, grid):
+    """Linear resampling of values onto grid, NaN outside the data and where values are missing."""
+    depth = np.asarray(depth, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(depth) & np.isfinite(values)
+    depth, values = depth[valid], values[valid]
+    if depth.size < 2:
+        return np.full(grid.shape, np.nan)
+    order = np.argsort(depth, kind='stable')
+    return np.interp(grid, depth[order], values[order], left=np.nan, right=np.nan)
+
+
+def _correlate(a, b, n_fft):
+    # sum_i a[i] * b[i + lag] for every lag, via FFT; lag 0 at index 0, negative lags wrap
+    return np.fft.irfft(np.conj(np.fft.rfft(a, n_fft)) * np.fft.rfft(b, n_fft), n_fft)
+
+
+def masked_correlation(x, y, max_lag):
+    """Pearson correlation of x against y shifted by each lag in [-max_lag, max_lag].
+
+    NaN marks missing samples in either series; each lag uses only the
+    samples present in both.  Returns (lags, scores) with NaN scores for lags
+    with fewer than MIN_OVERLAP overlapping samples.  y may also be a
+    (series x samples) array, scored against x all at once; scores then
+    has one row per series.
+    """
+    mx, my = np.isfinite(x), np.isfinite(y)
+    x0, y0 = np.where(mx, x, 0.0), np.where(my, y, 0.0)
+    mx, my = mx.astype(np.float64), my.astype(np.float64)
+    n_fft = 1 << int(np.ceil(np.log2(x.shape[-1] + y.shape[-1])))
+    n = _correlate(mx, my, n_fft)
+    sx, sy = _correlate(x0, my, n_fft), _correlate(mx, y0, n_fft)
+    sxx, syy = _correlate(x0 * x0, my, n_fft), _correlate(mx, y0 * y0, n_fft)
+    sxy = _correlate(x0, y0, n_fft)
+    lags = np.arange(-max_lag, max_lag + 1)
+    idx = lags % n_fft
+    n, sx, sy, sxx, syy, sxy = (a[..., idx] for a in (np.rint(n), sx, sy, sxx, syy, sxy))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var = (sxx - sx * sx / n) * (syy - sy * sy / n)
+        scores = cov / np.sqrt(var)
+    scores[(n < MIN_OVERLAP) | ~(var > 0)] = np.nan
+    return lags, scores
+
+
+def estimate_shift(core_depth, core_values, log_depth, log_values, max_shift=10.0, step=None,
+                   center=0.0):
+    """Bulk depth shift (within center +/- max_shift) that best aligns core with log."""
+    core_depth = np.asarray(core_depth, dtype=np.float64)
+    step = step or sample_step(log_depth)
+    top = np.nanmin(core_depth) + center - max_shift
+    base = np.nanmax(core_depth) + center + max_shift
+    grid = np.arange(top, base + step / 2, step)
+    max_lag = int(round(max_shift / step))
+    # Core is placed on the grid already moved by center, so lags are relative to it
+    core = resample(core_depth + center, core_values, grid)
+    log = resample(log_depth, log_values, grid)
+    lags, scores = masked_correlation(core, log, max_lag)
+    if np.all(np.isnan(scores)):
+        return DepthShift(np.nan, np.nan, center + lags * step, scores)
+    best = int(np.nanargmax(scores))
+    offset = 0.0
+    if 0 < best < scores.size - 1 and np.all(np.isfinite(scores[best - 1:best + 2])):
+        # Parabolic refinement of the peak to a fraction of a grid step
+        left, peak, right = scores[best - 1:best + 2]
+        denominator = left - 2 * peak + right
+        if denominator < 0:
+            offset = 0.5 * (left - right) / denominator
+    return DepthShift(center + (lags[best] + offset) * step, scores[best], center + lags * step, scores)
+
+
+def estimate_piecewise_shifts(core_depth, core_values, log_depth, log_values, n_segments=3,
+                              max_shift=10.0, max_local_shift=2.0, step=None):
+    """Shifts for consecutive core intervals, each searched around the bulk shift.
+
+    Returns (bulk DepthShift, segment centers, segment shifts); a segment
+    that cannot be matched keeps the bulk shift.
+    """
+    core_depth = np.asarray(core_depth, dtype=np.float64)
+    core_values = np.asarray(core_values, dtype=np.float64)
+    bulk = estimate_shift(core_depth, core_values, log_depth, log_values, max_shift, step)
+    edges = np.linspace(np.nanmin(core_depth), np.nanmax(core_depth), n_segments + 1)
+    centers, shifts = [], []
+    for top, base in zip(edges[:-1], edges[1:]):
+        inside = (core_depth >= top) & (core_depth <= base)
+        local = estimate_shift(core_depth[inside], core_values[inside], log_depth, log_values,
+                               max_local_shift, step, center=bulk.shift)
+        centers.append((top + base) / 2)
+        shifts.append(local.shift if np.isfinite(local.shift) else bulk.shift)
+    return bulk, np.array(centers), np.array(shifts)
+
+
+def apply_shifts(core_depth, centers, shifts):
+    """Shifted core depths; shifts at the segment centers are interpolated in between."""
+    core_depth = np.asarray(core_depth, dtype=np.float64)
+    return core_depth + np.interp(core_depth, np.atleast_1d(centers), np.atleast_1d(shifts))
+
+
+def nearest_index(depth, targets):
+    """Index of the nearest sample of a monotonic depth array for every target, and its distance."""
+    depth = np.asarray(depth, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    decreasing = depth.size > 1 and depth[0] > depth[-1]
+    sorted_depth = depth[::-1] if decreasing else depth
+    right = np.clip(np.searchsorted(sorted_depth, targets), 1, depth.size - 1)
+    left = right - 1
+    nearer_left = np.abs(targets - sorted_depth[left]) <= np.abs(sorted_depth[right] - targets)
+    idx = np.where(nearer_left, left, right)
+    distance = np.abs(sorted_depth[idx] - targets)
+    if decreasing:
+        idx = depth.size - 1 - idx
+    return idx, distance
+
+
+def join_nearest(core_data, depth_column, log_depth, log_curves, tolerance=None):
+    """Core table with the nearest log sample of every curve in log_curves ({name: array}) appended.
+
+    Samples further than tolerance from any log depth get NaN.
+    """
+    idx, distance = nearest_index(log_depth, core_data[depth_column].to_numpy(dtype=np.float64))
+    missing = np.isnan(distance)
+    if tolerance is not None:
+        missing |= distance > tolerance
+    joined = core_data.copy()
+    joined['LOG_DEPTH'] = np.where(missing, np.nan, np.asarray(log_depth, dtype=np.float64)[idx])
+    for name, values in log_curves.items():
+        joined[name] = np.where(missing, np.nan, np.asarray(values, dtype=np.float64)[idx])
+    return joined
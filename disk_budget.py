@@ -0,0 +1,74 @@
+import os
+import shutil
+
+# Disk budget of the on-disk stores (converted LAS files, upscaled curves and
+# production workbooks).
+#
+# Every store directory holds one entry (a file or a directory) per distinct
+# input.  Opening an entry touches its mtime, and after writing a new one the
+# least recently used entries are removed until the directory fits in the
+# budget, which can be set with the PETRO_STORE_MB environment variable.  A
+# page reopens its store on every rerun, so an entry removed in between is
+# converted again on the next use.  Names starting with '.' are writes in
+# progress and are left alone.
+
+DEFAULT_BUDGET_MB = 2048
+
+
+def budget_bytes():
+    return int(float(os.environ.get('PETRO_STORE_MB', DEFAULT_BUDGET_MB)) * 2**20)
+
+
+def entry_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for directory, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+def touch(path):
+    """Mark an entry as just used; False if it is gone."""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def trim(root, keep=None, max_bytes=None):
+    """Remove the least recently used entries of root beyond max_bytes (budget_bytes()),
+    never the entry at path keep; returns the removed paths."""
+    max_bytes = budget_bytes() if max_bytes is None else max_bytes
+    entries = []
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    for name in names:
+        path = os.path.join(root, name)
+        if name.startswith('.'):
+            continue
+        try:
+            entries.append((os.path.getmtime(path), entry_size(path), path))
+        except OSError:
+            # Removed by another session meanwhile
+            continue
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        removed.append(path)
+    return removed
@@ -2,32 +2,30 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
+import background
+import dca_batch
+import eur_probabilistic
+import figure_cache
+import instrumentation
+import production_store
+from arps import hyperbolic_rate_from_cum, hyperbolic_cum_from_rate, hyperbolic_time_from_rate
 
-@st.cache
-def load_file(file_path):
-    df = pd.read_excel(file_path)
-    return df
+@instrumentation.instrumented("Load production", rows=len)
+def load_file(file, wellbore=None):
+    return production_store.load_production(file, production_store.EUR_COLUMNS, wellbore=wellbore,
+                                            end=dca_batch.EUR_END_DATE)
 
-def hyperbolic_rate_from_cum(Gp, qi, Di, b):
-    if b != 1:
-        t1 = qi ** (1 - b)
-        t2 = Gp * Di * (1 - b) / (qi ** b)
-        Qt = (t1 - t2) ** (1 / (1 - b))
-    else:
-        Qt = qi * np.exp(-(Gp * Di) / qi)
-    return Qt
-
-def hyperbolic_cum_from_rate(q, qi, Di, b):
-    if b != 1:
-        Gp = (qi ** (1 - b)) * (q ** b) / (Di * (1 - b)) - (q ** (1 - b))
-    else:
-        Gp = (qi / Di) * np.log(qi / q)
-    return Gp
-
-def hyperbolic_time_from_rate(q, qi, Di, b):
-    return ((qi / q) ** b - 1) / (b * Di)
+# Function to fit every wellbore as a background job; returns the fits, or None while they are running
+@instrumentation.instrumented("Batch fit", rows=len)
+def batch_fit(store_path):
+    job = background.submit("eur_batch", ("eur_batch", store_path), dca_batch.fit_eur_well,
+                            lambda: dca_batch.eur_fit_tasks(load_file(store_path)), dca_batch.task_label)
+    if not background.show_job(job, "Fitted wellbores",
+                               lambda job: st.dataframe(dca_batch.eur_fit_table(job.labels, job.outcomes()))):
+        return None
+    return dca_batch.eur_fit_table(job.labels, job.outcomes())
 
+@figure_cache.cached_figure
 def plot_data(G_gas, Q_gas, qi_ghy, Di_ghy, b_ghy):
     plt.figure(figsize=(12, 8))
     plt.plot(G_gas, Q_gas, label='Smoothed Gas Production', color='blue', marker='o', linestyle='-', markersize=2)
@@ -39,45 +37,107 @@ def plot_data(G_gas, Q_gas, qi_ghy, Di_ghy, b_ghy):
     plt.grid(which="major", color="#6666", linestyle="-", alpha=0.5)
     plt.grid(which="minor", color="#9999", linestyle="-", alpha=0.1)
     plt.minorticks_on()
-    st.pyplot(plt)
+    return plt.gcf()
+
+SAMPLING_METHODS = ["Fit covariance", "Residual bootstrap"]
+
+@instrumentation.instrumented("Sample parameters", rows=len)
+@st.cache_data(show_spinner="Sampling decline parameters...")
+def sample_parameters(G_gas, Q_gas, params, covariance, method, n_samples):
+    if method == "Residual bootstrap":
+        return eur_probabilistic.bootstrap_samples(G_gas, Q_gas, params, n_samples, seed=0)
+    return eur_probabilistic.covariance_samples(params, covariance, n_samples, seed=0)
+
+@figure_cache.cached_figure
+def plot_fan(G_gas, Q_gas, G_grid, rates):
+    plt.figure(figsize=(12, 8))
+    plt.plot(G_gas, Q_gas, label='Smoothed Gas Production', color='blue', marker='o', linestyle='-', markersize=2)
+    plt.fill_between(G_grid, rates['P90'], rates['P10'], color='red', alpha=0.2, label='P90-P10')
+    plt.plot(G_grid, rates['P50'], color='red', linestyle='--', label='P50')
+    plt.xlabel('Cumulative Gas Production', fontsize=14)
+    plt.ylabel('Gas Production Rate', fontsize=14)
+    plt.title('Hyperbolic Model Uncertainty', fontsize=16)
+    plt.legend()
+    plt.grid(which="major", color="#6666", linestyle="-", alpha=0.5)
+    return plt.gcf()
+
+@figure_cache.cached_figure
+def plot_eur_vs_limit(q_limits, eur):
+    plt.figure(figsize=(12, 6))
+    plt.fill_between(q_limits, eur['P90'], eur['P10'], color='green', alpha=0.2, label='P90-P10')
+    plt.plot(q_limits, eur['P50'], color='green', label='P50')
+    plt.xlabel('Economic Limit Rate', fontsize=14)
+    plt.ylabel('EUR', fontsize=14)
+    plt.title('EUR vs Economic Limit', fontsize=16)
+    plt.legend()
+    plt.grid(which="major", color="#6666", linestyle="-", alpha=0.5)
+    return plt.gcf()
+
+def show_probabilistic(G_gas, Q_gas, params, covariance, q_max):
+    st.subheader("Probabilistic EUR")
+    method = st.radio("Sampling method", SAMPLING_METHODS, horizontal=True)
+    default = (eur_probabilistic.DEFAULT_BOOTSTRAP_SAMPLES if method == "Residual bootstrap"
+               else eur_probabilistic.DEFAULT_SAMPLES)
+    n_samples = int(st.number_input("Number of samples", min_value=100, max_value=50000, value=default, step=100))
+    try:
+        samples = sample_parameters(G_gas.to_numpy(), Q_gas.to_numpy(), tuple(params), covariance, method, n_samples)
+    except (ValueError, RuntimeError) as e:
+        st.error(str(e))
+        return
+    st.caption(f"{len(samples)} of {n_samples} sampled parameter sets are physical (qi, Di, b > 0)")
+
+    # Economic limits around q_max, with q_max itself in the middle
+    q_limits = np.linspace(0.5 * q_max, 1.5 * q_max, 41)
+    eur, time = eur_probabilistic.eur_distribution(samples, q_limits)
+    at_limit = q_limits.size // 2
+    eur_p = eur_probabilistic.percentiles(eur)
+    time_p = eur_probabilistic.percentiles(time)
+    st.dataframe(pd.DataFrame({
+        f"EUR at {q_max} (MMSCF)": {name: values[at_limit] for name, values in eur_p.items()},
+        "Time to limit (days)": {name: values[at_limit] for name, values in time_p.items()},
+    }))
+
+    G_end = np.nanmax([np.max(G_gas), eur_p['P10'][at_limit]])
+    G_grid = np.linspace(0, G_end, 200)
+    plot_fan(G_gas, Q_gas, G_grid, eur_probabilistic.percentiles(eur_probabilistic.rate_distribution(samples, G_grid)))
+    plot_eur_vs_limit(q_limits, eur_p)
 
 def show_page():
     st.title("Hyperbolic Model for Gas Production")
     file = st.file_uploader("Upload the Excel file ('Volve production data.xlsx')", type="xlsx")
 
     if file:
-        df = load_file(file)
-        df = df[df['NPD_WELL_BORE_NAME'] == "15/9-F-14"]
-        df = df[(df['BORE_GAS_VOL'] > 0) & (df['DATEPRD'] <= '2010-12-31')]
-        mean_gas_prod = df['BORE_GAS_VOL'].mean()
-        std_gas_prod = df['BORE_GAS_VOL'].std()
-        df = df[(df['BORE_GAS_VOL'] > mean_gas_prod - 3 * std_gas_prod) & (df['BORE_GAS_VOL'] < mean_gas_prod + 3 * std_gas_prod)]
-        df['smooth_prod'] = df['BORE_GAS_VOL'].rolling(window=10, center=True).mean()
-        df = df.dropna(subset=['smooth_prod'])
-        df["smooth_cumulative_prod"] = df["smooth_prod"].cumsum()
-        df['DATEPRD'] = pd.to_datetime(df['DATEPRD'])
-        df["days"] = (df["DATEPRD"] - df["DATEPRD"].min()).dt.days
-        T_gas = df["days"]
+        with instrumentation.stage("Convert workbook"):
+            store_path = production_store.store_path(file)
+        wellbores = production_store.wellbores(store_path)
+        if st.checkbox("Fit all wellbores (batch)"):
+            st.subheader("Hyperbolic Fits for All Wellbores")
+            fits = batch_fit(store_path)
+            if fits is not None:
+                st.dataframe(fits)
+        else:
+            background.cancel("eur_batch")
+        wellbore = st.selectbox("Select wellbore", wellbores, index=dca_batch.default_wellbore_index(wellbores))
+        df = load_file(store_path, wellbore)
+        with instrumentation.stage("Smooth production", rows=len(df)):
+            df = dca_batch.prepare_gas_series(df)
         Q_gas = df["smooth_prod"]
         G_gas = df["smooth_cumulative_prod"]
-        T_normal = T_gas / max(T_gas)
-        Q_normal = Q_gas / max(Q_gas)
-        G_normal = G_gas / max(G_gas)
-        params, covariance = curve_fit(hyperbolic_rate_from_cum, G_normal, Q_normal)
-        qi_ghy, Di_ghy, b_ghy = params
-        qi_ghy = qi_ghy * max(Q_gas)
-        Di_ghy = Di_ghy / max(T_gas)
+        with instrumentation.stage("curve_fit", rows=len(G_gas)):
+            qi_ghy, Di_ghy, b_ghy, covariance = dca_batch.fit_rate_from_cum(G_gas, Q_gas)
         st.subheader("Model Parameters")
         st.write(f"Initial gas flow rate (qi): {qi_ghy:.2f}")
         st.write(f"Initial decline rate (Di): {Di_ghy:.6f}")
         st.write(f"Arps' Decline Curve Exponent (b): {b_ghy:.4f}")
         plot_data(G_gas, Q_gas, qi_ghy, Di_ghy, b_ghy)
-        q_max = 16500
+        q_max = dca_batch.EUR_RATE_LIMIT
         time_to = hyperbolic_time_from_rate(q_max, qi_ghy, Di_ghy, b_ghy)
         cumulative_at = hyperbolic_cum_from_rate(q_max, qi_ghy, Di_ghy, b_ghy)
         st.subheader("Prediction Results")
         st.write(f"Time to reach {q_max} MMSCF of gas production per day: {time_to:.2f} days")
         st.write(f"Cumulative production at that time: {cumulative_at:.2f} MMSCF")
+        if st.checkbox("Probabilistic EUR (P10/P50/P90)"):
+            show_probabilistic(G_gas, Q_gas, (qi_ghy, Di_ghy, b_ghy), covariance, q_max)
 
 if __name__ == "__main__":
     show_page()
@@ -0,0 +1,104 @@
+import warnings
+
+import numpy as np
+
+import arps
+import dca_batch
+import parallel
+
+# Probabilistic EUR for the hyperbolic rate-cumulative model.
+#
+# Parameter uncertainty is carried as an (n, 3) array of (qi, Di, b) samples,
+# drawn either from the curve_fit covariance or from residual-bootstrap refits
+# spread across the process pool.  EUR and time to every economic-limit rate
+# are then evaluated for all samples in one broadcast (samples x rates).
+#
+# Percentiles follow the reserves convention: P90 is the low case (exceeded
+# with 90 % probability) and P10 the high case.
+
+DEFAULT_SAMPLES = 5000
+DEFAULT_BOOTSTRAP_SAMPLES = 500
+BOOTSTRAP_CHUNK = 50
+EXCEEDANCE = {'P90': 10, 'P50': 50, 'P10': 90}
+
+
+def _physical(samples):
+    # Keep draws with positive qi, Di and b
+    finite = np.all(np.isfinite(samples), axis=1)
+    return samples[finite & np.all(np.nan_to_num(samples) > 0, axis=1)]
+
+
+def covariance_samples(params, covariance, n=DEFAULT_SAMPLES, seed=None):
+    """(n, 3) draws from the normal approximation around the fit, non-physical draws dropped."""
+    covariance = np.asarray(covariance, dtype=np.float64)
+    if not np.all(np.isfinite(covariance)):
+        raise ValueError("The fit did not return a usable covariance; use the residual bootstrap instead")
+    rng = np.random.default_rng(seed)
+    # eigh tolerates the nearly singular covariances typical of Arps fits
+    samples = rng.multivariate_normal(np.asarray(params, dtype=np.float64), covariance, size=n, method='eigh')
+    return _physical(samples)
+
+
+def bootstrap_refits(G, Q, params, n, seed):
+    """Worker: n refits of the fitted curve plus resampled residuals, as an (n, 3) array."""
+    G = np.asarray(G, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    fitted = arps.hyperbolic_rate_from_cum(G, *params)
+    residuals = Q - fitted
+    rng = np.random.default_rng(seed)
+    samples = np.full((n, 3), np.nan)
+    for k in range(n):
+        synthetic = fitted + rng.choice(residuals, size=residuals.size)
+        try:
+            samples[k] = dca_batch.fit_rate_from_cum(G, synthetic, p0=params)[:3]
+        except RuntimeError:
+            pass
+    return samples
+
+
+def bootstrap_samples(G, Q, params, n=DEFAULT_BOOTSTRAP_SAMPLES, seed=None, on_progress=None):
+    """Residual-bootstrap parameter sets, refitted in chunks on the process pool."""
+    sizes = [BOOTSTRAP_CHUNK] * (n // BOOTSTRAP_CHUNK)
+    if n % BOOTSTRAP_CHUNK:
+        sizes.append(n % BOOTSTRAP_CHUNK)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    params = tuple(float(p) for p in params)
+    tasks = [(G, Q, params, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    results = parallel.map_ordered(bootstrap_refits, tasks, on_progress)
+    chunks = [result for result, error in results if error is None]
+    if not chunks:
+        raise results[0][1]
+    return _physical(np.concatenate(chunks))
+
+
+def _columns(samples):
+    return samples[:, 0:1], samples[:, 1:2], samples[:, 2:3]
+
+
+def eur_distribution(samples, q_limits):
+    """EUR and time to each economic-limit rate for every sample.
+
+    Returns two (samples x rates) arrays; NaN where a sample starts below
+    the limit rate.
+    """
+    q = np.atleast_1d(np.asarray(q_limits, dtype=np.float64))[None, :]
+    qi, Di, b = _columns(samples)
+    with np.errstate(all='ignore'):
+        eur = arps.hyperbolic_cum_from_rate(q, qi, Di, b)
+        time = arps.hyperbolic_time_from_rate(q, qi, Di, b)
+    reached = qi > q
+    return np.where(reached, eur, np.nan), np.where(reached, time, np.nan)
+
+
+def rate_distribution(samples, G):
+    """Rates at the cumulatives G for every sample, as a (samples x len(G)) array."""
+    qi, Di, b = _columns(samples)
+    with np.errstate(all='ignore'):
+        return arps.hyperbolic_rate_from_cum(np.asarray(G, dtype=np.float64)[None, :], qi, Di, b)
+
+
+def percentiles(values, axis=0):
+    """{'P90', 'P50', 'P10'} summaries along axis, ignoring NaN."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return {name: np.nanpercentile(values, p, axis=axis) for name, p in EXCEEDANCE.items()}
@@ -0,0 +1,130 @@
+import functools
+import hashlib
+import io
+import os
+
+import numpy as np
+import streamlit as st
+
+import instrumentation
+import memory_cache
+
+# Cache of rendered figures.
+#
+# Plotting functions decorated with cached_figure build a matplotlib figure
+# and return it instead of calling st.pyplot.  The figure is rendered to
+# PNG (or SVG) bytes once per distinct (function, data, options) and later
+# reruns display the cached bytes without rebuilding or re-rendering it.
+# Entries are evicted in LRU order beyond a memory budget, which can be set
+# with the PETRO_FIGURE_CACHE_MB environment variable.
+#
+# pandas, PIL and pyplot are imported on first use so that app.py can show
+# the cache statistics without loading them.
+
+DEFAULT_BUDGET_MB = 128
+# Same output as st.pyplot
+SAVEFIG_OPTIONS = {'bbox_inches': 'tight', 'dpi': 200}
+# st.image scales wider images down to this on every display, so cache them already scaled
+MAX_IMAGE_WIDTH = 2 * 730
+
+_figure_cache = memory_cache.MemoryCache(int(os.environ.get('PETRO_FIGURE_CACHE_MB', DEFAULT_BUDGET_MB)) * 2**20)
+
+
+def get_cache():
+    return _figure_cache
+
+
+def _update(h, obj):
+    import pandas as pd
+    if isinstance(obj, pd.DataFrame):
+        h.update(b'df' + repr(list(obj.columns)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, (pd.Series, pd.Index)):
+        h.update(b'series' + repr(obj.name).encode())
+        h.update(pd.util.hash_pandas_object(obj).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(f'nd{obj.dtype}{obj.shape}'.encode())
+        if obj.dtype == object:
+            h.update(pd.util.hash_array(obj.ravel()).tobytes())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'(')
+        for item in obj:
+            _update(h, item)
+        h.update(b')')
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for key in sorted(obj, key=repr):
+            _update(h, key)
+            _update(h, obj[key])
+        h.update(b'}')
+    elif hasattr(obj, 'data') and hasattr(obj, 'name') and isinstance(obj.data, dict):
+        # welly Well: its name and the samples of every curve
+        _update(h, ('well', obj.name, {mnemonic: (np.asarray(curve.basis), curve.df.to_numpy())
+                                       for mnemonic, curve in obj.data.items()}))
+    else:
+        h.update(repr(obj).encode())
+
+
+def data_hash(obj):
+    """Content hash of plot inputs: arrays, DataFrames, welly wells, containers and scalars."""
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, obj)
+    return h.hexdigest()
+
+
+def render(fig, fmt='png'):
+    from PIL import Image
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, **SAVEFIG_OPTIONS)
+    if fmt != 'png':
+        return buffer.getvalue()
+    image = Image.open(buffer)
+    width, height = image.size
+    if width <= MAX_IMAGE_WIDTH:
+        return buffer.getvalue()
+    image = image.resize((MAX_IMAGE_WIDTH, int(height * MAX_IMAGE_WIDTH / width)), resample=Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def close(fig):
+    import matplotlib.pyplot as plt
+    plt.close(fig)
+
+
+def show(image, fmt='png'):
+    if fmt == 'svg':
+        st.image(image.decode('utf-8'), use_container_width=True)
+    else:
+        st.image(image, use_container_width=True, output_format='PNG')
+
+
+def cached_figure(func=None, fmt='png'):
+    """Decorator for plotting functions that return a matplotlib figure (or None to show nothing).
+
+    The cache key covers the function and every argument, so data changes and
+    option changes (depth window, column choice, ...) each get their own entry.
+    """
+    if func is None:
+        return functools.partial(cached_figure, fmt=fmt)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with instrumentation.stage(f"Figure {func.__name__}") as stage:
+            key = (name, fmt, data_hash((args, kwargs)))
+            image = _figure_cache.get(key)
+            if image is None:
+                fig = func(*args, **kwargs)
+                if fig is None:
+                    return
+                image = render(fig, fmt)
+                close(fig)
+                _figure_cache.put(key, image, len(image))
+            else:
+                stage.name += " (cached)"
+            show(image, fmt)
+    return wrapper
@@ -0,0 +1,40 @@
+import os
+import re
+import subprocess
+import sys
+
+# Import-time profiling for the debug panel.
+#
+# Imports are profiled in a fresh interpreter with `python -X importtime`, so
+# the numbers are cold-start costs regardless of what the running server has
+# already loaded.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def profile_imports(module, python=None, timeout=120):
+    """Cold import of module as a DataFrame (Module, Self (s), Cumulative (s), Level), slowest first."""
+    import pandas as pd
+    result = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, timeout=timeout)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({'Module': name, 'Self (s)': int(self_us) / 1e6,
+                         'Cumulative (s)': int(cumulative_us) / 1e6, 'Level': (len(indent) - 1) // 2})
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise ImportError(f"import {module} failed: {lines[-1] if lines else result.returncode}")
+    report = pd.DataFrame(rows, columns=['Module', 'Self (s)', 'Cumulative (s)', 'Level'])
+    return report.sort_values('Cumulative (s)', ascending=False, ignore_index=True)
+
+
+def package_totals(report):
+    """Self time summed per top-level package, i.e. what each library costs in total."""
+    packages = report['Module'].str.split('.').str[0]
+    totals = report.groupby(packages)['Self (s)'].agg(['sum', 'count'])
+    totals.columns = ['Total (s)', 'Modules']
+    return totals.sort_values('Total (s)', ascending=False)
@@ -0,0 +1,186 @@
+import contextlib
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Opt-in per-stage instrumentation.
+#
+# A page run is recorded by calling start_run() before and stop_run() after
+# it; in between, every `with stage(...)` block (or @instrumented function)
+# running in the same thread records wall time, CPU time of the thread, peak
+# traced memory above the level at stage entry and the number of rows
+# processed.  Streamlit runs each session's script in its own thread, so
+# sessions do not mix.  Without an active run, stages cost one attribute
+# lookup.
+#
+# Memory is measured with tracemalloc, which is process-wide and slows
+# allocation-heavy code down while it is on.  Runs recorded with
+# trace_memory=True share it: the first one starts it and the last one to
+# finish stops it again (tracing started elsewhere, e.g. -X tracemalloc, is
+# left on).  A stage resets the traced peak on entry, so when runs of other
+# sessions reset it in the middle of a stage that stage's peak is unknown and
+# left empty.  Work done in worker processes shows up as wall time of the
+# stage that waited for it.
+
+RECORD_FIELDS = ['page', 'run_started', 'stage', 'depth', 'wall_s', 'cpu_s', 'peak_mb', 'rows', 'error']
+
+_local = threading.local()
+_trace_lock = threading.Lock()
+_tracing_runs = 0
+_started_tracing = False
+# Peak resets by every run, to tell whether another run reset the peak during a stage
+_peak_resets = 0
+
+
+class StageRecord:
+    """Measurements of one stage; set .rows inside the block when the count is only known there."""
+
+    def __init__(self, name, rows=None, depth=0):
+        self.name = name
+        self.rows = rows
+        self.depth = depth
+        self.wall = None
+        self.cpu = None
+        self.peak_bytes = None
+        self.error = None
+        self._start_bytes = 0
+        self._peak = 0
+        self._other_resets = 0
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'depth': self.depth,
+            'wall_s': self.wall,
+            'cpu_s': self.cpu,
+            'peak_mb': None if self.peak_bytes is None else self.peak_bytes / 2**20,
+            'rows': None if self.rows is None else int(self.rows),
+            'error': self.error,
+        }
+
+
+class Recorder:
+    """Stages recorded during one page run, in the order they started."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.records = []
+        self.trace_memory = False
+        self._stack = []
+        self._peak_resets = 0
+
+    def rows(self):
+        return [dict(page=self.page, run_started=self.started, **record.as_dict()) for record in self.records]
+
+
+def current():
+    return getattr(_local, 'recorder', None)
+
+
+def start_run(page, trace_memory=True):
+    global _tracing_runs, _started_tracing
+    recorder = Recorder(page)
+    _local.recorder = recorder
+    if trace_memory:
+        with _trace_lock:
+            if not _tracing_runs and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            _tracing_runs += 1
+        recorder.trace_memory = True
+    return recorder
+
+
+def stop_run():
+    """Finish the current run and return its Recorder (None if nothing was being recorded).
+
+    The last run tracing memory stops tracemalloc if a run started it.
+    """
+    global _tracing_runs, _started_tracing
+    recorder = current()
+    _local.recorder = None
+    if recorder is not None and recorder.trace_memory:
+        with _trace_lock:
+            _tracing_runs -= 1
+            if not _tracing_runs and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+    return recorder
+
+
+def _reset_peak(recorder):
+    # (traced bytes, peak so far, peak resets by other runs) at the reset
+    global _peak_resets
+    with _trace_lock:
+        current_bytes, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        _peak_resets += 1
+        recorder._peak_resets += 1
+        return current_bytes, peak, _peak_resets - recorder._peak_resets
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """Record the enclosed block as a stage of the current run."""
+    recorder = current()
+    record = StageRecord(name, rows, depth=len(recorder._stack) if recorder else 0)
+    if recorder is None:
+        yield record
+        return
+    parent = recorder._stack[-1] if recorder._stack else None
+    tracing = recorder.trace_memory
+    if tracing:
+        current_bytes, peak, record._other_resets = _reset_peak(recorder)
+        if parent is not None:
+            # Keep the parent's peak so far from before the reset for this stage
+            parent._peak = max(parent._peak, peak)
+        record._start_bytes = record._peak = current_bytes
+    recorder.records.append(record)
+    recorder._stack.append(record)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record.wall = time.perf_counter() - wall
+        record.cpu = time.thread_time() - cpu
+        if tracing:
+            record._peak = max(record._peak, tracemalloc.get_traced_memory()[1])
+            if _peak_resets - recorder._peak_resets == record._other_resets:
+                record.peak_bytes = record._peak - record._start_bytes
+            if parent is not None:
+                parent._peak = max(parent._peak, record._peak)
+        recorder._stack.pop()
+
+
+def instrumented(name=None, rows=None):
+    """Decorator form of stage(); rows is an optional function of the result giving the row count."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current() is None:
+                return func(*args, **kwargs)
+            with stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                if rows is not None and result is not None:
+                    record.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def to_jsonl(rows):
+    return ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+def append_jsonl(path, rows):
+    with open(path, 'a') as f:
+        f.write(to_jsonl(rows))
@@ -0,0 +1,195 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import memory_cache
+import parallel
+
+# Background jobs on the shared process pool.
+#
+# A job runs func(*args) for a list of args tuples without waiting for them:
+# the tasks are submitted to parallel.get_process_pool() and their outcomes
+# arrive one by one, so a page can return straight away, show what has
+# finished so far and look again on a later run.
+#
+# Jobs are keyed by their inputs.  Submitting a key that is already running
+# or finished returns the same job, so reruns and other sessions asking for
+# the same computation share it; finished jobs act as a result cache, bounded
+# by the size of their results (budget PETRO_JOBS_MB, least recently used
+# first out).  A caller slot (one per session and
+# page section) remembers its current key: when the slot moves to other
+# inputs, or is cancelled, the old job is cancelled unless another slot still
+# wants it.  Cancelling drops the tasks not yet started; running tasks finish
+# in their worker and are ignored.
+
+DEFAULT_BUDGET_MB = 128
+MAX_SLOTS = 1024
+# Bookkeeping of a task beside its result
+TASK_OVERHEAD = 1024
+
+
+class Job:
+    """Tasks of one background computation; outcomes arrive per task."""
+
+    def __init__(self, key, total, labels=None, size=None):
+        self.key = key
+        self.total = total
+        self.labels = labels
+        self.size = size
+        self.cancelled = False
+        self.broken = False
+        self._outcomes = [None] * total
+        self._pending = total
+        self._futures = []
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        if not total:
+            self._finished.set()
+
+    def _task_done(self, i, future):
+        try:
+            outcome = (future.result(), None)
+        except CancelledError as e:
+            outcome = (None, e)
+        except BrokenProcessPool as e:
+            self.broken = True
+            outcome = (None, e)
+        except Exception as e:
+            outcome = (None, e)
+        with self._lock:
+            self._outcomes[i] = outcome
+            self._pending -= 1
+            if not self._pending:
+                self._finished.set()
+
+    def progress(self):
+        """(finished tasks, total tasks)."""
+        with self._lock:
+            return self.total - self._pending, self.total
+
+    def done(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """Block until every task finished (or timeout seconds); returns done()."""
+        return self._finished.wait(timeout)
+
+    def outcomes(self):
+        """[(result, error), ...] in task order, None for tasks still running."""
+        with self._lock:
+            return list(self._outcomes)
+
+    def nbytes(self):
+        """Estimated size of the outcomes (size(result) per result when given)."""
+        size = self.size or result_size
+        return sum(TASK_OVERHEAD + (size(outcome[0]) if outcome and outcome[1] is None else 0)
+                   for outcome in self.outcomes())
+
+    def cancel(self):
+        self.cancelled = True
+        for future in self._futures:
+            future.cancel()
+
+
+def result_size(result):
+    """Rough size in bytes of a task result: arrays, DataFrames and containers of them."""
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (list, tuple)):
+        return sum(result_size(item) for item in result)
+    if isinstance(result, dict):
+        return sum(result_size(item) for item in result.values())
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(index=True).sum())
+    return 64
+
+
+# Running jobs by key; finished ones move to _finished at the next submit
+_jobs = {}
+_finished = memory_cache.MemoryCache(int(os.environ.get('PETRO_JOBS_MB', DEFAULT_BUDGET_MB)) * 2**20)
+_slots = OrderedDict()
+_lock = threading.Lock()
+
+
+def _start(key, func, args_list, label, size):
+    job = Job(key, len(args_list), [label(args) for args in args_list] if label else None, size)
+    try:
+        futures = [parallel.get_process_pool().submit(func, *args) for args in args_list]
+    except BrokenProcessPool:
+        parallel.reset_process_pool()
+        futures = [parallel.get_process_pool().submit(func, *args) for args in args_list]
+    job._futures = futures
+    for i, future in enumerate(futures):
+        future.add_done_callback(lambda f, i=i: job._task_done(i, f))
+    return job
+
+
+def _usable(key):
+    # The job for key unless there is none or its worker pool broke under it
+    job = _jobs.get(key)
+    if job is None:
+        return _finished.get(key)
+    if job.broken or job.cancelled:
+        del _jobs[key]
+        if job.broken:
+            parallel.reset_process_pool()
+        return None
+    return job
+
+
+def _release(key):
+    # Cancel the running job for key once no slot wants it any more
+    if key in _slots.values():
+        return
+    job = _jobs.get(key)
+    if job is not None and not job.done():
+        job.cancel()
+        del _jobs[key]
+
+
+def _evict():
+    # Finished jobs leave _jobs for the byte-bounded cache; broken ones are not kept
+    for key, job in [(key, job) for key, job in _jobs.items() if job.done()]:
+        del _jobs[key]
+        if not job.broken and not job.cancelled:
+            _finished.put(key, job, job.nbytes())
+
+
+def submit(slot, key, func, make_args, label=None, size=None):
+    """The job computing func(*args) for every tuple of make_args(), for the inputs key.
+
+    make_args is only called when no job for key is running or finished;
+    label(args), when given, is kept per task as job.labels, and size(result)
+    estimates the bytes of a result (result_size() otherwise).  The slot's
+    previous job is cancelled if it was for other inputs and nobody else
+    wants it.
+    """
+    with _lock:
+        job = _usable(key)
+    if job is None:
+        args_list = list(make_args())
+        with _lock:
+            job = _usable(key)
+            if job is None:
+                job = _jobs[key] = _start(key, func, args_list, label, size)
+    with _lock:
+        previous = _slots.pop(slot, None)
+        _slots[slot] = key
+        if len(_slots) > MAX_SLOTS:
+            _slots.popitem(last=False)
+        if previous is not None and previous != key:
+            _release(previous)
+        _evict()
+    return job
+
+
+def cancel(slot):
+    """Forget the slot's job, cancelling it if it is still running and nobody else wants it."""
+    with _lock:
+        key = _slots.pop(slot, None)
+        if key is not None:
+            _release(key)
@@ -0,0 +1,68 @@
+import hashlib
+import os
+import threading
+
+import curve_store
+import las_reader
+import memory_cache
+
+# Process-wide cache of parsed LAS files keyed by a hash of the uploaded bytes.
+#
+# The cache lives at module level so it is shared by every page and every
+# Streamlit session served by the same process.  Entries are evicted in LRU
+# order once the total size of the cached arrays exceeds the memory budget,
+# which can be set with the PETRO_PARSE_CACHE_MB environment variable.
+
+DEFAULT_BUDGET_MB = 512
+HEADER_OVERHEAD = 16 * 1024
+
+
+def content_hash(bytes_data):
+    return hashlib.blake2b(bytes_data, digest_size=16).hexdigest()
+
+
+def estimate_size(las):
+    return las.data.nbytes + HEADER_OVERHEAD
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            budget_mb = float(os.environ.get('PETRO_PARSE_CACHE_MB', DEFAULT_BUDGET_MB))
+            _cache = memory_cache.MemoryCache(int(budget_mb * 1024 * 1024))
+        return _cache
+
+
+def read_las_cached(bytes_data, key=None):
+    """Parse LAS bytes, reusing an earlier parse of identical content."""
+    cache = get_cache()
+    key = key or content_hash(bytes_data)
+    las = cache.get(key)
+    if las is None:
+        las = las_reader.read_las(bytes_data)
+        # Without the lasio file of the fallback parse: estimate_size() counts only the
+        # arrays, and a mutable LASFile must not be shared between sessions
+        las = las_reader.LasData(las.version, las.well, las.params, las.curves, las.other, las.data)
+        las.data.flags.writeable = False
+        cache.put(key, las, estimate_size(las))
+    return las
+
+
+def load_las(uploaded_file):
+    """Parse a Streamlit UploadedFile (or any file object) through the shared cache."""
+    return read_las_cached(uploaded_file.getvalue())
+
+
+def load_store(uploaded_file):
+    """Return the memory-mapped curve store for an upload, converting it on first ingest."""
+    bytes_data = uploaded_file.getvalue()
+    key = content_hash(bytes_data)
+    store = curve_store.open_store(key)
+    if store is None:
+        store = curve_store.write_store(read_las_cached(bytes_data, key), key)
+    return store
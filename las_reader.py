@@ -0,0 +1,259 @@
+import re
+from collections import namedtuple
+from io import StringIO
+
+import numpy as np
+
+# Fast LAS 2.0 reader shared by every page.
+#
+# The header sections (~V, ~W, ~C, ~P, ~O) are parsed line by line, which is
+# cheap because they are only a few dozen lines long.  The ~A block is turned
+# into a NumPy array straight from the raw bytes in one bulk conversion, and
+# NULL values are masked in the same pass.  Wrapped, LAS 3.0 or otherwise
+# malformed files fall back to lasio.
+
+ENCODING = 'Windows-1252'
+DEFAULT_NULL = -999.25
+
+HeaderItem = namedtuple('HeaderItem', ['mnemonic', 'unit', 'value', 'descr'])
+
+SECTION_NAMES = {'V': 'version', 'W': 'well', 'C': 'curves', 'P': 'params', 'O': 'other'}
+
+_DATA_SECTION = re.compile(rb'^[ \t]*~A', re.MULTILINE)
+
+
+class LasFormatError(ValueError):
+    """Raised when a file cannot be handled by the fast path."""
+
+
+class LasData:
+    """Parsed LAS file: header sections plus a (samples x curves) array."""
+
+    def __init__(self, version, well, params, curves, other, data, source_las=None):
+        self.version = version
+        self.well = well
+        self.params = params
+        self.curves = curves
+        self.other = other
+        self.data = data
+        self._lasio = source_las
+
+    @property
+    def keys(self):
+        return [curve.mnemonic for curve in self.curves]
+
+    @property
+    def index(self):
+        return self.data[:, 0]
+
+    @property
+    def depth(self):
+        return self.index
+
+    @property
+    def null_value(self):
+        return _header_float(self.well, 'NULL', DEFAULT_NULL)
+
+    def curve(self, mnemonic):
+        return self.data[:, self.keys.index(mnemonic)]
+
+    def header_value(self, mnemonic, default=None):
+        for section in (self.well, self.params):
+            if mnemonic in section:
+                return section[mnemonic].value
+        return default
+
+    def df(self):
+        """Return the curves as a DataFrame indexed by the first curve, like lasio."""
+        import pandas as pd
+
+        # Always copy: the parsed arrays may be shared through the parse cache.
+        keys = self.keys
+        return pd.DataFrame(np.array(self.data[:, 1:]), columns=keys[1:],
+                            index=pd.Index(np.array(self.data[:, 0]), name=keys[0]))
+
+    def to_lasio(self):
+        """An equivalent lasio.LASFile, e.g. for welly.Well.from_lasio: the one this was read
+        from, or a new one (not kept, so parsed files shared through the cache stay small)."""
+        if self._lasio is not None:
+            return self._lasio
+        import lasio
+
+        las = lasio.LASFile()
+        for section_name, items in (('Version', self.version), ('Well', self.well),
+                                    ('Parameter', self.params)):
+            section = las.sections[section_name]
+            for item in items.values():
+                section[item.mnemonic] = lasio.HeaderItem(item.mnemonic, item.unit, item.value, item.descr)
+        las.sections['Other'] = self.other
+        for i, curve in enumerate(self.curves):
+            las.append_curve(curve.mnemonic, self.data[:, i], unit=curve.unit, descr=curve.descr)
+        return las
+
+    @classmethod
+    def from_lasio(cls, las):
+        def items(section):
+            return {item.mnemonic: HeaderItem(item.mnemonic, item.unit, item.value, item.descr)
+                    for item in section}
+
+        curves = [HeaderItem(c.mnemonic, c.unit, c.value, c.descr) for c in las.curves]
+        data = np.column_stack([np.asarray(c.data, dtype=np.float64) for c in las.curves]) \
+            if las.curves else np.empty((0, 0))
+        return cls(items(las.version), items(las.well), items(las.params), curves,
+                   las.other, data, source_las=las)
+
+
+def _header_float(section, mnemonic, default):
+    item = section.get(mnemonic)
+    if item is None:
+        return default
+    try:
+        return float(item.value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_value(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_header_line(line):
+    """Split a 'MNEM.UNIT  VALUE : DESCRIPTION' line into a HeaderItem."""
+    mnemonic, dot, rest = line.partition('.')
+    if not dot:
+        raise LasFormatError(f"Header line without a mnemonic delimiter: {line!r}")
+    if rest[:1].isspace() or not rest:
+        unit, rest = '', rest
+    else:
+        parts = rest.split(None, 1)
+        unit, rest = parts[0], (parts[1] if len(parts) > 1 else '')
+    value, colon, descr = rest.rpartition(':')
+    if not colon:
+        value, descr = rest, ''
+    return HeaderItem(mnemonic.strip(), unit, _parse_value(value.strip()), descr.strip())
+
+
+def parse_header(text):
+    """Parse the header sections of a LAS file (everything before ~A)."""
+    sections = {name: {} for name in SECTION_NAMES.values()}
+    sections['curves'] = []
+    other_lines = []
+    current = None
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('~'):
+            current = SECTION_NAMES.get(line[1:2].upper())
+            continue
+        if current is None:
+            continue
+        if current == 'other':
+            other_lines.append(line)
+            continue
+        item = parse_header_line(line)
+        if current == 'curves':
+            sections['curves'].append(item)
+        else:
+            sections[current][item.mnemonic] = item
+    sections['other'] = '\n'.join(other_lines)
+    sections['curves'] = _dedupe_mnemonics(sections['curves'])
+    return sections
+
+
+def _dedupe_mnemonics(curves):
+    # lasio renames repeated mnemonics to MNEM:1, MNEM:2, ... so the DataFrame
+    # columns stay unique; do the same here.
+    counts = {}
+    for curve in curves:
+        counts[curve.mnemonic] = counts.get(curve.mnemonic, 0) + 1
+    seen = {}
+    deduped = []
+    for curve in curves:
+        if counts[curve.mnemonic] > 1:
+            seen[curve.mnemonic] = seen.get(curve.mnemonic, 0) + 1
+            curve = curve._replace(mnemonic=f"{curve.mnemonic}:{seen[curve.mnemonic]}")
+        deduped.append(curve)
+    return deduped
+
+
+def split_sections(bytes_data):
+    """Return (header_bytes, data_bytes) split at the ~A section marker."""
+    match = _DATA_SECTION.search(bytes_data)
+    if match is None:
+        return bytes_data, None
+    line_end = bytes_data.find(b'\n', match.end())
+    data = b'' if line_end == -1 else bytes_data[line_end + 1:]
+    return bytes_data[:match.start()], data
+
+
+def parse_data(data_bytes, n_curves, null_value=DEFAULT_NULL):
+    """Convert the raw ~A block into a (samples x curves) float array with NULLs as NaN."""
+    if b'#' in data_bytes or b'~' in data_bytes:
+        raise LasFormatError("Comments or extra sections after ~A")
+    try:
+        values = np.array(data_bytes.split(), dtype=np.float64)
+    except ValueError as e:
+        raise LasFormatError(f"Non-numeric value in ~A section: {e}")
+    if n_curves == 0 or values.size % n_curves:
+        raise LasFormatError(f"{values.size} values cannot be split into {n_curves} curves")
+    values[values == null_value] = np.nan
+    return values.reshape(-1, n_curves)
+
+
+def read_las_fast(bytes_data):
+    """Parse a LAS 2.0 file using the vectorized path; raises LasFormatError if unsupported."""
+    header_bytes, data_bytes = split_sections(bytes_data)
+    if data_bytes is None:
+        raise LasFormatError("No ~A section found")
+    sections = parse_header(header_bytes.decode(ENCODING))
+
+    version = sections['version']
+    if _header_float(version, 'VERS', 2.0) >= 3.0:
+        raise LasFormatError("LAS 3.0 files are not supported by the fast path")
+    wrap = version.get('WRAP')
+    if wrap is not None and str(wrap.value).upper().startswith('Y'):
+        raise LasFormatError("Wrapped files are not supported by the fast path")
+    dlm = version.get('DLM')
+    if dlm is not None and str(dlm.value).upper() not in ('', 'SPACE'):
+        raise LasFormatError("Only space delimited data is supported by the fast path")
+
+    null_value = _header_float(sections['well'], 'NULL', DEFAULT_NULL)
+    data = parse_data(data_bytes, len(sections['curves']), null_value)
+    return LasData(sections['version'], sections['well'], sections['params'],
+                   sections['curves'], sections['other'], data)
+
+
+def read_las_lasio(bytes_data):
+    """Reference path: decode everything and let lasio parse it."""
+    import lasio
+
+    las = lasio.read(StringIO(bytes_data.decode(ENCODING)))
+    return LasData.from_lasio(las)
+
+
+def read_las(bytes_data):
+    """Read LAS bytes, using the fast path and falling back to lasio when needed."""
+    try:
+        return read_las_fast(bytes_data)
+    except LasFormatError:
+        return read_las_lasio(bytes_data)
+
+
+def read_las_header(bytes_data):
+    """Parse only the header sections, stopping at ~A; the returned LasData has no samples."""
+    header_bytes, _ = split_sections(bytes_data)
+    try:
+        sections = parse_header(header_bytes.decode(ENCODING))
+        if not sections['curves']:
+            raise LasFormatError("No ~C section found")
+    except LasFormatError:
+        import lasio
+
+        las = lasio.read(StringIO(bytes_data.decode(ENCODING)), ignore_data=True)
+        return LasData.from_lasio(las)
+    return LasData(sections['version'], sections['well'], sections['params'],
+                   sections['curves'], sections['other'], np.empty((0, len(sections['curves']))))
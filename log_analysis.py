@@ -0,0 +1,94 @@
+import numpy as np
+
+import depth_grid
+import instrumentation
+import log_qc
+import petrophysics
+
+# Streamlit-free log analysis for one well: outlier handling, reads from the
+# curve store and the petrophysics chain.  Used by the Well Logging page and
+# by batch_cli for whole directories of LAS files.
+
+OUTLIER_METHODS = ['None', 'Fillna().mean', 'Dropna()', 'Linear Interpolation', 'IQR']
+# Outlier methods that look across every curve of a row
+ROW_WISE_METHODS = ['Dropna()', 'IQR']
+
+
+def curve_frame(depth, curves, index_name, keep=None):
+    """DataFrame of {curve: array} indexed by depth, keeping only the rows in the keep mask."""
+    import pandas as pd
+
+    if keep is not None:
+        depth = depth[keep]
+        curves = {name: values[keep] for name, values in curves.items()}
+    return pd.DataFrame(curves, index=pd.Index(depth, name=index_name), copy=False)
+
+
+@instrumentation.instrumented("Handle outliers", rows=len)
+def handle_outliers(well_data, method, stats=None):
+    """Outlier handling of a DataFrame of curves; the input is left unchanged.
+
+    The curves are copied once and handled in place by log_qc; stats
+    ({curve: log_qc.CurveStats}) can be passed when already computed.
+    """
+    if method not in OUTLIER_METHODS[1:]:
+        return well_data
+    curves = {name: well_data[name].to_numpy(dtype=np.float64, copy=True) for name in well_data.columns}
+    keep = log_qc.apply_outliers(curves, method, stats)
+    return curve_frame(well_data.index.to_numpy(), curves, well_data.index.name, keep)
+
+
+@instrumentation.instrumented("Read curves", rows=len)
+def read_well_data(store, curves=None, outlier_method='None', top=None, base=None):
+    """Read curves and a depth window from the curve store, with outliers handled
+    as if the method had been applied to the full DataFrame."""
+    if outlier_method not in OUTLIER_METHODS[1:]:
+        return store.read(curves, top, base)
+    if outlier_method in ROW_WISE_METHODS:
+        # Rows are dropped on every curve, so all of them take part
+        depth, arrays = store.arrays()
+    else:
+        depth, arrays = store.arrays(curves)
+    with instrumentation.stage("Handle outliers", rows=len(depth)):
+        keep = log_qc.apply_outliers(arrays, outlier_method)
+    if curves is not None:
+        arrays = {name: arrays[name] for name in curves if name != store.index_name}
+    well_data = curve_frame(depth, arrays, store.index_name, keep)
+    if top is not None:
+        well_data = well_data[well_data.index >= top]
+    if base is not None:
+        well_data = well_data[well_data.index <= base]
+    return well_data
+
+
+def petrophysics_mnemonics(keys):
+    """{petrophysics input: mnemonic} for the inputs found among keys, aliases resolved."""
+    mnemonics = {name: depth_grid.resolve_mnemonic(keys, name) for name in petrophysics.INPUT_CURVES}
+    return {name: mnemonic for name, mnemonic in mnemonics.items() if mnemonic is not None}
+
+
+def read_petrophysics_inputs(store, outlier_method='None'):
+    """(depth, {input curve: array}) with aliases resolved; the arrays are the
+    memory-mapped curves unless an outlier method has to be applied first."""
+    mnemonics = petrophysics_mnemonics(store.keys[1:])
+    if outlier_method == 'None':
+        return store.depth, {name: store.curve(mnemonic) for name, mnemonic in mnemonics.items()}
+    well_data = read_well_data(store, list(mnemonics.values()), outlier_method)
+    return (well_data.index.to_numpy(),
+            {name: well_data[mnemonic].to_numpy() for name, mnemonic in mnemonics.items()})
+
+
+def analyse_well(well_data, well_name, outlier_method='None', parameters=None):
+    """Outlier handling and petrophysics for one well's DataFrame (indexed by depth).
+
+    Returns (curves, summary): the handled curves with the petrophysics
+    outputs appended, and the one-row cutoff summary.
+    """
+    well_data = handle_outliers(well_data, outlier_method)
+    mnemonics = petrophysics_mnemonics(list(well_data.columns))
+    depth = well_data.index.to_numpy(dtype=np.float64)
+    results = petrophysics.evaluate({name: well_data[mnemonic].to_numpy() for name, mnemonic in mnemonics.items()},
+                                    parameters)
+    curves = well_data.assign(**results)
+    return curves, petrophysics.cutoff_summary(depth, results, [well_name])
+
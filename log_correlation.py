@@ -0,0 +1,220 @@
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import depth_match
+import parallel
+
+# Cross-well log correlation for picking formation tops.
+#
+# Works on one curve of every well on a shared depth grid (a slice of a
+# depth_grid.CurveMatrix).  Curves are normalized per well (P5 -> 0,
+# P95 -> 1) so tools and vintages with different scales compare.
+#
+# Bulk shifts: the lag with the highest masked Pearson correlation,
+# depth_match.masked_correlation scoring one well against all the others in
+# one batch of FFTs.  Stretch: dynamic time warping of each other well onto
+# the reference, restricted to a band of +/- half_width samples around the
+# bulk shift.  The band bounds how far the path may drift from the bulk shift
+# over the whole log, so it has to cover the total stretch: by default it is
+# DEFAULT_STRETCH of the log length (at least DEFAULT_BAND).  The asymmetric
+# step pattern (each reference sample advances the other well by 0, 1 or 2
+# samples) makes every row of the cost matrix depend only on the previous one,
+# so a row is a few array operations over the band of every pair at once and
+# only the step choices (one byte per sample and band column) are kept for the
+# backtrack; pairs are split into chunks over the worker pool.
+#
+# The warping path maps every reference depth to a depth in each other well,
+# which carries a top picked in the reference to all wells.  Its confidence
+# is the correlation of the reference with the warped curve in a window
+# around the top, clipped to [0, 1].
+#
+# Sign convention as in depth_match: reference depth + shift = well depth.
+
+DEFAULT_MAX_SHIFT = 50.0
+DEFAULT_BAND = 20.0
+# Default band as a fraction of the log length, i.e. the largest total stretch found
+DEFAULT_STRETCH = 0.05
+CONFIDENCE_WINDOW = 20.0
+# Cost of matching against a missing sample (normalized curves are mostly in [0, 1])
+MISSING_COST = 0.5
+TOP_COLUMNS = ['Well', 'Shift', 'Correlation', 'Top', 'Confidence']
+
+Alignment = namedtuple('Alignment', ['shifts', 'correlations', 'matches', 'costs'])
+
+
+def normalize(values, low=5, high=95):
+    """(wells x depth) curves scaled so each well's low and high percentiles map to 0 and 1."""
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        p_low, p_high = np.nanpercentile(values, [low, high], axis=1, keepdims=True)
+    spread = p_high - p_low
+    spread[~(spread > 0)] = 1.0
+    return (values - p_low) / spread
+
+
+def _peaks(lags, scores):
+    # Best lag per row with parabolic refinement, NaN for rows without any score
+    finite = np.isfinite(scores)
+    best = np.argmax(np.where(finite, scores, -np.inf), axis=1)
+    rows = np.arange(scores.shape[0])
+    peak = scores[rows, best]
+    left = scores[rows, np.maximum(best - 1, 0)]
+    right = scores[rows, np.minimum(best + 1, scores.shape[1] - 1)]
+    denominator = left - 2 * peak + right
+    inner = (best > 0) & (best < scores.shape[1] - 1) & np.isfinite(left) & np.isfinite(right) & (denominator < 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        offset = np.where(inner, 0.5 * (left - right) / denominator, 0.0)
+    empty = ~finite.any(axis=1)
+    shift = np.where(empty, np.nan, lags[best] + offset)
+    return shift, np.where(empty, np.nan, peak)
+
+
+def bulk_shifts(values, reference, step, max_shift=DEFAULT_MAX_SHIFT):
+    """(shifts, correlations) of every well against the reference well (a row index)."""
+    max_lag = max(int(round(max_shift / step)), 1)
+    lags, scores = depth_match.masked_correlation(values[reference], values, max_lag)
+    shifts, correlations = _peaks(lags, scores)
+    return shifts * step, correlations
+
+
+def pairwise_shifts(values, step, max_shift=DEFAULT_MAX_SHIFT):
+    """(wells x wells) bulk shifts and peak correlations; row i + shift[i, j] = well j."""
+    n_wells = values.shape[0]
+    shifts = np.zeros((n_wells, n_wells))
+    correlations = np.ones((n_wells, n_wells))
+    for i in range(n_wells - 1):
+        shift, correlation = bulk_shifts(values[i:], 0, step, max_shift)
+        shifts[i, i + 1:], correlations[i, i + 1:] = shift[1:], correlation[1:]
+        shifts[i + 1:, i], correlations[i + 1:, i] = -shift[1:], correlation[1:]
+    return shifts, correlations
+
+
+def default_band(length):
+    """Stretch band (+/- depth) covering DEFAULT_STRETCH of a log this long."""
+    return max(DEFAULT_BAND, DEFAULT_STRETCH * length)
+
+
+def _cost_row(value, others, columns):
+    # |reference sample - other well| at columns (pairs x band), inf outside the other well
+    m = others.shape[1]
+    inside = (columns >= 0) & (columns < m)
+    costs = np.abs(value - np.take_along_axis(others, np.clip(columns, 0, m - 1), axis=1))
+    costs[np.isnan(costs)] = MISSING_COST
+    costs[~inside] = np.inf
+    return costs
+
+
+def warp_paths(reference, others, lags, half_width):
+    """Worker: banded asymmetric DTW of each row of others onto the reference.
+
+    lags (samples, one per row) centre the band.  Returns (matched sample
+    of the other well for every reference sample as (pairs x rows) ints,
+    mean cost along each path).
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    others = np.atleast_2d(np.asarray(others, dtype=np.float64))
+    lags = np.asarray(lags, dtype=np.int64)
+    # Column k of row i is sample i + offsets[:, k] of the other well; only the step
+    # choices are kept for every row, the costs one row at a time
+    offsets = lags[:, None] + np.arange(-half_width, half_width + 1)[None, :]
+    n_pairs, n, width = others.shape[0], reference.size, offsets.shape[1]
+    choices = np.zeros((n_pairs, n, width), dtype=np.int8)
+    # Previous row padded with inf: same column is k + 1, one back is k, two back is k - 1
+    previous = np.full((n_pairs, width + 2), np.inf)
+    previous[:, 1:-1] = _cost_row(reference[0], others, offsets)
+    for i in range(1, n):
+        same, one, two = previous[:, 2:], previous[:, 1:-1], previous[:, :-2]
+        best = np.minimum(np.minimum(same, one), two)
+        # Ties (e.g. across gaps) take the diagonal step
+        choices[:, i] = np.where(best == one, 1, np.where(best == same, 0, 2))
+        previous[:, 1:-1] = best + _cost_row(reference[i], others, i + offsets)
+    rows = np.arange(n_pairs)
+    k = np.argmin(previous[:, 1:-1], axis=1)
+    total = previous[rows, k + 1]
+    matches = np.empty((n_pairs, n), dtype=np.int64)
+    for i in range(n - 1, -1, -1):
+        matches[:, i] = i + offsets[rows, k]
+        k = np.clip(k + 1 - choices[rows, i, k], 0, width - 1)
+    # No path inside the band and the well
+    matches[~np.isfinite(total)] = -1
+    return matches, total / n
+
+
+def alignment_tasks(values, reference, shifts, step, band=None, n_chunks=None):
+    """warp_paths args for the reference against every other well, in chunks of wells.
+
+    band defaults to default_band() of the grid length.  Returns ([args, ...], [well indices of each chunk, ...]).
+    """
+    others = [w for w in range(values.shape[0]) if w != reference]
+    if not others:
+        return [], []
+    if band is None:
+        band = default_band(values.shape[1] * step)
+    half_width = max(int(round(band / step)), 1)
+    lags = np.nan_to_num(shifts / step).round().astype(np.int64)
+    n_chunks = min(n_chunks or parallel.max_workers(), len(others))
+    chunks = [list(chunk) for chunk in np.array_split(others, n_chunks)]
+    return [(values[reference], values[chunk], lags[chunk], half_width) for chunk in chunks], chunks
+
+
+def merge_paths(n_wells, reference, chunks, outcomes):
+    """(matches, costs) for every well from warp_paths outcomes of alignment_tasks chunks;
+    the reference maps onto itself and wells of failed (or missing) chunks get -1 and NaN."""
+    first = next((result for result, error in (o for o in outcomes if o is not None) if error is None), None)
+    n = first[0].shape[1] if first is not None else 0
+    matches = np.full((n_wells, n), -1, dtype=np.int64)
+    costs = np.full(n_wells, np.nan)
+    matches[reference] = np.arange(n)
+    costs[reference] = 0.0
+    for chunk, outcome in zip(chunks, outcomes):
+        if outcome is not None and outcome[1] is None:
+            matches[chunk], costs[chunk] = outcome[0]
+    return matches, costs
+
+
+def align_wells(values, reference, step, max_shift=DEFAULT_MAX_SHIFT, band=None, on_progress=None):
+    """Bulk shifts and warping paths of every well against the reference, pairs in parallel."""
+    shifts, correlations = bulk_shifts(values, reference, step, max_shift)
+    tasks, chunks = alignment_tasks(values, reference, shifts, step, band)
+    matches, costs = merge_paths(values.shape[0], reference, chunks,
+                                 parallel.map_ordered(warp_paths, tasks, on_progress))
+    return Alignment(shifts, correlations, matches, costs)
+
+
+def _correlation(a, b):
+    present = np.isfinite(a) & np.isfinite(b)
+    if np.count_nonzero(present) < depth_match.MIN_OVERLAP:
+        return np.nan
+    a, b = a[present] - a[present].mean(), b[present] - b[present].mean()
+    denominator = np.sqrt(np.sum(a * a) * np.sum(b * b))
+    return np.sum(a * b) / denominator if denominator > 0 else np.nan
+
+
+def propagate_top(depth, values, wells, reference, alignment, top, window=CONFIDENCE_WINDOW):
+    """The top picked at depth `top` in the reference, carried to every well along the paths.
+
+    Returns a TOP_COLUMNS table with the bulk alignment, the top depth and its
+    confidence per well; NaN where a well has no path.
+    """
+    step = depth[1] - depth[0] if depth.size > 1 else 1.0
+    position = np.clip((top - depth[0]) / step, 0, depth.size - 1)
+    i = int(np.floor(position))
+    fraction = position - i
+    upper = min(i + 1, depth.size - 1)
+    half = max(int(round(window / step)), 1)
+    rows = slice(max(i - half, 0), min(i + half + 1, depth.size))
+    tops, confidences = [], []
+    for w, match in enumerate(alignment.matches):
+        if match.size == 0 or match[i] < 0:
+            tops.append(np.nan)
+            confidences.append(np.nan)
+            continue
+        tops.append(depth[match[i]] + fraction * (depth[match[upper]] - depth[match[i]]))
+        correlation = _correlation(values[reference, rows], values[w, match[rows]])
+        confidences.append(float(np.clip(np.nan_to_num(correlation), 0.0, 1.0)))
+    return pd.DataFrame({'Well': wells, 'Shift': alignment.shifts, 'Correlation': alignment.correlations,
+                         'Top': tops, 'Confidence': confidences})
@@ -0,0 +1,302 @@
+import math
+import warnings
+
+import numpy as np
+
+# Single-pass log QC.
+#
+# Per-curve statistics (count, nulls, min/max, mean/std and approximate
+# quantiles) are accumulated chunk by chunk, so a curve is read once and never
+# materialized as a whole: memory-mapped store curves, chunked input and many
+# wells all go through the same update().  Every statistic is mergeable
+# (counts add, mean/variance combine with Chan's formula, the quantile sketch
+# adds bucket counts), so summaries of chunks or wells can be computed apart
+# and combined later.
+#
+# Quantiles come from a DDSketch-style log-bucket histogram: a value is
+# reported within RELATIVE_ACCURACY of the true quantile's value.
+#
+# The outlier methods of the Well Logging page are applied to {curve: array}
+# in place, from the summaries when given (chunked input, several wells) and
+# otherwise from exact statistics of the arrays; row-wise methods return one
+# boolean keep mask instead of building a boolean DataFrame.
+
+DEFAULT_CHUNK = 65536
+RELATIVE_ACCURACY = 0.005
+# Magnitudes below this count as zero in the sketch
+MIN_MAGNITUDE = 1e-12
+SUMMARY_COLUMNS = ['Curve', 'Count', 'Nulls', 'Min', 'P25', 'Median', 'P75', 'Max', 'Mean', 'Std']
+
+
+class _Buckets:
+    """Dense counts for a contiguous range of integer bucket keys, grown as needed."""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, keys, counts=None):
+        if not keys.size:
+            return
+        lo, hi = int(keys.min()), int(keys.max())
+        if not self.counts.size:
+            self.offset = lo
+            self.counts = np.zeros(hi - lo + 1, dtype=np.int64)
+        elif lo < self.offset or hi >= self.offset + self.counts.size:
+            new_offset = min(lo, self.offset)
+            grown = np.zeros(max(hi + 1, self.offset + self.counts.size) - new_offset, dtype=np.int64)
+            grown[self.offset - new_offset:self.offset - new_offset + self.counts.size] = self.counts
+            self.offset, self.counts = new_offset, grown
+        self.counts += np.bincount(keys - self.offset, weights=counts,
+                                   minlength=self.counts.size).astype(np.int64)
+
+    def merge(self, other):
+        if other.counts.size:
+            keys = np.arange(other.offset, other.offset + other.counts.size)
+            self.add(keys, other.counts)
+
+    def keys(self):
+        return np.arange(self.offset, self.offset + self.counts.size)
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative value accuracy."""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = _Buckets()
+        self.negative = _Buckets()
+        self.zeros = 0
+
+    def _keys(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def update(self, values):
+        """Add finite values (NaN must already be removed)."""
+        magnitude = np.abs(values)
+        nonzero = magnitude > MIN_MAGNITUDE
+        self.zeros += int(values.size - np.count_nonzero(nonzero))
+        positive = nonzero & (values > 0)
+        self.positive.add(self._keys(magnitude[positive]))
+        self.negative.add(self._keys(magnitude[nonzero & ~positive]))
+
+    def merge(self, other):
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zeros += other.zeros
+
+    def _bucket_value(self, keys):
+        return 2 * self.gamma ** keys.astype(np.float64) / (self.gamma + 1)
+
+    def quantiles(self, qs):
+        """Values at the quantiles qs (0..1), NaN when the sketch is empty."""
+        qs = np.asarray(qs, dtype=np.float64)
+        # Buckets in ascending value order: negatives by decreasing magnitude, zero, positives
+        values = np.concatenate([-self._bucket_value(self.negative.keys())[::-1], [0.0],
+                                 self._bucket_value(self.positive.keys())])
+        counts = np.concatenate([self.negative.counts[::-1], [self.zeros], self.positive.counts])
+        cumulative = np.cumsum(counts)
+        if not cumulative.size or cumulative[-1] == 0:
+            return np.full(qs.shape, np.nan)
+        rank = qs * (cumulative[-1] - 1)
+        return values[np.searchsorted(cumulative, rank, side='right')]
+
+
+class CurveStats:
+    """Streaming summary of one curve; update() with chunks, merge() with other summaries."""
+
+    def __init__(self, name, relative_accuracy=RELATIVE_ACCURACY):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.mean = np.nan
+        self._m2 = 0.0
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def _combine(self, count, mean, m2):
+        # Chan et al. pairwise update of count, mean and sum of squared deviations
+        if not count:
+            return
+        if not self.count:
+            self.count, self.mean, self._m2 = count, mean, m2
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        finite = values[np.isfinite(values)]
+        self.nulls += int(np.count_nonzero(np.isnan(values)))
+        if not finite.size:
+            return
+        self.minimum = min(self.minimum, float(finite.min()))
+        self.maximum = max(self.maximum, float(finite.max()))
+        mean = float(finite.mean())
+        self._combine(finite.size, mean, float(np.sum((finite - mean) ** 2)))
+        self.sketch.update(finite)
+
+    def merge(self, other):
+        self.nulls += other.nulls
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._combine(other.count, other.mean, other._m2)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    def quantiles(self, qs):
+        # Sketch values are bucket midpoints; keep them inside the observed range
+        return np.clip(self.sketch.quantiles(qs), self.minimum, self.maximum)
+
+    def as_dict(self):
+        empty = not self.count
+        p25, median, p75 = self.quantiles([0.25, 0.5, 0.75])
+        return {
+            'Curve': self.name,
+            'Count': self.count,
+            'Nulls': self.nulls,
+            'Min': np.nan if empty else self.minimum,
+            'P25': p25,
+            'Median': median,
+            'P75': p75,
+            'Max': np.nan if empty else self.maximum,
+            'Mean': self.mean,
+            'Std': self.std,
+        }
+
+
+def chunks(curves, chunk_size=DEFAULT_CHUNK):
+    """{curve: array} split into {curve: row slice} blocks; slices of memory-mapped arrays stay lazy."""
+    n_rows = len(next(iter(curves.values()))) if curves else 0
+    for start in range(0, n_rows, chunk_size):
+        yield {name: values[start:start + chunk_size] for name, values in curves.items()}
+
+
+def summarize(blocks, stats=None):
+    """Update {curve: CurveStats} with every {curve: array} block (one pass) and return it."""
+    stats = {} if stats is None else stats
+    for block in blocks:
+        for name, values in block.items():
+            if name not in stats:
+                stats[name] = CurveStats(name)
+            stats[name].update(values)
+    return stats
+
+
+def summarize_curves(curves, chunk_size=DEFAULT_CHUNK):
+    return summarize(chunks(curves, chunk_size))
+
+
+def summarize_store(store, curves=None, chunk_size=DEFAULT_CHUNK):
+    """Summaries of the store's curves (not the depth index), read chunk by chunk from the memory maps."""
+    curves = store.keys[1:] if curves is None else [c for c in curves if c != store.index_name]
+    return summarize_curves({name: store.curve(name) for name in curves}, chunk_size)
+
+
+def merge_summaries(summaries):
+    """Combine {curve: CurveStats} of several wells or chunks into one per curve."""
+    merged = {}
+    for stats in summaries:
+        for name, curve_stats in stats.items():
+            if name not in merged:
+                merged[name] = CurveStats(name, curve_stats.sketch.relative_accuracy)
+            merged[name].merge(curve_stats)
+    return merged
+
+
+def summary_table(stats):
+    import pandas as pd
+
+    return pd.DataFrame([s.as_dict() for s in stats.values()], columns=SUMMARY_COLUMNS).set_index('Curve')
+
+
+def iqr_fences(curve_stats, k=1.5):
+    q1, q3 = curve_stats.quantiles([0.25, 0.75])
+    return q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+
+
+def interpolate_gaps(values):
+    """Fill NaN linearly by position in place, like DataFrame.interpolate(): leading gaps
+    stay NaN and trailing ones take the last value."""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    position = np.flatnonzero(~missing)
+    if not position.size:
+        return values
+    fill = np.flatnonzero(missing)
+    fill = fill[fill > position[0]]
+    values[fill] = np.interp(fill, position, values[position])
+    return values
+
+
+def _exact_fences(values, k=1.5):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q1, q3 = np.nanquantile(values, [0.25, 0.75])
+    return q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+
+
+def apply_outliers(curves, method, stats=None):
+    """Apply an outlier method to {curve: float64 array} in place.
+
+    Returns a boolean row mask for the row-wise methods ('Dropna()', 'IQR')
+    and None otherwise.  With stats ({curve: CurveStats}, e.g. merged from
+    chunks) the means and IQR fences come from the summaries; without, they
+    are computed exactly from the arrays, as pandas would.
+    """
+    if method == 'Fillna().mean':
+        for name, values in curves.items():
+            missing = np.isnan(values)
+            if missing.any() and not missing.all():
+                values[missing] = stats[name].mean if stats else values[~missing].mean()
+    elif method == 'Linear Interpolation':
+        for values in curves.values():
+            interpolate_gaps(values)
+    elif method == 'Dropna()':
+        keep = np.ones(len(next(iter(curves.values()))) if curves else 0, dtype=bool)
+        for values in curves.values():
+            keep &= ~np.isnan(values)
+        return keep
+    elif method == 'IQR':
+        keep = np.ones(len(next(iter(curves.values()))) if curves else 0, dtype=bool)
+        for name, values in curves.items():
+            low, high = iqr_fences(stats[name]) if stats else _exact_fences(values)
+            # NaN compares False, so missing samples (and all-NaN curves) do not drop a row
+            keep &= ~((values < low) | (values > high))
+        return keep
+    return None
+
+
+def boxplot_stats(table, k=1.5):
+    """matplotlib bxp() statistics from a summary_table: whiskers at the IQR fences clipped
+    to the observed range, notches from the median's normal-theory interval."""
+    boxes = []
+    for curve, row in table.iterrows():
+        if not row['Count']:
+            continue
+        iqr = row['P75'] - row['P25']
+        notch = 1.57 * iqr / math.sqrt(row['Count'])
+        boxes.append({
+            'label': curve,
+            'med': row['Median'],
+            'q1': row['P25'],
+            'q3': row['P75'],
+            'whislo': max(row['Min'], row['P25'] - k * iqr),
+            'whishi': min(row['Max'], row['P75'] + k * iqr),
+            'cilo': row['Median'] - notch,
+            'cihi': row['Median'] + notch,
+            'mean': row['Mean'],
+            # Only the extremes beyond the whiskers are known, not every outlier
+            'fliers': [v for v in (row['Min'], row['Max']) if v < row['P25'] - k * iqr or v > row['P75'] + k * iqr],
+        })
+    return boxes
@@ -0,0 +1,149 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import streamlit as st
+
+import crossplot
+import decimation
+import depth_grid
+import figure_cache
+import instrumentation
+import petrophysics
+import upscaling
+
+# Log widgets and plots shared by the log pages (well logging, multi-well and
+# core analysis): petrophysics parameters and tracks, density cross-plots and
+# the upscaling options.  Pages import them from here, not from each other.
+
+# Display settings for the petrophysics tracks: (x limits, color)
+PETROPHYSICS_TRACKS = {
+    'VSH': ((0, 1), 'green'),
+    'PHID': ((0.5, 0), 'red'),
+    'PHIT': ((0.5, 0), 'blue'),
+    'SW': ((1, 0), 'navy'),
+    'NET': ((0, 1), 'gold'),
+    'PAY': ((0, 1), 'darkorange'),
+}
+
+DENSITY_STATISTICS = ['Mean GR', 'Count']
+
+
+def crossplot_window(levels, x_col, y_col, key=''):
+    """Zoom sliders over the extent of a pyramid; returns (x range, y range, bins)."""
+    x_edges, y_edges = levels[0].x_edges, levels[0].y_edges
+    col1, col2, col3 = st.columns(3)
+    x_range = col1.slider(f"{x_col} range", float(x_edges[0]), float(x_edges[-1]),
+                          (float(x_edges[0]), float(x_edges[-1])), key=f"{key}x_range")
+    y_range = col2.slider(f"{y_col} range", float(y_edges[0]), float(y_edges[-1]),
+                          (float(y_edges[0]), float(y_edges[-1])), key=f"{key}y_range")
+    bins = col3.slider("Bins", 50, 400, crossplot.DEFAULT_BINS, step=10, key=f"{key}bins")
+    return x_range, y_range, bins
+
+
+@figure_cache.cached_figure
+def plot_density_crossplot(histograms, x_col, y_col, statistic):
+    """Cross-plot drawn from per-well histograms on shared edges ({well: Histogram2D});
+    with several wells, each well's sample area is outlined on top."""
+    from matplotlib.colors import LogNorm
+    from matplotlib.lines import Line2D
+
+    hist = crossplot.merge(histograms.values())
+    fig, ax = plt.subplots(figsize=(8, 6))
+    if statistic == 'Count':
+        image = ax.pcolormesh(hist.x_edges, hist.y_edges, np.ma.masked_equal(hist.counts, 0).T,
+                              norm=LogNorm(), cmap='viridis')
+        fig.colorbar(image, label="Samples per bin")
+    else:
+        image = ax.pcolormesh(hist.x_edges, hist.y_edges, np.ma.masked_invalid(crossplot.mean(hist)).T,
+                              vmin=0, vmax=100, cmap='rainbow')
+        fig.colorbar(image, label="Mean Gamma Ray (GR) - API")
+    if len(histograms) > 1:
+        colors = plt.get_cmap('tab10').colors
+        handles = []
+        for i, (well, outline) in enumerate(histograms.items()):
+            color = colors[i % len(colors)]
+            # Outline the area holding 90% of the well's samples, on coarser bins so it stays smooth
+            while min(outline.counts.shape) >= 2 * crossplot.OUTLINE_BINS:
+                outline = crossplot.coarsen(outline)
+            level = crossplot.enclosing_level(outline.counts)
+            if level > 0 and min(outline.counts.shape) > 1:
+                ax.contour((outline.x_edges[:-1] + outline.x_edges[1:]) / 2,
+                           (outline.y_edges[:-1] + outline.y_edges[1:]) / 2,
+                           outline.counts.T, levels=[level], colors=[color], linewidths=1.5)
+            handles.append(Line2D([], [], color=color, label=well))
+        ax.legend(handles=handles, fontsize='small')
+    if y_col in depth_grid.CURVE_ALIASES['RHOB']:
+        ax.invert_yaxis()
+    ax.set_xlabel(x_col)
+    ax.set_ylabel(y_col)
+    return fig
+
+
+def petrophysics_parameters():
+    p = dict(petrophysics.DEFAULT_PARAMETERS)
+    with st.expander("Petrophysics parameters"):
+        p['vsh_method'] = st.selectbox("Shale volume method", petrophysics.VSH_METHODS)
+        col1, col2, col3 = st.columns(3)
+        p['rho_matrix'] = col1.number_input("Matrix density (g/cc)", value=p['rho_matrix'], step=0.01)
+        p['rho_fluid'] = col2.number_input("Fluid density (g/cc)", value=p['rho_fluid'], step=0.01)
+        p['rw'] = col3.number_input("Rw (ohm.m)", value=p['rw'], step=0.01, format="%.3f")
+        p['a'] = col1.number_input("Tortuosity factor a", value=p['a'], step=0.1)
+        p['m'] = col2.number_input("Cementation exponent m", value=p['m'], step=0.1)
+        p['n'] = col3.number_input("Saturation exponent n", value=p['n'], step=0.1)
+        p['vsh_cutoff'] = col1.slider("Vsh cutoff", 0.0, 1.0, p['vsh_cutoff'])
+        p['phi_cutoff'] = col2.slider("Porosity cutoff", 0.0, 0.5, p['phi_cutoff'])
+        p['sw_cutoff'] = col3.slider("Sw cutoff", 0.0, 1.0, p['sw_cutoff'])
+    return p
+
+
+@figure_cache.cached_figure
+def plot_petrophysics(depth, results, top, base):
+    if not results:
+        st.warning("None of GR, RHOB/DEN, NPHI/NEU or RDEP were found; nothing to compute.")
+        return
+    fig, axes = plt.subplots(figsize=(2.5 * len(results), 10), ncols=len(results), sharey=True, squeeze=False)
+    for ax, (name, values) in zip(axes[0], results.items()):
+        xlim, color = PETROPHYSICS_TRACKS[name]
+        track_depth, track_values = decimation.decimate_track(ax, depth, values, top, base)
+        if name in ('NET', 'PAY'):
+            ax.fill_betweenx(track_depth, 0, np.nan_to_num(track_values), color=color, step='mid')
+        else:
+            ax.plot(track_values, track_depth, color=color, lw=0.5)
+        ax.set_xlim(*xlim)
+        ax.set_ylim(base, top)
+        ax.xaxis.set_ticks_position("top")
+        ax.xaxis.set_label_position("top")
+        ax.set_xlabel(name)
+        ax.grid()
+    fig.subplots_adjust(wspace=0.05)
+    return fig
+
+
+def upscaling_options(store):
+    """The store, or its upscaled copy when asked for; the views then read the coarser curves."""
+    with st.expander("Upscaling"):
+        if not st.checkbox("Work on upscaled curves"):
+            return store
+        blocks = st.radio("Blocks", ["Regular step", "Zone tops"], horizontal=True)
+        step, tops = upscaling.DEFAULT_STEP, None
+        if blocks == "Regular step":
+            step = st.number_input("Upscaled step", min_value=0.01, value=upscaling.DEFAULT_STEP)
+        else:
+            text = st.text_input("Zone tops (comma-separated depths)")
+            try:
+                tops = [float(top) for top in text.split(',') if top.strip()]
+            except ValueError:
+                st.error("Zone tops must be numbers separated by commas.")
+                return store
+            if not tops:
+                return store
+        defaults = upscaling.default_methods(store.keys[1:])
+        columns = st.columns(4)
+        methods = {}
+        for i, name in enumerate(store.keys[1:]):
+            method = defaults.get(name, 'Arithmetic')
+            methods[name] = columns[i % 4].selectbox(f"{name} average", upscaling.METHODS,
+                                                     index=upscaling.METHODS.index(method))
+        with instrumentation.stage("Upscale", rows=store.n_samples):
+            upscaled = upscaling.upscale_store(store, step, tops, methods)
+        st.caption(f"{store.n_samples} samples averaged into {upscaled.n_samples} blocks")
+        return upscaled
@@ -0,0 +1,78 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# Shared process pool for CPU-bound work (LAS ingestion, batch fitting, ...).
+#
+# The pool is created lazily and reused across reruns and sessions; the number
+# of workers can be set with the PETRO_WORKERS environment variable.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def max_workers():
+    return int(os.environ.get('PETRO_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def get_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers())
+        return _pool
+
+
+def reset_process_pool():
+    """Drop a broken pool so the next call starts fresh workers."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def map_ordered(func, args_list, on_progress=None, min_parallel=2):
+    """Run func(*args) for every args tuple, returning [(result, error), ...] in input order.
+
+    Exceptions are caught per item so one bad input does not fail the batch.
+    on_progress(done, total) is called from the calling thread as items finish.
+    Batches smaller than min_parallel run inline to skip the pool overhead.
+    """
+    args_list = list(args_list)
+    total = len(args_list)
+    results = [(None, None)] * total
+    if total < min_parallel or max_workers() < 2:
+        for i, args in enumerate(args_list):
+            try:
+                results[i] = (func(*args), None)
+            except Exception as e:
+                results[i] = (None, e)
+            if on_progress:
+                on_progress(i + 1, total)
+        return results
+
+    pool = get_process_pool()
+    try:
+        futures = {pool.submit(func, *args): i for i, args in enumerate(args_list)}
+    except BrokenProcessPool:
+        reset_process_pool()
+        pool = get_process_pool()
+        futures = {pool.submit(func, *args): i for i, args in enumerate(args_list)}
+
+    broken = False
+    for done, future in enumerate(as_completed(futures), start=1):
+        i = futures[future]
+        try:
+            results[i] = (future.result(), None)
+        except BrokenProcessPool as e:
+            broken = True
+            results[i] = (None, e)
+        except Exception as e:
+            results[i] = (None, e)
+        if on_progress:
+            on_progress(done, total)
+    if broken:
+        reset_process_pool()
+    return results
@@ -0,0 +1,190 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Petrophysical interpretation on whole curve arrays.
+#
+# Each step of the chain (shale volume, density porosity, total porosity,
+# Archie water saturation, net reservoir and pay flags) is one NumPy
+# expression over the input arrays.  Inputs can be single-well curves of shape
+# (depth,) or a depth_grid matrix slice of shape (wells, depth), so a whole
+# project is evaluated in one pass; per-well quantities such as the GR clean
+# and shale lines reduce along the last axis.  Steps whose inputs are missing
+# (e.g. no resistivity log) are skipped together with the steps that need them.
+
+INPUT_CURVES = ['GR', 'RHOB', 'NPHI', 'RDEP']
+VSH_METHODS = ['Linear', 'Larionov (Tertiary)', 'Larionov (Older rocks)']
+
+DEFAULT_PARAMETERS = {
+    # None: the 5th / 95th GR percentile of each well
+    'gr_clean': None,
+    'gr_shale': None,
+    'vsh_method': 'Linear',
+    'rho_matrix': 2.65,
+    'rho_fluid': 1.0,
+    'rw': 0.05,
+    'a': 1.0,
+    'm': 2.0,
+    'n': 2.0,
+    'vsh_cutoff': 0.4,
+    'phi_cutoff': 0.1,
+    'sw_cutoff': 0.6,
+}
+
+
+def _percentile(values, q):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanpercentile(values, q, axis=-1, keepdims=True)
+
+
+def shale_volume(curves, p):
+    gr = curves.get('GR')
+    if gr is None:
+        return None
+    clean = _percentile(gr, 5) if p['gr_clean'] is None else p['gr_clean']
+    shale = _percentile(gr, 95) if p['gr_shale'] is None else p['gr_shale']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vsh = np.subtract(gr, clean)
+        vsh /= np.subtract(shale, clean)
+    np.clip(vsh, 0, 1, out=vsh)
+    if p['vsh_method'] == 'Larionov (Tertiary)':
+        vsh = 0.083 * (2 ** (3.7 * vsh) - 1)
+    elif p['vsh_method'] == 'Larionov (Older rocks)':
+        vsh = 0.33 * (2 ** (2 * vsh) - 1)
+    return vsh
+
+
+def density_porosity(curves, p):
+    rhob = curves.get('RHOB')
+    if rhob is None:
+        return None
+    phid = np.subtract(p['rho_matrix'], rhob)
+    phid /= p['rho_matrix'] - p['rho_fluid']
+    return np.clip(phid, 0, 1, out=phid)
+
+
+def neutron_fraction(nphi):
+    """Neutron porosity as a fraction; logs recorded in percent are scaled per well."""
+    median = _percentile(nphi, 50)
+    return nphi * np.where(median > 1, 0.01, 1.0)
+
+
+def total_porosity(curves, p):
+    phid = curves.get('PHID')
+    if phid is None:
+        return None
+    nphi = curves.get('NPHI')
+    if nphi is None:
+        return phid
+    # Density-neutron average
+    phit = neutron_fraction(nphi)
+    phit += phid
+    phit *= 0.5
+    return np.clip(phit, 0, 1, out=phit)
+
+
+def water_saturation(curves, p):
+    phit, rt = curves.get('PHIT'), curves.get('RDEP')
+    if phit is None or rt is None:
+        return None
+    # Archie: Sw = (a * Rw / (phi^m * Rt))^(1/n)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        sw = np.power(phit, p['m'])
+        sw *= rt
+        np.divide(p['a'] * p['rw'], sw, out=sw)
+        np.power(sw, 1 / p['n'], out=sw)
+    return np.clip(sw, 0, 1, out=sw)
+
+
+def _flag(condition, *inputs):
+    # 1.0 / 0.0 flag, NaN wherever an input is missing
+    flag = condition.astype(np.float64)
+    for values in inputs:
+        flag[np.isnan(values)] = np.nan
+    return flag
+
+
+def net_flag(curves, p):
+    vsh, phit = curves.get('VSH'), curves.get('PHIT')
+    if vsh is None or phit is None:
+        return None
+    return _flag((vsh <= p['vsh_cutoff']) & (phit >= p['phi_cutoff']), vsh, phit)
+
+
+def pay_flag(curves, p):
+    net, sw = curves.get('NET'), curves.get('SW')
+    if net is None or sw is None:
+        return None
+    return _flag((net == 1) & (sw <= p['sw_cutoff']), net, sw)
+
+
+# The chain, in evaluation order: (output, step)
+STEPS = [
+    ('VSH', shale_volume),
+    ('PHID', density_porosity),
+    ('PHIT', total_porosity),
+    ('SW', water_saturation),
+    ('NET', net_flag),
+    ('PAY', pay_flag),
+]
+OUTPUTS = [name for name, _ in STEPS]
+
+
+def evaluate(curves, parameters=None, outputs=OUTPUTS):
+    """Run the chain over {mnemonic: array} inputs and return {output: array}.
+
+    Input arrays are read, never modified.  Only the requested outputs are
+    returned, although the steps they depend on are always evaluated.
+    """
+    p = dict(DEFAULT_PARAMETERS, **(parameters or {}))
+    values = {name: np.asarray(array, dtype=np.float64) for name, array in curves.items() if array is not None}
+    results = {}
+    for name, step in STEPS:
+        result = step(values, p)
+        if result is not None:
+            values[name] = results[name] = result
+    return {name: results[name] for name in outputs if name in results}
+
+
+def evaluate_matrix(matrix, parameters=None, outputs=OUTPUTS):
+    """evaluate() for every well of a depth_grid.CurveMatrix at once; arrays are (wells, depth)."""
+    curves = {}
+    for i, name in enumerate(matrix.mnemonics):
+        # A curve no well has is missing, not an all-NaN input
+        if name in INPUT_CURVES and not np.isnan(matrix.values[:, :, i]).all():
+            curves[name] = matrix.values[:, :, i]
+    return evaluate(curves, parameters, outputs)
+
+
+def cutoff_summary(depth, results, wells):
+    """Gross, net and pay thickness with averages per well.
+
+    depth is the shared depth basis; results arrays are (wells, depth), or
+    (depth,) for a single well.  Empty when there are fewer than two depths.
+    """
+    if np.size(depth) < 2:
+        return pd.DataFrame(columns=['Well', 'Gross', 'Net', 'N/G']).set_index('Well')
+    thickness = np.abs(np.gradient(np.asarray(depth, dtype=np.float64)))
+    results = {name: np.atleast_2d(values) for name, values in results.items()}
+    rows = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for w, well in enumerate(wells):
+            row = {'Well': well}
+            net = results['NET'][w] if 'NET' in results else np.full(thickness.size, np.nan)
+            gross = ~np.isnan(net)
+            row['Gross'] = thickness[gross].sum()
+            row['Net'] = thickness[net == 1].sum()
+            row['N/G'] = row['Net'] / row['Gross'] if row['Gross'] else np.nan
+            if 'VSH' in results:
+                row['Avg VSH (net)'] = np.nanmean(results['VSH'][w][net == 1])
+            if 'PHIT' in results:
+                row['Avg PHIT (net)'] = np.nanmean(results['PHIT'][w][net == 1])
+            if 'PAY' in results:
+                pay = results['PAY'][w] == 1
+                row['Pay'] = thickness[pay].sum()
+                row['Avg SW (pay)'] = np.nanmean(results['SW'][w][pay])
+            rows.append(row)
+    return pd.DataFrame(rows).set_index('Well')
@@ -0,0 +1,92 @@
+import hashlib
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+import disk_budget
+
+# Columnar on-disk cache for the production workbook.
+#
+# The first upload of a workbook is parsed with pd.read_excel once and written
+# to Parquet, keyed by a hash of the file bytes.  Later loads only read the
+# requested columns and push the wellbore/date filters down to the Parquet
+# reader, so switching wells or pages costs milliseconds instead of a full
+# openpyxl parse.  The store directory is kept within the disk_budget.
+
+WELLBORE_COLUMN = 'NPD_WELL_BORE_NAME'
+DATE_COLUMN = 'DATEPRD'
+DCA_COLUMNS = [DATE_COLUMN, WELLBORE_COLUMN, 'BORE_OIL_VOL']
+EUR_COLUMNS = [DATE_COLUMN, WELLBORE_COLUMN, 'BORE_GAS_VOL']
+ROW_GROUP_SIZE = 4096
+
+
+def default_root():
+    return os.environ.get('PETRO_PRODUCTION_STORE_DIR',
+                          os.path.join(tempfile.gettempdir(), 'petro_production_store'))
+
+
+def content_hash(bytes_data):
+    return hashlib.blake2b(bytes_data, digest_size=16).hexdigest()
+
+
+def _arrow_safe(df):
+    # Excel columns often mix numbers and text; store those as text.
+    for column in df.columns[df.dtypes == object]:
+        values = df[column].dropna()
+        if not values.map(type).eq(str).all():
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+
+def convert_workbook(bytes_data, path):
+    """Parse the workbook once and write it as Parquet, grouped by wellbore."""
+    df = pd.read_excel(io.BytesIO(bytes_data))
+    if WELLBORE_COLUMN in df.columns:
+        # Stable sort keeps the per-well date order while letting row-group
+        # statistics skip other wells.
+        df = df.sort_values(WELLBORE_COLUMN, kind='stable')
+    df = _arrow_safe(df)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Dot-prefixed so disk_budget.trim() leaves it alone while it is written
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+    disk_budget.trim(os.path.dirname(path), keep=path)
+
+
+def store_path(uploaded_file, root=None):
+    """Path of the Parquet copy of an upload, converting it on first use."""
+    return bytes_store_path(uploaded_file.getvalue(), root)
+
+
+def bytes_store_path(bytes_data, root=None):
+    """store_path for workbook bytes, e.g. read from disk by batch_cli."""
+    path = os.path.join(root or default_root(), content_hash(bytes_data) + '.parquet')
+    if not disk_budget.touch(path):
+        convert_workbook(bytes_data, path)
+    return path
+
+
+def load_production(source, columns=None, wellbore=None, start=None, end=None):
+    """Load selected columns of the workbook, keeping only rows for the wellbore and date range.
+
+    source is an uploaded workbook or the path returned by store_path.
+    """
+    filters = []
+    if wellbore is not None:
+        filters.append((WELLBORE_COLUMN, '==', wellbore))
+    if start is not None:
+        filters.append((DATE_COLUMN, '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append((DATE_COLUMN, '<=', pd.Timestamp(end)))
+    path = source if isinstance(source, str) else store_path(source)
+    df = pd.read_parquet(path, columns=columns, filters=filters or None)
+    return df.reset_index(drop=True)
+
+
+def wellbores(source):
+    path = source if isinstance(source, str) else store_path(source)
+    df = pd.read_parquet(path, columns=[WELLBORE_COLUMN])
+    return sorted(df[WELLBORE_COLUMN].dropna().unique())
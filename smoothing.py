@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Prefix-sum smoothing for the rolling-window sliders.
+#
+# The cumulative sum (and cumulative NaN count) of a series is computed once;
+# any centered moving average is then two gathers and a subtraction, and all
+# slider positions can be served together as one (windows x samples) array.
+# Results match Series.rolling(window, center=True).mean() with the default
+# min_periods: NaN at the edges and wherever the window touches a NaN.
+
+PREFIX_CACHE_SIZE = 128
+
+
+class PrefixSums:
+    """Cumulative sums of one series, ready to serve any centered window."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        missing = np.isnan(values)
+        self.n = values.size
+        self.sums = np.concatenate([[0.0], np.cumsum(np.where(missing, 0.0, values))])
+        self.missing = np.concatenate([[0], np.cumsum(missing)])
+
+    def centered_mean(self, windows):
+        """Centered moving averages; windows may be an int or a 1-D array of ints.
+
+        Returns shape (n,) for an int and (len(windows), n) for an array.
+        """
+        scalar = np.ndim(windows) == 0
+        windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))[:, None]
+        i = np.arange(self.n)[None, :]
+        # Same alignment as pandas: window covers [i - w // 2, i + (w - 1) // 2]
+        lo = i - windows // 2
+        hi = i + (windows - 1) // 2 + 1
+        valid = (lo >= 0) & (hi <= self.n)
+        lo = np.clip(lo, 0, self.n)
+        hi = np.clip(hi, 0, self.n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (self.sums[hi] - self.sums[lo]) / windows
+        valid &= (self.missing[hi] - self.missing[lo]) == 0
+        means[~valid] = np.nan
+        return means[0] if scalar else means
+
+
+_prefix_cache = OrderedDict()
+_prefix_lock = threading.Lock()
+
+
+def get_prefix_sums(key, values):
+    """PrefixSums for a series, cached under key (e.g. (data hash, wellbore, column))."""
+    with _prefix_lock:
+        prefix = _prefix_cache.get(key)
+        if prefix is not None:
+            _prefix_cache.move_to_end(key)
+            return prefix
+    prefix = PrefixSums(values)
+    with _prefix_lock:
+        _prefix_cache[key] = prefix
+        while len(_prefix_cache) > PREFIX_CACHE_SIZE:
+            _prefix_cache.popitem(last=False)
+    return prefix
+
+
+def centered_rolling_mean(values, window):
+    """Drop-in for pd.Series(values).rolling(window, center=True).mean().to_numpy()."""
+    return PrefixSums(values).centered_mean(window)
@@ -1,25 +1,16 @@
 import streamlit as st
 import pandas as pd
-import lasio
-from io import StringIO
+import las_cache
+import background
 import matplotlib.pyplot as plt
-from welly import Well, Project
-
-# Function to load and process multiple LAS files
-def load_wells(uploaded_files):
-    wells = []
-    for uploaded_file in uploaded_files:
-        try:
-            bytes_data = uploaded_file.read()
-            str_io = StringIO(bytes_data.decode('Windows-1252'))
-            las = lasio.read(str_io)
-            well = Well.from_lasio(las)
-            wells.append(well)
-        except Exception as e:
-            st.error(f"Error processing file {uploaded_file.name}: {e}")
-    return wells
+import decimation
+import figure_cache
+import instrumentation
+import numpy as np
+import trajectory
 
 # Function to load survey data from CSV file
+@instrumentation.instrumented("Load survey", rows=len)
 def load_survey(uploaded_file):
     try:
         return pd.read_csv(uploaded_file)
@@ -35,33 +26,49 @@ def show_well_details(wells):
         st.write(f"Curves: {list(well.data.keys())}")
 
 # Function to plot GR and DEPTH from all wells
+@figure_cache.cached_figure
 def plot_gr_curves(wells):
     fig, axs = plt.subplots(figsize=(14, 10), ncols=len(wells))
     for i, (ax, well) in enumerate(zip(axs, wells)):
         gr = well.get_curve('GR')
         if gr is not None:
-            gr.plot(ax=ax, c='green')
+            decimation.plot_curve(ax, gr, c='green')
             ax.set_title(f"GR for\n{well.name}")
     plt.tight_layout()
-    st.pyplot(fig)
+    return fig
 
 # Function to plot RHOB and DEPTH from all wells
+@figure_cache.cached_figure
 def plot_rhob_curves(wells):
     fig, axs = plt.subplots(figsize=(14, 10), ncols=len(wells))
     curve_name = 'RHOB'
     for i, (ax, well) in enumerate(zip(axs, wells)):
         rhob = well.get_curve(curve_name)
         if rhob is not None:
-            rhob.plot(ax=ax, c='red')
+            decimation.plot_curve(ax, rhob, c='red')
             ax.set_title(f"{curve_name} for\n{well.name}")
     plt.tight_layout()
-    st.pyplot(fig)
+    return fig
+
+# Surface location added to the 3D well path
+DATUM = [589075.56, 5963534.91, 0]
+
+# Function to desurvey once for all wells: the survey is shared unless it has a WELL column
+@instrumentation.instrumented("Desurvey", rows=len)
+def well_trajectories(survey, wells):
+    well_column = next((c for c in survey.columns if c.upper() == 'WELL'), None)
+    surveys = trajectory.surveys_from_frame(survey, well_column)
+    selected = [(well, surveys.get(well.name, surveys.get(None))) for well in wells]
+    selected = [(well, well_survey) for well, well_survey in selected if well_survey is not None]
+    trajectories = trajectory.desurvey_cached([well_survey for _, well_survey in selected])
+    return [(well, path) for (well, _), path in zip(selected, trajectories)]
 
 # Function to display location plots
-def show_location_plots(data, survey):
-    x_loc = data.location.position[:, 0]
-    y_loc = data.location.position[:, 1]
-    z_loc = data.location.position[:, 2]
+@figure_cache.cached_figure
+def show_location_plots(path, survey):
+    x_loc = path.x
+    y_loc = path.y
+    z_loc = path.tvd
 
     fig, ax = plt.subplots(figsize=(15, 5))
     ax1 = plt.subplot2grid(shape=(1, 3), loc=(0, 0))
@@ -89,14 +96,16 @@ def show_location_plots(data, survey):
     ax3.set_title('Y Location vs TVD')
 
     plt.tight_layout()
-    st.pyplot(fig)
+    return fig
 
 # Function to display 3D plot of well path
-def show_3d_plot(data):
-    location_data = data.location.trajectory(datum=[589075.56, 5963534.91, 0], elev=False)
-    xs = location_data[:, 0]
-    ys = location_data[:, 1]
-    zs = location_data[:, 2]
+@figure_cache.cached_figure
+def show_3d_plot(path):
+    md = np.linspace(path.md[0], path.md[-1], 1000)
+    xs, ys, zs = trajectory.position_at(path, md)
+    xs = xs + DATUM[0]
+    ys = ys + DATUM[1]
+    zs = zs + DATUM[2]
 
     fig = plt.figure(figsize=(8, 8))
     ax = plt.axes(projection='3d')
@@ -106,7 +115,7 @@ def show_3d_plot(data):
     ax.set_ylabel('Y Location')
     ax.set_zlabel('TVD')
     plt.ticklabel_format(style='plain')
-    st.pyplot(fig)
+    return fig
 
 # Streamlit App to display the page
 def show_page():
@@ -123,15 +132,22 @@ def show_page():
         ["LAS Curves", "Survey Data", "Location Plots", "3D Plot of Well Path"]
     )
 
+    wells = None
     if las_files:
-        wells = load_wells(las_files)
+        wells = background.load_wells(las_files)
+    else:
+        background.cancel("load_wells")
+
+    if wells is not None:
         st.success(f"{len(wells)} wells loaded successfully")
 
         if "LAS Curves" in display_options:
+            # Read the curves straight from the memory-mapped store instead of copying them out of welly
+            for las_file in las_files:
+                store = las_cache.load_store(las_file)
+                st.write(f"LAS Data in DataFrame for {store.header_value('WELL', las_file.name)}:")
+                st.dataframe(store.read())
             for well in wells:
-                las_df = pd.DataFrame({curve: well.data[curve].values for curve in well.data.keys()})
-                st.write(f"LAS Data in DataFrame for {well.name}:")
-                st.dataframe(las_df)
                 well.plot(extents='curves')
 
     if survey_file:
@@ -141,17 +157,16 @@ def show_page():
                 st.write("Survey Data:")
                 st.dataframe(survey)
 
-            if "Location Plots" in display_options:
-                if las_files:
-                    for well in wells:
-                        survey_subset = survey[['MD', 'INC', 'AZI']]
-                        well.location.add_deviation(survey_subset.values)
-                        show_location_plots(well, survey)
-
-            if "3D Plot of Well Path" in display_options:
-                if las_files:
-                    for well in wells:
-                        show_3d_plot(well)
+            if wells is not None and ("Location Plots" in display_options or "3D Plot of Well Path" in display_options):
+                paths = well_trajectories(survey, wells)
+
+                if "Location Plots" in display_options:
+                    for well, path in paths:
+                        show_location_plots(path, survey)
+
+                if "3D Plot of Well Path" in display_options:
+                    for well, path in paths:
+                        show_3d_plot(path)
 
 if __name__ == "__main__":
     show_page()
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import decimation  # noqa: E402
+
+
+def curve(n=48000):
+    rng = np.random.default_rng(0)
+    depth = 1000 + 0.1524 * np.arange(n)
+    values = np.cumsum(rng.normal(size=n))
+    values[rng.choice(n, 200, replace=False)] = np.nan
+    # Single-sample spikes must survive decimation
+    values[12345], values[30001] = 1e4, -1e4
+    return depth, values
+
+
+def test_envelope_keeps_extremes():
+    depth, values = curve()
+    out_depth, out_values = decimation.minmax_decimate(depth, values, n_pixels=300)
+    assert out_values.size <= 2 * 300 * decimation.OVERSAMPLING + 2
+    assert np.nanmax(out_values) == np.nanmax(values)
+    assert np.nanmin(out_values) == np.nanmin(values)
+    assert np.all(np.diff(out_depth) > 0)
+    # Every point is a raw sample
+    index = np.searchsorted(depth, out_depth)
+    np.testing.assert_array_equal(values[index], out_values)
+
+
+def test_window_and_decreasing_depth():
+    depth, values = curve()
+    pyramid = decimation.LodPyramid(depth[::-1], values[::-1])
+    top, base = depth[10000], depth[20000]
+    out_depth, out_values = pyramid.query(top, base, n_pixels=200)
+    inside = (depth >= top) & (depth <= base)
+    assert np.all((out_depth >= top) & (out_depth <= base))
+    assert np.nanmax(out_values) == np.nanmax(values[inside])
+    assert np.nanmin(out_values) == np.nanmin(values[inside])
+    assert np.all(np.diff(out_depth) < 0)
+
+
+def test_short_curve_is_not_decimated():
+    depth, values = np.arange(100.0), np.sin(np.arange(100.0))
+    out_depth, out_values = decimation.minmax_decimate(depth, values, n_pixels=500)
+    np.testing.assert_array_equal(out_depth, depth)
+    np.testing.assert_array_equal(out_values, values)
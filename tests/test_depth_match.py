@@ -0,0 +1,44 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import depth_match  # noqa: E402
+
+
+def brute_force(x, y, lag):
+    # Pearson correlation of x[i] against y[i + lag] over the samples present in both
+    i = np.arange(x.size)
+    j = i + lag
+    inside = (j >= 0) & (j < y.size)
+    a, b = x[i[inside]], y[j[inside]]
+    both = np.isfinite(a) & np.isfinite(b)
+    if both.sum() < depth_match.MIN_OVERLAP:
+        return np.nan
+    return np.corrcoef(a[both], b[both])[0, 1]
+
+
+def test_masked_correlation_matches_brute_force():
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=300), rng.normal(size=300)
+    x[rng.choice(300, 60, replace=False)] = np.nan
+    y[100:140] = np.nan
+    lags, scores = depth_match.masked_correlation(x, y, 40)
+    expected = [brute_force(x, y, lag) for lag in lags]
+    np.testing.assert_allclose(scores, expected, atol=1e-9)
+
+
+def test_estimate_shift_recovers_a_known_shift():
+    rng = np.random.default_rng(1)
+    log_depth = np.arange(1000.0, 1200.0, 0.5)
+    log_values = np.convolve(rng.normal(size=log_depth.size), np.ones(5) / 5, mode='same')
+    # Sparse core plugs read the log 3.2 m deeper than they were logged
+    core_depth = np.sort(rng.uniform(1050.0, 1150.0, 150))
+    core_values = np.interp(core_depth + 3.2, log_depth, log_values)
+    result = depth_match.estimate_shift(core_depth, core_values, log_depth, log_values,
+                                        max_shift=8.0)
+    assert abs(result.shift - 3.2) < 0.25
+    assert result.correlation > 0.9
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import curve_store  # noqa: E402
+import disk_budget  # noqa: E402
+
+
+def write(root, key, n=2**17):
+    # One 1 MB depth column
+    return curve_store.write_columns([np.arange(n, dtype=np.float64)], [['DEPT', 'M', '', '']], [], [], key, root)
+
+
+def test_least_recently_opened_stores_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setenv('PETRO_STORE_MB', '2.5')
+    root = str(tmp_path)
+    for i, key in enumerate(['a', 'b']):
+        write(root, key)
+        os.utime(os.path.join(root, key), (i, i))
+    assert curve_store.open_store('a', root) is not None
+    write(root, 'c')
+    assert curve_store.open_store('b', root) is None
+    assert curve_store.open_store('a', root) is not None
+    assert curve_store.open_store('c', root) is not None
+    assert sum(disk_budget.entry_size(os.path.join(root, key)) for key in os.listdir(root)) <= 2.5 * 2**20
+
+
+def test_new_entry_is_kept_over_budget(tmp_path):
+    root = str(tmp_path)
+    store = write(root, 'big')
+    assert disk_budget.trim(root, keep=store.path, max_bytes=0) == []
+    assert os.path.exists(store.path)
@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import instrumentation  # noqa: E402
+
+
+class Session(threading.Thread):
+    # A page run in its own thread, like a Streamlit session, inside stage(name) until finish()
+    def __init__(self, trace_memory=True, name=None):
+        super().__init__()
+        self.trace_memory = trace_memory
+        self.stage_name = name
+        self.started = threading.Event()
+        self._finish = threading.Event()
+        self.start()
+        self.started.wait()
+
+    def run(self):
+        instrumentation.start_run('other', self.trace_memory)
+        if self.stage_name:
+            with instrumentation.stage(self.stage_name):
+                self.started.set()
+                self._finish.wait()
+        else:
+            self.started.set()
+            self._finish.wait()
+        instrumentation.stop_run()
+
+    def finish(self):
+        self._finish.set()
+        self.join()
+
+
+def test_tracing_stops_with_the_last_traced_run():
+    assert not tracemalloc.is_tracing()
+    instrumentation.start_run('page')
+    other = Session()
+    Session(trace_memory=False).finish()
+    assert tracemalloc.is_tracing()
+    instrumentation.stop_run()
+    assert tracemalloc.is_tracing()
+    other.finish()
+    assert not tracemalloc.is_tracing()
+
+
+def test_peak_reset_by_another_run_is_unknown():
+    instrumentation.start_run('page')
+    with instrumentation.stage('outer') as outer:
+        with instrumentation.stage('inner') as inner:
+            data = bytearray(2**20)
+        del data
+        other = Session(name='other stage')
+    with instrumentation.stage('after') as after:
+        pass
+    other.finish()
+    instrumentation.stop_run()
+    assert inner.peak_bytes >= 2**20
+    assert outer.peak_bytes is None
+    assert after.peak_bytes is not None
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import jobs  # noqa: E402
+import memory_cache  # noqa: E402
+
+
+def run(slot, key, n):
+    # np.zeros(n) in the pool: a result of n * 8 bytes
+    job = jobs.submit(slot, key, np.zeros, lambda: [(n,)])
+    assert job.wait(60)
+    return job
+
+
+def test_finished_jobs_are_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(jobs, '_finished', memory_cache.MemoryCache(3 * 2**20))
+    first = run(('test', 'a'), ('zeros', 1), 2**17)
+    assert run(('test', 'b'), ('zeros', 1), 2**17) is first
+    assert first.nbytes() == 2**20 + jobs.TASK_OVERHEAD
+
+    # Two more 1 MB results push the least recently used one out
+    run(('test', 'a'), ('zeros', 2), 2**17)
+    run(('test', 'a'), ('zeros', 3), 2**17)
+    run(('test', 'b'), ('zeros', 4), 2**17)
+    assert jobs._finished.current_bytes <= 3 * 2**20
+    assert run(('test', 'b'), ('zeros', 1), 2**17) is not first
@@ -0,0 +1,41 @@
+import glob
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import las_reader  # noqa: E402
+
+LAS_FILES = sorted(glob.glob(os.path.join(ROOT, '*.las')))
+
+
+@pytest.mark.parametrize('path', LAS_FILES, ids=os.path.basename)
+def test_fast_path_matches_lasio(path):
+    with open(path, 'rb') as f:
+        bytes_data = f.read()
+    fast = las_reader.read_las_fast(bytes_data)
+    reference = las_reader.read_las_lasio(bytes_data)
+    assert fast.keys == reference.keys
+    assert fast.data.shape == reference.data.shape
+    np.testing.assert_allclose(fast.data, reference.data, equal_nan=True)
+    for section in ('well', 'params'):
+        fast_items, reference_items = getattr(fast, section), getattr(reference, section)
+        assert list(fast_items) == list(reference_items)
+        for mnemonic, item in reference_items.items():
+            assert fast_items[mnemonic].unit == item.unit
+
+
+def test_unsupported_files_fall_back_to_lasio():
+    with open(LAS_FILES[0], 'rb') as f:
+        bytes_data = f.read()
+    header, data = las_reader.split_sections(bytes_data)
+    # A comment inside ~A is left to lasio
+    commented = header + b'~A\n# comment\n' + data
+    with pytest.raises(las_reader.LasFormatError):
+        las_reader.read_las_fast(commented)
+    np.testing.assert_allclose(las_reader.read_las(commented).data, las_reader.read_las_fast(bytes_data).data,
+                               equal_nan=True)
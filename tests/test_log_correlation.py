@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import log_correlation  # noqa: E402
+
+
+def signal(n, seed=0):
+    # Smoothed noise, so that neighbouring samples look alike as on a real log
+    rng = np.random.default_rng(seed)
+    return np.convolve(rng.normal(size=n), np.ones(8) / 8, mode='same')
+
+
+def test_warp_paths_recovers_a_known_shift():
+    trace = signal(1200)
+    reference, other = trace[100:1100], trace[120:1120]
+    # Band centred on no shift, wide enough to find the 20 samples on its own
+    matches, costs = log_correlation.warp_paths(reference, other[None, :], [0], 30)
+    assert np.all(matches[0, 50:] == np.arange(50, 1000) - 20)
+    assert costs[0] < 0.01
+
+
+def test_align_wells_recovers_a_shift_and_a_stretch():
+    n = 3000
+    x = np.arange(n, dtype=np.float64)
+    trace = signal(n + 400, seed=1)
+    reference = np.interp(x, np.arange(n + 400), trace)
+    shifted = np.interp(x + 20, np.arange(n + 400), trace)
+    # Reference sample i is at sample 1.03 * i of the stretched well
+    stretched = np.interp(x / 1.03, np.arange(n + 400), trace)
+    values = log_correlation.normalize(np.vstack([reference, shifted, stretched]))
+    alignment = log_correlation.align_wells(values, 0, 1.0)
+    assert abs(alignment.shifts[1] + 20) < 0.1
+    inside = np.arange(100, n - 20)
+    assert np.all(np.abs(alignment.matches[1, inside] - (inside - 20)) <= 1)
+    # Away from the end, where the stretched well runs out of samples
+    inside = np.arange(100, int(n / 1.03) - 50)
+    assert np.all(np.abs(alignment.matches[2, inside] - 1.03 * inside) <= 2)
+    np.testing.assert_array_equal(alignment.matches[0], np.arange(n))
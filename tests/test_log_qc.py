@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import log_qc  # noqa: E402
+
+QS = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def curves(n=50000, seed=0):
+    rng = np.random.default_rng(seed)
+    gr = rng.lognormal(4.0, 0.6, n)
+    sp = rng.normal(-20.0, 30.0, n)
+    sp[rng.choice(n, n // 20, replace=False)] = np.nan
+    return {'GR': gr, 'SP': sp}
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    for values in curves().values():
+        values = values[np.isfinite(values)]
+        sketch = log_qc.QuantileSketch()
+        sketch.update(values)
+        # The sketch reports the sample at rank floor(q * (n - 1))
+        exact = np.sort(values)[np.floor(np.array(QS) * (values.size - 1)).astype(int)]
+        estimate = sketch.quantiles(QS)
+        assert np.all(np.abs(estimate - exact) <= log_qc.RELATIVE_ACCURACY * np.abs(exact) + 1e-12)
+
+
+def test_merged_summaries_equal_single_pass():
+    data = curves()
+    single = log_qc.summarize_curves(data)
+    halves = [{name: values[:20000] for name, values in data.items()},
+              {name: values[20000:] for name, values in data.items()}]
+    merged = log_qc.merge_summaries(log_qc.summarize_curves(half, chunk_size=7000) for half in halves)
+    for name, values in data.items():
+        a, b = single[name], merged[name]
+        finite = values[np.isfinite(values)]
+        assert a.count == b.count == finite.size
+        assert a.nulls == b.nulls == values.size - finite.size
+        assert a.minimum == b.minimum == finite.min()
+        assert a.maximum == b.maximum == finite.max()
+        np.testing.assert_allclose([a.mean, a.std], [finite.mean(), finite.std(ddof=1)], rtol=1e-10)
+        np.testing.assert_allclose([b.mean, b.std], [finite.mean(), finite.std(ddof=1)], rtol=1e-10)
+        # Sketch buckets add, so merged quantiles are exactly the single-pass ones
+        np.testing.assert_array_equal(a.quantiles(QS), b.quantiles(QS))
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import petrophysics  # noqa: E402
+
+
+def test_cutoff_summary_thickness():
+    depth = np.arange(100.0, 110.0)
+    net = np.array([[1, 1, 1, 1, 0, 0, 0, 0, np.nan, np.nan]], dtype=np.float64)
+    summary = petrophysics.cutoff_summary(depth, {'NET': net}, ['A'])
+    assert summary.loc['A', 'Gross'] == 8.0
+    assert summary.loc['A', 'Net'] == 4.0
+    assert summary.loc['A', 'N/G'] == 0.5
+
+
+def test_cutoff_summary_without_depths():
+    for depth in (np.empty(0), np.array([100.0])):
+        results = {'NET': np.ones((2, depth.size))}
+        summary = petrophysics.cutoff_summary(depth, results, ['A', 'B'])
+        assert summary.empty
+        assert 'Net' in summary.columns
@@ -0,0 +1,50 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import trajectory  # noqa: E402
+
+
+def surveys():
+    # Build-and-turn wells of different lengths
+    result = []
+    for w, td in enumerate([1500.0, 2400.0, 3000.0]):
+        md = np.arange(0.0, td + 1, 30.0)
+        inc = np.clip((md - 300 - 100 * w) / 25, 0, 60)
+        azi = (40 * w + md / 50) % 360
+        result.append((md, inc, azi))
+    return result
+
+
+def test_matches_welly():
+    from welly.tools import compute_position_log
+
+    batch = trajectory.desurvey(surveys())
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for survey, path in zip(surveys(), batch):
+            reference = compute_position_log(np.column_stack(survey), course_length=30)[1]
+            np.testing.assert_allclose(np.column_stack([path.x, path.y, path.tvd]), reference, atol=1e-6)
+
+
+def test_vertical_well():
+    md = np.arange(0.0, 1000.0, 100.0)
+    path, = trajectory.desurvey([(md, np.zeros_like(md), np.zeros_like(md))])
+    np.testing.assert_allclose(path.tvd, md)
+    np.testing.assert_allclose(path.x, 0, atol=1e-12)
+    np.testing.assert_allclose(path.dls, 0, atol=1e-12)
+
+
+def test_position_at_follows_the_arcs():
+    # A build at a constant rate in one plane is a single circular arc, so halfway
+    # positions must match a survey with stations at the halfway depths as well
+    md = np.arange(0.0, 1001.0, 50.0)
+    inc, azi = md * 0.06, np.full(md.size, 45.0)
+    coarse, fine = trajectory.desurvey([(md[::2], inc[::2], azi[::2]), (md, inc, azi)])
+    np.testing.assert_allclose(np.column_stack(trajectory.position_at(coarse, md)),
+                               np.column_stack([fine.x, fine.y, fine.tvd]), atol=1e-6)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import upscaling  # noqa: E402
+
+
+def two_layers():
+    # One 10-unit block: 5 units of 1, then 5 units of 100 (irregular sampling in the second layer)
+    depth = np.concatenate([np.arange(0.0, 5.0, 0.5), np.arange(5.0, 10.01, 1.0)])
+    values = np.where(depth < 5, 1.0, 100.0)
+    return depth, values, np.array([0.0, 10.0])
+
+
+def test_averages_of_two_layers():
+    depth, values, edges = two_layers()
+    methods = {'A': 'Arithmetic', 'H': 'Harmonic', 'G': 'Geometric'}
+    _, means = upscaling.upscale(depth, {name: values for name in methods}, edges, methods)
+    a, h, g = means['A'][0], means['H'][0], means['G'][0]
+    weights = upscaling.sample_thickness(depth)
+    assert np.isclose(a, np.average(values, weights=weights))
+    assert np.isclose(h, 1 / np.average(1 / values, weights=weights))
+    assert np.isclose(g, np.exp(np.average(np.log(values), weights=weights)))
+    assert h <= g <= a
+
+
+def test_backus_without_density_is_rms_slowness():
+    depth, values, edges = two_layers()
+    _, means = upscaling.upscale(depth, {'DT': values}, edges, {'DT': 'Backus'})
+    weights = upscaling.sample_thickness(depth)
+    assert np.isclose(means['DT'][0], np.sqrt(np.average(values ** 2, weights=weights)))
+
+
+def test_empty_depth():
+    edges = upscaling.step_edges(np.empty(0))
+    centres, means = upscaling.upscale(np.empty(0), {'GR': np.empty(0)}, edges)
+    assert centres.size == 0 and means['GR'].size == 0
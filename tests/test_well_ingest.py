@@ -0,0 +1,44 @@
+import glob
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import well_ingest  # noqa: E402
+
+
+class Upload:
+    # The parts of a Streamlit UploadedFile that well_ingest reads
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            self._bytes = f.read()
+
+    def getvalue(self):
+        return self._bytes
+
+
+def load(uploads, slot):
+    results, pending, keys = well_ingest.cached_wells(uploads)
+    if pending:
+        job = well_ingest.submit_pending(slot, pending)
+        assert job.wait(120)
+        results = well_ingest.store_wells(results, pending, job.outcomes())
+    return results, keys
+
+
+def test_evicted_well_is_ingested_again():
+    uploads = [Upload(path) for path in sorted(glob.glob(os.path.join(ROOT, '*.las')))[:2]]
+    cache = well_ingest.get_cache()
+    cache.clear()
+    slot = ('test', 'load_wells')
+    load(uploads[:1], slot)
+    results, keys = load(uploads, slot)
+    assert all(error is None for _, _, error in results)
+
+    # The first well leaves the cache after the job for the second one finished
+    cache.discard(keys[0])
+    results, _ = load(uploads, slot)
+    assert [name for name, _, _ in results] == [upload.name for upload in uploads]
+    assert all(well is not None and error is None for _, well, error in results)
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# Minimum-curvature desurvey for many wells at once.
+#
+# Surveys of different lengths are padded into (wells x stations) arrays and
+# X/Y/TVD/DLS for every station of every well come out of one vectorized
+# pass.  Results are cached by a hash of the survey, so reruns and wells that
+# share a survey do not desurvey again.  position_at interpolates along the
+# minimum-curvature arcs (not straight chords) at arbitrary measured depths,
+# e.g. the depth basis of a log.
+#
+# Conventions follow welly/wellpathpy: angles in degrees, azimuth clockwise
+# from north, X = easting offset, Y = northing offset, TVD positive down, and
+# a surface station (0, 0, 0) is added when the survey starts below MD 0.
+
+COURSE_LENGTH = 30
+TRAJECTORY_CACHE_SIZE = 256
+
+Trajectory = namedtuple('Trajectory', ['md', 'inc', 'azi', 'x', 'y', 'tvd', 'dls'])
+
+
+def _unit_vectors(inc, azi):
+    # Direction cosines (east, north, down) of the hole at each station
+    inc, azi = np.radians(inc), np.radians(azi)
+    return np.stack([np.sin(inc) * np.sin(azi), np.sin(inc) * np.cos(azi), np.cos(inc)], axis=-1)
+
+
+def _dogleg(t1, t2):
+    # Angle between unit vectors; the chord form stays accurate for tiny angles
+    return 2 * np.arcsin(np.clip(np.linalg.norm(t2 - t1, axis=-1) / 2, 0, 1))
+
+
+def minimum_curvature(md, inc, azi, course_length=COURSE_LENGTH):
+    """Positions and dogleg severity for (wells x stations) arrays.
+
+    Rows may be padded at the end with NaN.  Returns (x, y, tvd, dls) arrays
+    of the same shape; dls is in degrees per course_length and 0 at the first
+    station.
+    """
+    md, inc, azi = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (md, inc, azi))
+    t = _unit_vectors(inc, azi)
+    t1, t2 = t[:, :-1], t[:, 1:]
+    d_md = np.diff(md, axis=1)
+    beta = _dogleg(t1, t2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.where(beta > 1e-9, 2 / beta * np.tan(beta / 2), 1.0)
+        dls = np.degrees(beta) / d_md * course_length
+    steps = (d_md / 2 * ratio)[..., None] * (t1 + t2)
+    # NaN padding stays NaN through the running sum of that row only
+    position = np.concatenate([np.zeros_like(t[:, :1]), np.cumsum(steps, axis=1)], axis=1)
+    dls = np.concatenate([np.zeros_like(md[:, :1]), dls], axis=1)
+    return position[..., 0], position[..., 1], position[..., 2], dls
+
+
+def _prepare(survey):
+    md, inc, azi = (np.asarray(a, dtype=np.float64) for a in survey)
+    if md.size and md[0] > 0:
+        md, inc, azi = (np.concatenate([[0.0], a]) for a in (md, inc, azi))
+    return md, inc, azi
+
+
+def desurvey(surveys, course_length=COURSE_LENGTH):
+    """Desurvey a list of (md, inc, azi) surveys in one batch; returns a list of Trajectory."""
+    surveys = [_prepare(survey) for survey in surveys]
+    if not surveys:
+        return []
+    length = max(md.size for md, _, _ in surveys)
+    padded = np.full((3, len(surveys), length), np.nan)
+    for w, survey in enumerate(surveys):
+        for k, values in enumerate(survey):
+            padded[k, w, :values.size] = values
+    x, y, tvd, dls = minimum_curvature(*padded, course_length=course_length)
+    trajectories = []
+    for w, (md, inc, azi) in enumerate(surveys):
+        n = md.size
+        trajectories.append(Trajectory(md, inc, azi, x[w, :n], y[w, :n], tvd[w, :n], dls[w, :n]))
+    return trajectories
+
+
+def survey_hash(survey, course_length=COURSE_LENGTH):
+    h = hashlib.blake2b(digest_size=16)
+    for values in survey:
+        h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        h.update(b'|')
+    h.update(str(course_length).encode())
+    return h.hexdigest()
+
+
+_trajectory_cache = OrderedDict()
+_trajectory_lock = threading.Lock()
+
+
+def desurvey_cached(surveys, course_length=COURSE_LENGTH):
+    """desurvey with results cached by survey hash; only uncached surveys are computed (together)."""
+    keys = [survey_hash(survey, course_length) for survey in surveys]
+    results = {}
+    with _trajectory_lock:
+        for key in keys:
+            if key in _trajectory_cache:
+                _trajectory_cache.move_to_end(key)
+                results[key] = _trajectory_cache[key]
+    missing = {key: survey for key, survey in zip(keys, surveys) if key not in results}
+    if missing:
+        computed = dict(zip(missing, desurvey(list(missing.values()), course_length)))
+        results.update(computed)
+        with _trajectory_lock:
+            _trajectory_cache.update(computed)
+            while len(_trajectory_cache) > TRAJECTORY_CACHE_SIZE:
+                _trajectory_cache.popitem(last=False)
+    return [results[key] for key in keys]
+
+
+def position_at(trajectory, md):
+    """(x, y, tvd) at the measured depths md, following the arc between stations.
+
+    Depths outside the survey are extrapolated along the end station's direction.
+    """
+    md = np.asarray(md, dtype=np.float64)
+    stations = trajectory.md
+    t = _unit_vectors(trajectory.inc, trajectory.azi)
+    points = np.stack([trajectory.x, trajectory.y, trajectory.tvd], axis=-1)
+    i = np.clip(np.searchsorted(stations, md, side='right') - 1, 0, stations.size - 2)
+    start, t1, t2 = points[i], t[i], t[i + 1]
+    u = md - stations[i]
+    # Beyond the last station continue straight along its direction
+    beyond = md > stations[-1]
+    u = np.where(beyond, md - stations[-1], u)
+    start = np.where(beyond[..., None], points[-1], start)
+    t1 = np.where(beyond[..., None], t[-1], t1)
+    beta = np.where(beyond, 0.0, _dogleg(t1, t2))
+    d_md = stations[i + 1] - stations[i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        radius = d_md / beta
+        normal = (t2 - np.cos(beta)[..., None] * t1) / np.sin(beta)[..., None]
+        angle = u / radius
+        arc = radius[..., None] * (np.sin(angle)[..., None] * t1 + (1 - np.cos(angle))[..., None] * normal)
+    offset = np.where((beta > 1e-9)[..., None], arc, u[..., None] * t1)
+    position = start + offset
+    return position[..., 0], position[..., 1], position[..., 2]
+
+
+def surveys_from_frame(survey, well_column=None):
+    """{well: (md, inc, azi)} from a survey table with MD, INC and AZI columns.
+
+    Without a well column the whole table is one survey under the key None.
+    """
+    columns = ['MD', 'INC', 'AZI']
+    if well_column is None or well_column not in survey.columns:
+        return {None: tuple(survey[c].to_numpy(dtype=np.float64) for c in columns)}
+    return {well: tuple(group[c].to_numpy(dtype=np.float64) for c in columns)
+            for well, group in survey.sort_values([well_column, 'MD']).groupby(well_column, sort=False)}
+
+
+def trajectory_table(trajectories):
+    """Stations of {well: Trajectory} as one table with a WELL column."""
+    import pandas as pd
+
+    frames = [pd.DataFrame({'WELL': well, 'MD': path.md, 'INC': path.inc, 'AZI': path.azi,
+                            'X': path.x, 'Y': path.y, 'TVD': path.tvd, 'DLS': path.dls})
+              for well, path in trajectories.items()]
+    columns = ['WELL', 'MD', 'INC', 'AZI', 'X', 'Y', 'TVD', 'DLS']
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
@@ -0,0 +1,186 @@
+import json
+import os
+
+import numpy as np
+
+import curve_store
+import depth_grid
+import las_cache
+
+# Depth upscaling (block averaging) of log curves.
+#
+# Samples are assigned to blocks, either a regular coarser step or the zones
+# between given tops, and every curve is reduced per block with weighted
+# np.bincount sums over all curves at once.  A sample weighs its thickness
+# (half the distance to each neighbour, so irregular sampling averages
+# correctly); missing samples weigh nothing, so a block is averaged over the
+# samples it has and is NaN only when it has none.
+#
+# Averages: arithmetic, harmonic (e.g. resistivity of layers in parallel),
+# geometric, and Backus for sonic slowness, which averages the P-wave modulus
+# of the layers with the density: DT = sqrt(<RHOB> * <DT^2 / RHOB>), or the
+# RMS slowness when the log has no density.  Harmonic and geometric averages
+# skip values that are not positive.
+#
+# Upscaled curves are written as a curve store of their own, keyed by the
+# source store and the settings, so repeat requests (other reruns, sessions
+# and pages) open it instead of recomputing it, and the rest of the app reads
+# it like any other store.
+
+METHODS = ['Arithmetic', 'Harmonic', 'Geometric', 'Backus']
+DEFAULT_STEP = 1.0
+# Averages per canonical mnemonic (depth_grid aliases); other curves are averaged arithmetically
+DEFAULT_METHODS = {
+    'DT': 'Backus',
+    'RDEP': 'Harmonic',
+}
+
+
+def step_edges(depth, step=DEFAULT_STEP):
+    """Block edges on multiples of step covering the depth range."""
+    depth = np.asarray(depth, dtype=np.float64)
+    depth = depth[np.isfinite(depth)]
+    if not depth.size:
+        return np.empty(0)
+    top = np.floor(depth.min() / step) * step
+    n = int(np.floor((depth.max() - top) / step + 1e-9)) + 1
+    return top + step * np.arange(n + 1)
+
+
+def zone_edges(depth, tops):
+    """Block edges at the tops, with the log's first and last depth closing the outer zones."""
+    depth = np.asarray(depth, dtype=np.float64)
+    depth = depth[np.isfinite(depth)]
+    if not depth.size:
+        return np.empty(0)
+    lo, hi = depth.min(), depth.max()
+    inner = [t for t in sorted(set(float(t) for t in tops)) if lo < t < hi]
+    return np.array([lo] + inner + [hi])
+
+
+def sample_thickness(depth):
+    """Thickness represented by each sample: half the distance to each neighbour."""
+    depth = np.asarray(depth, dtype=np.float64)
+    if depth.size < 2:
+        return np.ones(depth.shape)
+    gaps = np.abs(np.diff(depth))
+    thickness = np.empty(depth.shape)
+    thickness[0], thickness[-1] = gaps[0], gaps[-1]
+    thickness[1:-1] = (gaps[:-1] + gaps[1:]) / 2
+    return thickness
+
+
+def block_index(depth, edges):
+    """Block of every sample (the last edge belongs to the last block) and whether it is in any."""
+    index = np.searchsorted(edges, depth, side='right') - 1
+    index[depth == edges[-1]] = edges.size - 2
+    inside = (index >= 0) & (index < edges.size - 1)
+    return np.where(inside, index, 0), inside
+
+
+def _block_means(block, weights, values, n_blocks):
+    # (curves x samples) weighted means per block; values may hold NaN where weights are 0
+    n_curves = values.shape[0]
+    flat = (np.arange(n_curves)[:, None] * n_blocks + block[None, :]).ravel()
+    size = n_curves * n_blocks
+    totals = np.bincount(flat, weights=weights.ravel(), minlength=size).reshape(n_curves, n_blocks)
+    sums = np.bincount(flat, weights=(weights * np.nan_to_num(values)).ravel(),
+                       minlength=size).reshape(n_curves, n_blocks)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, sums / totals, np.nan)
+
+
+def upscale(depth, curves, edges, methods=None, density=None):
+    """Block averages of {curve: array} sampled at depth, for the blocks between edges.
+
+    methods maps curve names to METHODS (arithmetic otherwise); density is
+    the density array used by Backus.  Returns (block centres, {curve: block values}).
+    """
+    depth = np.asarray(depth, dtype=np.float64)
+    methods = methods or {}
+    n_blocks = max(edges.size - 1, 0)
+    centres = (edges[:-1] + edges[1:]) / 2
+    names = list(curves)
+    if not names or not n_blocks:
+        return centres, {name: np.full(n_blocks, np.nan) for name in names}
+    block, inside = block_index(depth, edges)
+    thickness = np.where(inside & np.isfinite(depth), sample_thickness(depth), 0.0)
+
+    # One row per averaged quantity: arithmetic x, harmonic 1/x, geometric ln x, and for
+    # Backus both <RHOB> and <DT^2 / RHOB> over the samples where both are present
+    rows, row_of = [], {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for name in names:
+            x = np.asarray(curves[name], dtype=np.float64)
+            method = methods.get(name, 'Arithmetic')
+            if method == 'Harmonic':
+                x = np.where(x > 0, 1 / x, np.nan)
+            elif method == 'Geometric':
+                x = np.where(x > 0, np.log(x), np.nan)
+            elif method == 'Backus':
+                rho = np.ones(x.shape) if density is None else np.asarray(density, dtype=np.float64)
+                both = np.isfinite(x) & (rho > 0)
+                rows.append(np.where(both, rho, np.nan))
+                x = np.where(both, x * x / rho, np.nan)
+            row_of[name] = len(rows)
+            rows.append(x)
+    values = np.vstack(rows)
+    weights = np.where(np.isfinite(values), thickness[None, :], 0.0)
+    means = _block_means(block, weights, values, n_blocks)
+
+    result = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for name in names:
+            mean = means[row_of[name]]
+            method = methods.get(name, 'Arithmetic')
+            if method == 'Harmonic':
+                mean = 1 / mean
+            elif method == 'Geometric':
+                mean = np.exp(mean)
+            elif method == 'Backus':
+                mean = np.sqrt(means[row_of[name] - 1] * mean)
+            result[name] = mean
+    return centres, result
+
+
+def default_methods(keys):
+    """{mnemonic: method} for the curves among keys that DEFAULT_METHODS covers, aliases resolved."""
+    methods = {}
+    for canonical, method in DEFAULT_METHODS.items():
+        mnemonic = depth_grid.resolve_mnemonic(keys, canonical)
+        if mnemonic is not None:
+            methods[mnemonic] = method
+    return methods
+
+
+def upscale_store(store, step=DEFAULT_STEP, tops=None, methods=None, root=None):
+    """Upscaled copy of a curve store (to step, or to the zones between tops), as a CurveStore.
+
+    methods defaults to default_methods(); the result is written once per
+    source store and settings and reopened afterwards.
+    """
+    keys = store.keys[1:]
+    methods = default_methods(keys) if methods is None else methods
+    settings = {'step': None if tops else step, 'tops': sorted(tops) if tops else None,
+                'methods': sorted(methods.items())}
+    key = (f"{os.path.basename(store.path)}-up-"
+           f"{las_cache.content_hash(json.dumps(settings).encode())}")
+    upscaled = curve_store.open_store(key, root)
+    if upscaled is not None:
+        return upscaled
+
+    depth = np.asarray(store.depth, dtype=np.float64)
+    edges = zone_edges(depth, tops) if tops else step_edges(depth, step)
+    density = depth_grid.resolve_mnemonic(keys, 'RHOB')
+    centres, values = upscale(depth, {name: store.curve(name) for name in keys}, edges, methods,
+                              None if density is None else store.curve(density))
+    # The blocks' depth range and step; zones are irregular, which LAS writes as step 0
+    sampling = {'STEP': 0.0 if tops else float(step)}
+    if centres.size:
+        sampling.update(STRT=float(centres[0]), STOP=float(centres[-1]))
+    well = [[mnemonic, unit, sampling.get(mnemonic, value), descr]
+            for mnemonic, unit, value, descr in store.header['well']]
+    description = f"zones at {settings['tops']}" if tops else f"{step:g} step"
+    params = store.header['params'] + [['UPSCALE', '', description, 'Block averaged from the source log']]
+    return curve_store.write_columns([centres] + [values[name] for name in keys], store.curves,
+                                     well, params, key, root)
@@ -0,0 +1,140 @@
+import copy
+import os
+
+import jobs
+import las_cache
+import las_reader
+import memory_cache
+import parallel
+
+INVENTORY_COLUMNS = ['File', 'Well', 'UWI', 'Latitude', 'Longitude', 'Top', 'Base', 'Step', 'Curves']
+
+# Multi-well ingestion: decode, parse and Well.from_lasio for every uploaded
+# file across the shared process pool, with per-file error isolation.  Built
+# wells are kept in a cache of their own (budget PETRO_WELL_CACHE_MB), keyed
+# by the content hash of the file, so reruns do not ingest the same bytes
+# again; callers get a copy because pages mutate wells (e.g. add_deviation).
+
+DEFAULT_BUDGET_MB = 256
+
+_well_cache = memory_cache.MemoryCache(int(os.environ.get('PETRO_WELL_CACHE_MB', DEFAULT_BUDGET_MB)) * 2**20)
+
+
+def get_cache():
+    return _well_cache
+
+
+def well_size(well):
+    return sum(curve.df.to_numpy().nbytes for curve in well.data.values()) + las_cache.HEADER_OVERHEAD
+
+
+def ingest_well(bytes_data):
+    """Worker: parse LAS bytes into a welly Well."""
+    from welly import Well
+
+    las = las_reader.read_las(bytes_data)
+    return Well.from_lasio(las.to_lasio())
+
+
+def cached_wells(uploaded_files):
+    """Wells already in the well cache.
+
+    Returns ([[file name, well or None, None], ...] in upload order,
+    [(index, cache key, bytes), ...] of the files still to ingest,
+    the cache keys of every file).
+    """
+    cache = get_cache()
+    results = []
+    pending = []
+    keys = []
+    for uploaded_file in uploaded_files:
+        bytes_data = uploaded_file.getvalue()
+        key = las_cache.content_hash(bytes_data)
+        keys.append(key)
+        well = cache.get(key)
+        if well is not None:
+            well = copy.deepcopy(well)
+        results.append([uploaded_file.name, well, None])
+        if well is None:
+            pending.append((len(results) - 1, key, bytes_data))
+    return results, pending, keys
+
+
+def submit_pending(slot, pending):
+    """The background jobs.Job ingesting the pending files of cached_wells(), keyed by
+    exactly those files so its outcomes cover every one of them."""
+    return jobs.submit(slot, ('load_wells',) + tuple(key for _, key, _ in pending), ingest_well,
+                       lambda: [(bytes_data,) for _, _, bytes_data in pending], size=well_size)
+
+
+def store_wells(results, pending, outcomes):
+    """Fill the results of cached_wells() with the (well, error) outcomes of the pending
+    files, in the same order, caching the new wells; returns [(file name, well, error), ...]."""
+    cache = get_cache()
+    for (i, key, _), (well, error) in zip(pending, outcomes):
+        results[i][1:] = [well, error]
+        if well is not None:
+            cache.put(key, copy.deepcopy(well), well_size(well))
+    return [tuple(result) for result in results]
+
+
+def load_wells(uploaded_files, on_progress=None):
+    """Ingest uploaded LAS files in parallel.
+
+    Returns [(file name, well, error), ...] in upload order; well is None
+    and error is set for files that failed.
+    """
+    results, pending, _ = cached_wells(uploaded_files)
+    n_cached = len(results) - len(pending)
+
+    def progress(done, total):
+        if on_progress:
+            on_progress(n_cached + done, len(results))
+
+    if n_cached and on_progress:
+        on_progress(n_cached, len(results))
+    outcomes = parallel.map_ordered(ingest_well, [(bytes_data,) for _, _, bytes_data in pending], progress)
+    return store_wells(results, pending, outcomes)
+
+
+def _float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def inventory_row(name, las):
+    """Inventory entry for one header-only LasData."""
+    start = _float_or_none(las.header_value('STRT'))
+    stop = _float_or_none(las.header_value('STOP'))
+    step = _float_or_none(las.header_value('STEP'))
+    has_range = start is not None and stop is not None
+    return {
+        'File': name,
+        'Well': las.header_value('WELL') or name,
+        'UWI': las.header_value('UWI') or '',
+        'Latitude': _float_or_none(las.header_value('LATI')),
+        'Longitude': _float_or_none(las.header_value('LONG')),
+        'Top': min(start, stop) if has_range else None,
+        'Base': max(start, stop) if has_range else None,
+        'Step': abs(step) if step is not None else None,
+        'Curves': las.keys[1:],
+    }
+
+
+def scan_inventory(uploaded_files):
+    """Header-only scan of every upload.
+
+    Returns (inventory DataFrame in upload order, [(file name, error), ...]).
+    """
+    import pandas as pd
+
+    rows, errors = [], []
+    for uploaded_file in uploaded_files:
+        try:
+            las = las_reader.read_las_header(uploaded_file.getvalue())
+            rows.append(inventory_row(uploaded_file.name, las))
+        except Exception as e:
+            errors.append((uploaded_file.name, e))
+    return pd.DataFrame(rows, columns=INVENTORY_COLUMNS), errors
@@ -1,35 +1,34 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import lasio
-from io import StringIO
+import las_cache
+import crossplot
+import decimation
+import figure_cache
+import instrumentation
+import log_analysis
+import log_qc
+import petrophysics
+from log_views import (DENSITY_STATISTICS, crossplot_window, petrophysics_parameters, plot_density_crossplot,
+                       plot_petrophysics, upscaling_options)
 
 
 def load_data(uploaded_file):
     if uploaded_file:
-        bytes_data = uploaded_file.read()
-        str_io = StringIO(bytes_data.decode('Windows-1252'))
-        las_file = lasio.read(str_io)
+        las_file = las_cache.load_las(uploaded_file)
         well_data = las_file.df()
         return las_file, well_data
     return None, None
 
 
-def handle_outliers(well_data, method):
-    if method == 'Fillna().mean':
-        return well_data.fillna(well_data.mean())
-    elif method == 'Dropna()':
-        return well_data.dropna()
-    elif method == 'Linear Interpolation':
-        return well_data.interpolate(method='linear')
-    elif method == 'IQR':
-        Q1 = well_data.quantile(0.25)
-        Q3 = well_data.quantile(0.75)
-        IQR = Q3 - Q1
-        return well_data[~((well_data < (Q1 - 1.5 * IQR)) | (well_data > (Q3 + 1.5 * IQR))).any(axis=1)]
-    return well_data
+# Curves and depth window drawn by plot_subplots
+SUBPLOT_CURVES = ['GR', 'RDEP', 'DEN', 'NEU']
+SUBPLOT_TOP, SUBPLOT_BASE = 3500, 4700
 
+CROSSPLOT_MODES = ['Points', 'Density']
 
+
+@figure_cache.cached_figure
 def plot_scatter(well_data, x_col, y_col):
     if not pd.api.types.is_numeric_dtype(well_data[x_col]) or not pd.api.types.is_numeric_dtype(well_data[y_col]):
         st.error(f"Both {x_col} and {y_col} must be numeric.")
@@ -44,10 +43,28 @@ def plot_scatter(well_data, x_col, y_col):
     plt.xlabel(f"{x_col} (g/cc)")
     plt.ylabel(f"{y_col} (%)")
     plt.colorbar(scatter, label="Gamma Ray (GR) - API")
-    st.pyplot(plt)
+    return plt.gcf()
+
+
+# Function to bin a cross-plot once per curve pair; zooming only slices the pyramid
+@st.cache_data(show_spinner="Binning cross-plot...")
+def crossplot_pyramid(_store, store_path, x_col, y_col, outlier_method):
+    curves = [c for c in dict.fromkeys([x_col, y_col, 'GR']) if c in _store.keys]
+    well_data = log_analysis.read_well_data(_store, curves, outlier_method)
+    x, y = well_data[x_col].to_numpy(), well_data[y_col].to_numpy()
+    gr = well_data['GR'].to_numpy() if 'GR' in well_data else None
+    return crossplot.pyramid(x, y, crossplot.data_range(x), crossplot.data_range(y), gr)
+
 
+def show_density_crossplot(store, x_col, y_col, outlier_method, well_name):
+    statistic = st.radio("Colour by", DENSITY_STATISTICS if 'GR' in store.keys else ['Count'], horizontal=True)
+    levels = crossplot_pyramid(store, store.path, x_col, y_col, outlier_method)
+    x_range, y_range, bins = crossplot_window(levels, x_col, y_col)
+    plot_density_crossplot({well_name: crossplot.window(levels, x_range, y_range, bins)}, x_col, y_col, statistic)
 
-def plot_subplots(well_data):
+
+@figure_cache.cached_figure
+def plot_subplots(well_data, top=SUBPLOT_TOP, base=SUBPLOT_BASE):
     fig, axes = plt.subplots(figsize=(10, 10))
     curve_names = ['Gamma', 'Deep Res', 'Density', 'Neutron']
     ax1 = plt.subplot2grid((1, 3), (0, 0), rowspan=1, colspan=1)
@@ -55,25 +72,29 @@ def plot_subplots(well_data):
     ax3 = plt.subplot2grid((1, 3), (0, 2), rowspan=1, colspan=1)
     ax4 = ax3.twiny()
 
-    ax1.plot(well_data["GR"], well_data.index, color="green", lw=0.5)
+    depth, values = decimation.decimate_track(ax1, well_data.index, well_data["GR"], top, base)
+    ax1.plot(values, depth, color="green", lw=0.5)
     ax1.set_xlim(0, 200)
     ax1.spines['top'].set_edgecolor('green')
 
-    ax2.plot(well_data["RDEP"], well_data.index, color="red", lw=0.5)
+    depth, values = decimation.decimate_track(ax2, well_data.index, well_data["RDEP"], top, base)
+    ax2.plot(values, depth, color="red", lw=0.5)
     ax2.set_xlim(0.2, 2000)
     ax2.semilogx()
     ax2.spines['top'].set_edgecolor('red')
 
-    ax3.plot(well_data["DEN"], well_data.index, color="red", lw=0.5)
+    depth, values = decimation.decimate_track(ax3, well_data.index, well_data["DEN"], top, base)
+    ax3.plot(values, depth, color="red", lw=0.5)
     ax3.set_xlim(1.95, 2.95)
     ax3.spines['top'].set_edgecolor('red')
 
-    ax4.plot(well_data["NEU"], well_data.index, color="blue", lw=0.5)
+    depth, values = decimation.decimate_track(ax4, well_data.index, well_data["NEU"], top, base)
+    ax4.plot(values, depth, color="blue", lw=0.5)
     ax4.set_xlim(45, -15)
     ax4.spines['top'].set_edgecolor('blue')
 
     for i, ax in enumerate([ax1, ax2, ax3, ax4]):
-        ax.set_ylim(4700, 3500)
+        ax.set_ylim(base, top)
         ax.xaxis.set_ticks_position("top")
         ax.xaxis.set_label_position("top")
         ax.set_xlabel(curve_names[i])
@@ -86,56 +107,100 @@ def plot_subplots(well_data):
         plt.setp(ax.get_yticklabels(), visible=False)
     fig.subplots_adjust(wspace=0.05)
     plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
-    st.pyplot(fig)
+    return fig
+
 
+# Function to summarize every curve (not the depth index) in one pass over the memory-mapped store
+@st.cache_data(show_spinner=False)
+def qc_summary(_store, store_path):
+    with instrumentation.stage("QC summary", rows=_store.n_samples):
+        return log_qc.summary_table(log_qc.summarize_store(_store))
 
-def plot_boxplot(well_data):
-    plt.figure(figsize=(10, 6))
-    well_data.plot.box(figsize=(10, 6), patch_artist=True, notch=True, grid=True)
-    plt.title("Boxplot for Well Logging Data")
-    plt.ylabel("Values")
-    st.pyplot(plt)
+
+@figure_cache.cached_figure
+def plot_boxplot(summary):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bxp(log_qc.boxplot_stats(summary), shownotches=True, patch_artist=True)
+    ax.grid(True)
+    ax.set_title("Boxplot for Well Logging Data")
+    ax.set_ylabel("Values")
+    return fig
 
 
 def show_page():
     st.title("Well Logging Analysis")
     uploaded_file = st.file_uploader("Upload a LAS file", type=["las"])
-    las_file, well_data = load_data(uploaded_file)
+    store = None
+    if uploaded_file:
+        with instrumentation.stage("Load LAS store") as stage:
+            store = las_cache.load_store(uploaded_file)
+            stage.rows = store.n_samples
+        store = upscaling_options(store)
 
-    if las_file:
+    if store:
+        outlier_method = 'None'
         display_options = st.multiselect(
             "Select what to display:",
-            ["Data Overview", "Boxplot", "Handle Outliers", "Scatter Plot", "Subplots"]
+            ["Data Overview", "Boxplot", "Handle Outliers", "Scatter Plot", "Subplots", "Petrophysics"]
         )
 
         if "Data Overview" in display_options:
             st.write("### Data Overview")
-            st.write(well_data.head())
+            st.write(store.head())
 
         if "Boxplot" in display_options:
             st.write("### Boxplot to Identify Outliers")
-            plot_boxplot(well_data)
+            summary = qc_summary(store, store.path)
+            st.dataframe(summary)
+            plot_boxplot(summary)
 
         if "Handle Outliers" in display_options:
             st.write("### Handle Outliers")
             outlier_method = st.selectbox(
                 "Choose how to handle outliers",
-                ['None', 'Fillna().mean', 'Dropna()', 'Linear Interpolation', 'IQR']
+                log_analysis.OUTLIER_METHODS
             )
-            well_data = handle_outliers(well_data, outlier_method)
 
         if "Scatter Plot" in display_options:
             st.write("### Scatter Plot")
-            selected_columns = st.multiselect("Select Columns", well_data.columns)
+            selected_columns = st.multiselect("Select Columns", store.keys[1:])
             if len(selected_columns) == 2:
                 col1, col2 = selected_columns
-                plot_scatter(well_data, col1, col2)
+                mode = st.radio("Cross-plot mode", CROSSPLOT_MODES, horizontal=True,
+                                help="Density bins the samples, which stays fast for large logs")
+                if mode == 'Density':
+                    show_density_crossplot(store, col1, col2, outlier_method,
+                                           store.header_value('WELL', uploaded_file.name))
+                else:
+                    curves = [c for c in dict.fromkeys(selected_columns + ['GR']) if c in store.keys]
+                    well_data = log_analysis.read_well_data(store, curves, outlier_method)
+                    plot_scatter(well_data, col1, col2)
             else:
                 st.warning("Please select exactly two columns for the scatter plot.")
 
         if "Subplots" in display_options:
             st.write("### Subplots for Gamma Ray, Resistivity, and Porosity vs Depth")
-            plot_subplots(well_data)
+            depth_min, depth_max = store.header['depth_min'], store.header['depth_max']
+            # The default window clipped to the log, or the whole log when they do not overlap
+            top, base = float(max(depth_min, SUBPLOT_TOP)), float(min(depth_max, SUBPLOT_BASE))
+            if top >= base:
+                top, base = depth_min, depth_max
+            top, base = st.slider("Depth window", min_value=depth_min, max_value=depth_max, value=(top, base))
+            # Read the full depth range so zooming only slices the cached LOD pyramids
+            plot_subplots(log_analysis.read_well_data(store, SUBPLOT_CURVES, outlier_method), top, base)
+
+        if "Petrophysics" in display_options:
+            st.write("### Petrophysics")
+            parameters = petrophysics_parameters()
+            depth, curves = log_analysis.read_petrophysics_inputs(store, outlier_method)
+            with instrumentation.stage("Petrophysics", rows=len(depth)):
+                results = petrophysics.evaluate(curves, parameters)
+            well_name = store.header_value('WELL', uploaded_file.name)
+            st.dataframe(petrophysics.cutoff_summary(depth, results, [well_name]))
+            depth_min, depth_max = store.header['depth_min'], store.header['depth_max']
+            top, base = st.slider("Petrophysics depth window", min_value=depth_min, max_value=depth_max,
+                                  value=(depth_min, depth_max))
+            plot_petrophysics(depth, results, top, base)
 
 
 if __name__ == "__main__":
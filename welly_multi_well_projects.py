@@ -1,59 +1,200 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import lasio
-from io import StringIO
+import crossplot
+import las_cache
+import log_correlation
+import background
+import well_ingest
 import matplotlib.pyplot as plt
-from welly import Well, Project
-import folium
-from streamlit_folium import folium_static
-
-def load_wells(uploaded_files):
-    wells = []
-    for uploaded_file in uploaded_files:
-        try:
-            bytes_data = uploaded_file.read()
-            str_io = StringIO(bytes_data.decode('Windows-1252'))
-            las = lasio.read(str_io)
-            well = Well.from_lasio(las)
-            wells.append(well)
-        except Exception as e:
-            st.error(f"Error processing file {uploaded_file.name}: {e}")
-    return wells
-
-def show_well_details(wells):
-    st.write(f"Number of wells loaded: {len(wells)}")
-    for well in wells:
-        st.write(f"Well: {well.name}")
-        st.write(f"Curves: {list(well.data.keys())}")
+import decimation
+import figure_cache
+import instrumentation
+import depth_grid
+import petrophysics
+from log_views import (DENSITY_STATISTICS, crossplot_window, petrophysics_parameters, plot_density_crossplot,
+                       plot_petrophysics)
 
+def show_well_details(inventory):
+    st.write(f"Number of wells loaded: {len(inventory)}")
+    st.dataframe(inventory)
+    for _, row in inventory.iterrows():
+        st.write(f"Well: {row['Well']}")
+        st.write(f"Curves: {row['Curves']}")
+
+@figure_cache.cached_figure
 def plot_gr_curves(wells):
     fig, axs = plt.subplots(figsize=(14, 10), ncols=len(wells))
     for i, (ax, well) in enumerate(zip(axs, wells)):
         gr = well.get_curve('GR')
         if gr is not None:
-            gr.plot(ax=ax, c='green')
+            decimation.plot_curve(ax, gr, c='green')
             ax.set_title(f"GR for\n{well.name}")
     plt.tight_layout()
-    st.pyplot(fig)
+    return fig
 
+@figure_cache.cached_figure
 def plot_rhob_curves(wells):
     fig, axs = plt.subplots(figsize=(14, 10), ncols=len(wells))
     curve_name = 'RHOB'
     for i, (ax, well) in enumerate(zip(axs, wells)):
         rhob = well.get_curve(curve_name)
         if rhob is not None:
-            rhob.plot(ax=ax, c='red')
+            decimation.plot_curve(ax, rhob, c='red')
             ax.set_title(f"{curve_name} for\n{well.name}")
     plt.tight_layout()
+    return fig
+
+def show_cross_well_statistics(wells):
+    mnemonics = st.multiselect("Select curves (aliases such as DEN/RHOB are matched)",
+                               list(depth_grid.CURVE_ALIASES), default=['GR', 'RHOB'])
+    step = st.number_input("Common depth grid step", min_value=0.05, value=0.5, step=0.05)
+    if not mnemonics:
+        return
+    series = [depth_grid.well_series(well, mnemonics) for well in wells]
+    with instrumentation.stage("Build curve matrix") as stage:
+        matrix = depth_grid.build_curve_matrix(series, mnemonics, step=step)
+        stage.rows = matrix.values.shape[0] * matrix.values.shape[1]
+    n_wells, n_depths, n_curves = matrix.values.shape
+    st.write(f"Curve matrix: {n_wells} wells x {n_depths} depths x {n_curves} curves")
+    st.write("Curve statistics per well:")
+    st.dataframe(depth_grid.curve_statistics(matrix))
+    st.write(f"Correlation of {mnemonics[0]} between wells:")
+    st.dataframe(depth_grid.well_correlation(matrix, mnemonics[0]))
+
+    # One plot call for all wells: matplotlib draws one line per column
+    fig, ax = plt.subplots(figsize=(6, 10))
+    ax.plot(matrix.values[:, :, 0].T, matrix.depth, lw=0.5)
+    ax.legend(matrix.wells)
+    ax.invert_yaxis()
+    ax.set_xlabel(mnemonics[0])
+    ax.set_ylabel("Depth")
     st.pyplot(fig)
 
-def show_map(wells):
+def show_petrophysics(wells):
+    parameters = petrophysics_parameters()
+    step = st.number_input("Petrophysics depth grid step", min_value=0.05, value=0.5, step=0.05)
+    # All wells on one grid so the whole chain runs once on (wells x depth) arrays
+    series = [depth_grid.well_series(well, petrophysics.INPUT_CURVES) for well in wells]
+    with instrumentation.stage("Petrophysics") as stage:
+        matrix = depth_grid.build_curve_matrix(series, petrophysics.INPUT_CURVES, step=step)
+        results = petrophysics.evaluate_matrix(matrix, parameters)
+        stage.rows = matrix.values.shape[0] * matrix.values.shape[1]
+    if not matrix.depth.size:
+        st.warning("None of the wells has GR, RHOB/DEN, NPHI/NEU or RDEP; nothing to compute.")
+        return
+    st.write("Cutoff summary per well:")
+    st.dataframe(petrophysics.cutoff_summary(matrix.depth, results, matrix.wells))
+    w = st.selectbox("Show tracks for well", range(len(matrix.wells)), format_func=lambda i: matrix.wells[i])
+    plot_petrophysics(matrix.depth, {name: values[w] for name, values in results.items()},
+                      matrix.depth[0], matrix.depth[-1])
+
+# Function to bin a multi-well cross-plot once per curve matrix and pair; zooming only slices the pyramids.
+# cache_resource hands back the same pyramids instead of unpickling a copy of every well's on each rerun
+@st.cache_resource(show_spinner="Binning cross-plot...", max_entries=4)
+def crossplot_pyramids(_matrix, matrix_key, x_col, y_col):
+    x, y, gr = (_matrix.values[:, :, _matrix.mnemonics.index(name)] for name in (x_col, y_col, 'GR'))
+    # One binning pass for all wells, on edges shared so the histograms add up
+    return crossplot.pyramids_by_group(x, y, crossplot.data_range(x), crossplot.data_range(y), gr)
+
+# Function to cross-plot two curves of every well as one density plot with per-well outlines
+def show_crossplot(wells):
+    aliases = list(depth_grid.CURVE_ALIASES)
+    col1, col2, col3 = st.columns(3)
+    x_col = col1.selectbox("X curve", aliases, index=aliases.index('NPHI'))
+    y_col = col2.selectbox("Y curve", aliases, index=aliases.index('RHOB'))
+    statistic = col3.radio("Colour by", DENSITY_STATISTICS)
+    mnemonics = list(dict.fromkeys([x_col, y_col, 'GR']))
+    series = [depth_grid.well_series(well, mnemonics) for well in wells]
+    with instrumentation.stage("Build curve matrix") as stage:
+        matrix = depth_grid.build_curve_matrix(series, mnemonics)
+        stage.rows = matrix.values.shape[0] * matrix.values.shape[1]
+    x, y = (matrix.values[:, :, mnemonics.index(name)] for name in (x_col, y_col))
+    if not np.isfinite(x).any() or not np.isfinite(y).any():
+        st.warning(f"No well has both {x_col} and {y_col}.")
+        return
+    matrix_key = (las_cache.content_hash(matrix.values.tobytes()), tuple(matrix.wells), tuple(matrix.mnemonics))
+    pyramids = crossplot_pyramids(matrix, matrix_key, x_col, y_col)
+    x_range, y_range, bins = crossplot_window(pyramids[0], x_col, y_col, key='multi_well_')
+    histograms = {well: crossplot.window(levels, x_range, y_range, bins)
+                  for well, levels in zip(matrix.wells, pyramids)}
+    plot_density_crossplot(histograms, x_col, y_col, statistic)
+
+@figure_cache.cached_figure
+def plot_correlation(depth, values, tops, name, window):
+    fig, axs = plt.subplots(figsize=(14, 8), ncols=len(tops), sharex=True, squeeze=False)
+    for ax, (_, row), curve in zip(axs[0], tops.iterrows(), values):
+        if np.isfinite(row['Top']):
+            # Only the interval around the top, where the picks are checked
+            shown = (depth >= row['Top'] - window) & (depth <= row['Top'] + window)
+            ax.plot(curve[shown], depth[shown], c='green', lw=0.8)
+            ax.axhline(row['Top'], c='red')
+            ax.set_title(f"{row['Well']}\n{name}: {row['Top']:.1f} ({row['Confidence']:.2f})", fontsize=9)
+        else:
+            ax.set_title(f"{row['Well']}\nnot aligned", fontsize=9)
+        ax.invert_yaxis()
+    axs[0][0].set_ylabel("Depth")
+    plt.tight_layout()
+    return fig
+
+# Function to correlate one curve across the wells and carry a top picked in one well to the others
+def show_correlation(wells):
+    aliases = list(depth_grid.CURVE_ALIASES)
+    col1, col2, col3 = st.columns(3)
+    mnemonic = col1.selectbox("Correlation curve", aliases, index=aliases.index('GR'))
+    step = col2.number_input("Correlation grid step", min_value=0.1, value=1.0, step=0.1)
+    reference = col3.selectbox("Reference well", range(len(wells)), format_func=lambda i: wells[i].name)
+    col1, col2 = st.columns(2)
+    max_shift = col1.number_input("Largest bulk shift", min_value=step, value=log_correlation.DEFAULT_MAX_SHIFT)
+
+    series = [depth_grid.well_series(well, [mnemonic]) for well in wells]
+    with instrumentation.stage("Build curve matrix") as stage:
+        matrix = depth_grid.build_curve_matrix(series, [mnemonic], step=step)
+        stage.rows = matrix.values.shape[0] * matrix.values.shape[1]
+    band = col2.number_input("Stretch band (+/- depth around the bulk shift)", min_value=step,
+                             value=float(log_correlation.default_band(matrix.depth.size * step)),
+                             help="Caps the total stretch over the whole log, not per interval; the default "
+                                  f"allows {log_correlation.DEFAULT_STRETCH:.0%} of the log length. Wider "
+                                  "bands and finer steps take longer and more memory.")
+    values = log_correlation.normalize(matrix.values[:, :, 0])
+    if not np.isfinite(values[reference]).any():
+        st.warning(f"{matrix.wells[reference]} has no {mnemonic}.")
+        return
+
+    with instrumentation.stage("Bulk shifts", rows=values.size):
+        shifts, correlations = log_correlation.pairwise_shifts(values, step, max_shift)
+    st.write(f"Bulk shifts between wells (row depth + shift = column depth), from normalized {mnemonic}:")
+    st.dataframe(pd.DataFrame(shifts, index=matrix.wells, columns=matrix.wells))
+
+    # Warping paths in the background, keyed by the curves and settings; the top pick below does not redo them
+    tasks, chunks = log_correlation.alignment_tasks(values, reference, shifts[reference], step, band)
+    key = ("correlation", las_cache.content_hash(values.tobytes()), reference, step, max_shift, band)
+    job = background.submit("correlation", key, log_correlation.warp_paths, lambda: tasks)
+    if not background.show_job(job, "Aligned well groups"):
+        return
+    matches, costs = log_correlation.merge_paths(len(wells), reference, chunks, job.outcomes())
+    alignment = log_correlation.Alignment(shifts[reference], correlations[reference], matches, costs)
+
+    present = matrix.depth[np.isfinite(values[reference])]
+    col1, col2, col3 = st.columns(3)
+    name = col1.text_input("Top name", value="Top")
+    top = col2.number_input(f"{name} depth in {matrix.wells[reference]}", min_value=float(present[0]),
+                            max_value=float(present[-1]), value=float(np.median(present)))
+    window = col3.number_input("Display window (+/- depth)", min_value=step, value=100.0)
+    tops = log_correlation.propagate_top(matrix.depth, values, matrix.wells, reference, alignment, top)
+    st.dataframe(tops)
+    plot_correlation(matrix.depth, values, tops, name, window)
+
+def show_map(inventory):
+    # folium and streamlit_folium are slow to import and only needed here
+    import folium
+    from streamlit_folium import folium_static
+
     map_center = [30.0, 31.0]
     m = folium.Map(location=map_center, zoom_start=5)
-    for well in wells:
-        loc = well.location
-        if loc is not None:
-            folium.Marker([loc.latitude, loc.longitude], tooltip=well.name).add_to(m)
+    located = inventory.dropna(subset=['Latitude', 'Longitude'])
+    for _, row in located.iterrows():
+        folium.Marker([row['Latitude'], row['Longitude']], tooltip=row['Well']).add_to(m)
     folium_static(m)
 
 def show_page():
@@ -61,24 +202,53 @@ def show_page():
 
     uploaded_files = st.file_uploader("Upload LAS files", type=["las"], accept_multiple_files=True)
     if uploaded_files:
-        wells = load_wells(uploaded_files)
-        st.success(f"{len(wells)} wells loaded successfully")
+        # Header-only scan: enough for the details table and the map
+        with instrumentation.stage("Scan headers", rows=len(uploaded_files)):
+            inventory, errors = well_ingest.scan_inventory(uploaded_files)
+        for name, error in errors:
+            st.error(f"Error processing file {name}: {error}")
+        st.success(f"{len(inventory)} wells loaded successfully")
 
         display_options = st.multiselect(
             "Select what to display:",
-            ["Well Details", "GR Curves", "RHOB Curves", "Well Locations Map"]
+            ["Well Details", "GR Curves", "RHOB Curves", "Cross-Well Statistics", "Cross-Plot", "Log Correlation",
+             "Petrophysics", "Well Locations Map"]
         )
         if "Well Details" in display_options:
-            show_well_details(wells)
+            show_well_details(inventory)
+
+        # Curve data is only parsed when a curve view is requested
+        curve_views = ["GR Curves", "RHOB Curves", "Cross-Well Statistics", "Cross-Plot", "Log Correlation",
+                       "Petrophysics"]
+        if any(view in display_options for view in curve_views):
+            wells = background.load_wells(uploaded_files)
+        else:
+            background.cancel("load_wells")
+            wells = None
+
+        if wells is not None:
+            if "GR Curves" in display_options:
+                plot_gr_curves(wells)
+
+            if "RHOB Curves" in display_options:
+                plot_rhob_curves(wells)
+
+            if "Cross-Well Statistics" in display_options:
+                show_cross_well_statistics(wells)
+
+            if "Cross-Plot" in display_options:
+                show_crossplot(wells)
 
-        if "GR Curves" in display_options:
-            plot_gr_curves(wells)
+            if "Log Correlation" in display_options:
+                show_correlation(wells)
+            else:
+                background.cancel("correlation")
 
-        if "RHOB Curves" in display_options:
-            plot_rhob_curves(wells)
+            if "Petrophysics" in display_options:
+                show_petrophysics(wells)
 
         if "Well Locations Map" in display_options:
-            show_map(wells)
+            show_map(inventory)
 
 if __name__ == "__main__":
     show_page()